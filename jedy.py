@@ -4,7 +4,21 @@ import argparse
 import logging
 import os
 import sys
+from lib import attributes
+from lib import benchmark
+from lib import class_cache
 from lib import class_loader
+from lib import class_reload
+from lib import class_trace
+from lib import class_unloading
+from lib import footprint
+from lib import image
+from lib import inline_cache
+from lib import instruction_trace
+from lib import metrics
+from lib import prefetch
+from lib import preparse
+from lib import profiler
 from lib import run_time_data
 from lib import thread
 
@@ -21,11 +35,208 @@ def parse_argument():
         action='store_true',
         help='Output class detail informations.'
     )
-    parser.add_argument('--classpath', help='Java class file path name')
-    parser.add_argument('--java-home', help='Java home path')
+    parser.add_argument(
+        '--parser',
+        choices=sorted(class_loader.class_parsers),
+        default=class_loader.class_parser,
+        help='Class file parser, "mmap" decodes a mapped class file by '
+             'offset, "stream" reads it item by item.'
+    )
+    parser.add_argument(
+        '--load-profile',
+        choices=attributes.loading_profiles,
+        default=attributes.loading_profile,
+        help='With "fast", attributes the interpreter does not need are '
+             'only parsed when they are asked for.'
+    )
+    parser.add_argument(
+        '-verbose:class',
+        '--verbose-class',
+        dest='verbose_class',
+        action='store_true',
+        help='Output a record for each loaded class, with its source, size, '
+             'parse and initialization time and what triggered the load.'
+    )
+    parser.add_argument(
+        '--verbose-class-file',
+        metavar='FILE',
+        help='Write the records of -verbose:class into FILE as JSON lines.'
+    )
+    parser.add_argument(
+        '--trace-instructions',
+        action='store_true',
+        help='Log every instruction executed, with the operand stack and '
+             'local variables of its frame.'
+    )
+    parser.add_argument(
+        '--trace-only',
+        action='append',
+        default=[],
+        metavar='NAME',
+        help='Trace only the instructions of class NAME, or of method NAME '
+             'such as Main.main. Can be given more than once.'
+    )
+    parser.add_argument(
+        '--trace-file',
+        metavar='FILE',
+        help='Write the traced instructions into FILE as JSON lines, '
+             'instead of the log.'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Output call counts and inclusive and exclusive time of the '
+             'Java methods at exit.'
+    )
+    parser.add_argument(
+        '--profile-file',
+        metavar='FILE',
+        help='Write the profile of the Java methods into FILE, in the '
+             'format of the pstats module.'
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='Output VM internal counters at exit.'
+    )
+    parser.add_argument(
+        '--memory-report',
+        action='store_true',
+        help='Output the memory footprint of the loaded classes at exit.'
+    )
+    parser.add_argument(
+        '--max-classes',
+        type=int,
+        default=0,
+        metavar='N',
+        help='Evict least recently used classes which are not in use when '
+             'more than N classes are loaded. Bootstrap classes are never '
+             'evicted.'
+    )
+    parser.add_argument(
+        '--max-method-area-bytes',
+        type=int,
+        default=0,
+        metavar='BYTES',
+        help='Evict least recently used classes which are not in use when '
+             'the loaded classes take more than BYTES of memory.'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=thread.ENGINES,
+        default='classic',
+        help='Execution engine, "threaded" compiles each method into '
+             'handlers before it runs. Both engines trace instructions '
+             'with --trace-instructions.'
+    )
+    parser.add_argument(
+        '--rerun',
+        action='store_true',
+        help='Stay resident after the program exits, run it again on each '
+             'line of stdin. Only changed classes of the class path, and '
+             'the classes which extend them, are loaded again.'
+    )
+    parser.add_argument(
+        '--no-class-cache',
+        action='store_true',
+        help='Do not read or write the on-disk cache of parsed classes.'
+    )
+    parser.add_argument(
+        '--rebuild-class-cache',
+        action='store_true',
+        help='Parse every loaded class again and overwrite its cache entry.'
+    )
+    parser.add_argument(
+        '--class-cache-dir',
+        default=class_cache.cache_dir,
+        help='Directory of the on-disk cache of parsed classes.'
+    )
+    parser.add_argument(
+        '--preparse',
+        nargs='?',
+        const=class_loader.jrelibpath,
+        metavar='ROOT',
+        help='Parse every class under ROOT (default the JRE lib) in a '
+             'process pool to fill the class cache, then exit.'
+    )
+    parser.add_argument(
+        '--preparse-report',
+        metavar='FILE',
+        help='Write the pre-parse report, with per-class parse time and '
+             'failures, as JSON into FILE.'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        help='Number of worker processes for --preparse, default all cores, '
+             'and for --prefetch, default none.'
+    )
+    parser.add_argument(
+        '--prefetch',
+        nargs='?',
+        choices=prefetch.CLOSURES,
+        const='classpath',
+        metavar='CLOSURE',
+        help='Parse the classes reachable from the main class in one batch '
+             'before running it. "classpath" (default) follows the references '
+             'of classes on the class path, "all" of every class.'
+    )
+    parser.add_argument(
+        '--benchmark',
+        choices=benchmark.CLASS_SETS,
+        metavar='CLASS_SET',
+        help='Benchmark loading a set of classes in the JRE lib, one of '
+             f'{", ".join(benchmark.CLASS_SETS)}, output the report as '
+             'JSON, then exit.'
+    )
+    parser.add_argument(
+        '--benchmark-mode',
+        choices=benchmark.MODES,
+        default='parse',
+        help='"parse" parses each class file and decodes all of its code, '
+             '"load" loads and initializes each class.'
+    )
+    parser.add_argument(
+        '--benchmark-report',
+        metavar='FILE',
+        help='Write the benchmark report into FILE instead of stdout.'
+    )
+    parser.add_argument(
+        '--prefetch-threads',
+        type=int,
+        default=0,
+        metavar='N',
+        help='Parse the classes each loaded class refers to in N background '
+             'threads while the program runs, default 0 (off).'
+    )
+    parser.add_argument(
+        '--classpath',
+        help='Java class path, directories and JAR/zip files separated '
+             f'by "{os.pathsep}"'
+    )
+    parser.add_argument(
+        '--java-home',
+        help='Java home path, the runtime classes are loaded from its '
+             f'lib/{image.IMAGE_NAME} image if there is one, or else from its '
+             'lib directory. It can also be the path of an image.'
+    )
+    parser.add_argument(
+        '--pack-image',
+        metavar='FILE',
+        help='Pack the runtime classes of --java-home (default the JRE lib) '
+             'into the image FILE, then exit.'
+    )
     parser.add_argument('--java-library-path', help='Java libraqry path')
-    parser.add_argument('classname', help='Java class name')
-    return parser.parse_args()
+    parser.add_argument('classname', nargs='?', help='Java class name')
+    args = parser.parse_args()
+    if not args.classname and not (
+            args.preparse or args.benchmark or args.pack_image):
+        parser.error('the following arguments are required: classname')
+    if args.pack_image and args.java_home and os.path.isfile(args.java_home):
+        parser.error(
+            '--pack-image packs the lib directory of --java-home, '
+            f'{args.java_home} is already an image')
+    return args
 
 
 def init_logging(debug: bool):
@@ -45,18 +256,94 @@ def init_logging(debug: bool):
 if __name__ == "__main__":
     args = parse_argument()
     init_logging(args.debug)
+    if args.verbose_class or args.verbose_class_file:
+        class_trace.enable(args.verbose_class_file, args.verbose_class)
+    if args.trace_instructions or args.trace_only or args.trace_file:
+        instruction_trace.enable(
+            instruction_trace.JsonLinesSink(args.trace_file)
+            if args.trace_file else None,
+            args.trace_only
+        )
     class_loader.printclass = args.printclass
+    class_loader.class_parser = args.parser
+    attributes.loading_profile = args.load_profile
+    class_cache.enabled = not args.no_class_cache
+    class_cache.rebuild = args.rebuild_class_cache
+    class_cache.cache_dir = args.class_cache_dir
+    class_unloading.max_classes = args.max_classes
+    class_unloading.max_bytes = args.max_method_area_bytes
+    class_reload.enabled = args.rerun
+    thread.engine = args.engine
     logging.debug(args)
+    if args.java_home:
+        class_loader.jrelibpath = image.runtime_path(args.java_home)
+    if args.pack_image:
+        root = os.path.join(args.java_home, 'lib') if args.java_home else\
+            class_loader.jrelibpath
+        try:
+            count = image.pack(root, args.pack_image)
+        except ValueError as e:
+            sys.exit(f'Can not pack image: {e}')
+        print(f'Packed {count} classes under {root} into {args.pack_image}')
+        sys.exit(0)
+    if args.preparse:
+        report = preparse.preparse(args.preparse, args.jobs)
+        print(preparse.summary(report))
+        if args.preparse_report:
+            preparse.write_report(report, args.preparse_report)
+        sys.exit(1 if report['failures'] else 0)
+    if args.benchmark:
+        report = benchmark.run(args.benchmark, args.benchmark_mode)
+        if args.benchmark_report:
+            with open(args.benchmark_report, 'w') as out:
+                benchmark.write_report(report, out)
+        else:
+            benchmark.write_report(report, sys.stdout)
+        sys.exit(0)
     if args.classpath:
         class_loader.classpath = args.classpath
     else:
         class_loader.classpath = os.path.dirname(os.path.realpath(__file__))
     class_loader.java_home = args.java_home
     class_loader.java_library_path = args.java_library_path
+    if args.prefetch:
+        prefetch.prefetch(args.classname, args.prefetch, args.jobs)
+    if args.prefetch_threads > 0:
+        class_loader.prefetcher = prefetch.BackgroundPrefetcher(
+            args.prefetch_threads)
     logging.debug(
         f'Loading class {args.classname} from path {class_loader.classpath}')
-    class_struct = class_loader.load_class(args.classname)
-    main_thread = thread.Thread(
-        args.classname, 'main', '([Ljava/lang/String;)V', [''])
-    run_time_data.thread_pool.append(main_thread)
-    main_thread.run()
+    method_profiler = None
+    if args.profile or args.profile_file:
+        method_profiler = profiler.Profiler()
+        method_profiler.enable()
+    while True:
+        if args.classname not in run_time_data.method_area:
+            class_loader.load_class(args.classname)
+        main_thread = thread.Thread(
+            args.classname, 'main', '([Ljava/lang/String;)V', [''])
+        run_time_data.thread_pool.append(main_thread)
+        main_thread.run()
+        if not args.rerun:
+            break
+        run_time_data.thread_pool.remove(main_thread)
+        sys.stderr.write('Press Enter to run again, Ctrl-D to exit: ')
+        sys.stderr.flush()
+        if not sys.stdin.readline():
+            break
+        class_reload.reload_changed_classes()
+    if class_loader.prefetcher:
+        class_loader.prefetcher.close()
+    if instruction_trace.sink:
+        instruction_trace.disable()
+    if method_profiler:
+        method_profiler.disable()
+        if args.profile:
+            method_profiler.print_stats()
+        if args.profile_file:
+            method_profiler.dump_stats(args.profile_file)
+    if args.stats:
+        metrics.report(sys.stderr)
+        inline_cache.report(sys.stderr)
+    if args.memory_report:
+        footprint.report(run_time_data.method_area, sys.stderr)
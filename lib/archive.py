@@ -0,0 +1,106 @@
+'''Read members of a JAR or zip archive straight out of a memory map of the
+archive file, according to the .ZIP file format specification (APPNOTE).
+
+The central directory is read once into an index of member name to entry,
+so finding a member is a dict lookup. A stored (uncompressed) member is
+returned as a memoryview of the map, without any copy, and a deflated
+member is inflated from the map.
+'''
+import mmap
+import struct
+import zlib
+
+_EOCD_SIGNATURE = b'PK\x05\x06'
+_CENTRAL_SIGNATURE = 0x02014b50
+_LOCAL_SIGNATURE = 0x04034b50
+
+# signature, ..., disk entries, total entries, cd size, cd offset, comment len
+_EOCD = struct.Struct('<IHHHHIIH')
+# signature, versions, flags, method, time, date, crc, compressed size,
+# uncompressed size, name len, extra len, comment len, disk, attributes,
+# local header offset
+_CENTRAL = struct.Struct('<IHHHHHHIIIHHHHHII')
+# signature, version, flags, method, time, date, crc, compressed size,
+# uncompressed size, name len, extra len
+_LOCAL = struct.Struct('<IHHHHHIIIHH')
+
+STORED = 0
+DEFLATED = 8
+
+
+class ArchiveMember(object):
+    '''One member in the central directory of an archive'''
+
+    def __init__(self, name, method, crc, compressed_size,
+                 uncompressed_size, header_offset):
+        self.name = name
+        self.method = method
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.uncompressed_size = uncompressed_size
+        self.header_offset = header_offset
+
+
+class Archive(object):
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, 'rb') as archive_file:
+            self.map = mmap.mmap(
+                archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.entries = self._read_central_directory()
+
+    def _read_central_directory(self):
+        # The end of central directory record is followed by a comment of
+        # at most 65535 bytes
+        eocd = self.map.rfind(
+            _EOCD_SIGNATURE, max(0, len(self.map) - _EOCD.size - 0xFFFF))
+        if eocd < 0:
+            raise ValueError(f'{self.file_name} is not a zip archive.')
+        (_, _, _, _, total, cd_size, cd_offset, _) =\
+            _EOCD.unpack_from(self.map, eocd)
+        if total == 0xFFFF or cd_offset == 0xFFFFFFFF:
+            raise NotImplementedError(
+                f'ZIP64 archive {self.file_name} is not supported yet.')
+        entries = {}
+        offset = cd_offset
+        for _ in range(total):
+            (signature, _, _, flags, method, _, _, crc, compressed_size,
+             uncompressed_size, name_length, extra_length, comment_length,
+             _, _, _, header_offset) = _CENTRAL.unpack_from(self.map, offset)
+            if signature != _CENTRAL_SIGNATURE:
+                raise ValueError(
+                    f'Bad central directory entry in {self.file_name}.')
+            offset += _CENTRAL.size
+            name = self.map[offset:offset + name_length].decode(
+                'utf-8' if flags & 0x800 else 'cp437')
+            offset += name_length + extra_length + comment_length
+            entries[name] = ArchiveMember(
+                name, method, crc, compressed_size, uncompressed_size,
+                header_offset)
+        return entries
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def read(self, name):
+        '''Return the content of the member as a bytes-like object, a
+        memoryview of the archive map if the member is stored.
+        '''
+        entry = self.entries[name]
+        (signature, _, _, _, _, _, _, _, _, name_length, extra_length) =\
+            _LOCAL.unpack_from(self.map, entry.header_offset)
+        if signature != _LOCAL_SIGNATURE:
+            raise ValueError(
+                f'Bad local header of {name} in {self.file_name}.')
+        start = entry.header_offset + _LOCAL.size + name_length + extra_length
+        data = memoryview(self.map)[start:start + entry.compressed_size]
+        if entry.method == STORED:
+            return data
+        if entry.method == DEFLATED:
+            return zlib.decompress(data, -15, entry.uncompressed_size)
+        raise NotImplementedError(
+            f'Compression method {entry.method} of {name} in '
+            f'{self.file_name} is not supported.')
+
+    def names(self):
+        return self.entries.keys()
@@ -1,7 +1,9 @@
 import logging
 from lib import constant_pool
 from lib import instruction
+from lib import metrics
 from lib import read_bytes
+from lib import slotted
 
 
 SAME = 0
@@ -12,15 +14,26 @@ SAME_FRAME_EXTENDED = 251
 APPEND = 252
 FULL_FRAME = 255
 
+# Loading profile of the offset based parser. With 'fast', only attributes
+# the interpreter needs are parsed, the others just record their offset in
+# the class file and are parsed on the first access of their items.
+loading_profile = 'fast'
+loading_profiles = ('full', 'fast')
+ESSENTIAL_ATTRIBUTES = frozenset(('Code', 'ConstantValue', 'BootstrapMethods'))
+
 
 def parse(fd, class_file):
     '''Parse attributes
     '''
+    if metrics.timing:
+        metrics.enter('parse.attributes')
     count = read_bytes.read_u2_int(fd)
     attributes = []
     for _ in range(count):
         attr = parse_attr(fd, class_file)
         attributes.append(attr)
+    if metrics.timing:
+        metrics.leave()
     return (count, attributes)
 
 
@@ -29,26 +42,95 @@ def parse_attr(fd, class_file):
     length = read_bytes.read_u4_int(fd)
     name_constant = class_file.constant_pool[name_index]
     assert type(name_constant) == constant_pool.ConstantUtf8, 'Attribute name constant is not CONSTANT_Utf8_info.'
-    attribute_type = {
-        'ConstantValue': ConstantValueAttribute,
-        'Code': CodeAttribute,
-        'StackMapTable': StackMapTableAttribute,
-        'Exceptions': ExceptionsAttribute,
-        'BootstrapMethods': BootstrapMethodsAttribute
-    }.get(name_constant.value(), Attribute)
+    attribute_type = _attribute_type.get(name_constant.value(), Attribute)
     attr = attribute_type(name_constant.value(), length)
     attr.parse_info(fd, class_file)
     return attr
 
 
-class Attribute(object):
+def parse_from(buf, offset, class_file):
+    '''Parse attributes out of a bytes-like buffer, starting at offset.
+    Return the count, the attributes and the offset just after them.
+    '''
+    if metrics.timing:
+        metrics.enter('parse.attributes')
+    count = read_bytes.U2.unpack_from(buf, offset)[0]
+    offset += 2
+    attributes = []
+    for _ in range(count):
+        attr, offset = parse_attr_from(buf, offset, class_file)
+        attributes.append(attr)
+    if metrics.timing:
+        metrics.leave()
+    return (count, attributes, offset)
+
+
+def parse_attr_from(buf, offset, class_file):
+    name_index, length = read_bytes.U2_U4.unpack_from(buf, offset)
+    offset += 6
+    name_constant = class_file.constant_pool[name_index]
+    assert type(name_constant) == constant_pool.ConstantUtf8, 'Attribute name constant is not CONSTANT_Utf8_info.'
+    name = name_constant.value()
+    attr = _attribute_type.get(name, Attribute)(name, length)
+    if loading_profile == 'fast' and name not in ESSENTIAL_ATTRIBUTES:
+        attr.defer(offset, class_file)
+    else:
+        attr.parse_info_from(buf, offset, class_file)
+    return attr, offset + length
+
+
+class HexDump(object):
+    '''Bytes which are formatted as hex only when a log handler wants them'''
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return ' '.join('0x{:02X}'.format(i) for i in self.data)
+
+
+class Attribute(slotted.Slotted):
+    __slots__ = ('name', 'length', 'info', '_deferred')
+
     def __init__(self, name, length):
         self.name = name
         self.length = length
+        self._deferred = None
+
+    def defer(self, offset, class_file):
+        '''Only record the offset of the attribute info in the class file,
+        it's parsed by __getattr__ when any parsed item is asked for.
+        '''
+        self._deferred = (offset, class_file)
+        metrics.counters['attributes.deferred'] += 1
+
+    def __getattr__(self, item):
+        # Only reached for items which are not set yet
+        deferred = None
+        if item != '_deferred' and not item.startswith('__'):
+            deferred = self._deferred
+        if deferred is None:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{item}'")
+        offset, class_file = deferred
+        # Still deferred if the class file is changed
+        class_bytes = class_file.class_bytes()
+        self._deferred = None
+        if metrics.timing:
+            metrics.enter('parse.attributes')
+        self.parse_info_from(class_bytes, offset, class_file)
+        if metrics.timing:
+            metrics.leave()
+        metrics.counters['attributes.deferred_parsed'] += 1
+        return getattr(self, item)
 
     def parse_info(self, fd, class_file):
         self.info = fd.read(self.length)
 
+    def parse_info_from(self, buf, offset, class_file):
+        self.info = bytes(buf[offset:offset + self.length])
+
     def debug_info(self, prefix=''):
         logging.debug(prefix + 'Attribute name:' + str(self.name))
         logging.debug(prefix + 'Attribute length:' + str(self.length))
@@ -58,12 +140,44 @@ class Attribute(object):
 
 
 class ConstantValueAttribute(Attribute):
-    pass
+    __slots__ = ()
 
 
 class CodeAttribute(Attribute):
+    '''The code is only decoded into instructions on the first access of
+    instructions, most methods of a loaded class never run.
+    '''
+    __slots__ = (
+        'max_stack',
+        'max_locals',
+        'code_length',
+        'code',
+        'exception_table_length',
+        'exception_table',
+        'attributes_count',
+        'attributes',
+        '_instructions',
+        # Compiled by the threaded engine, see lib/threaded.py
+        'handlers',
+    )
+
+    def __getstate__(self):
+        # Handlers are closures, they are compiled again
+        state = super().__getstate__()
+        state['handlers'] = None
+        return state
+
+    @property
+    def instructions(self):
+        if self._instructions is None:
+            self.code_to_instructions()
+        return self._instructions
+
     def code_to_instructions(self):
-        self.instructions = [None for _ in range(self.code_length)]
+        metrics.counters['methods.decoded'] += 1
+        if metrics.timing:
+            metrics.enter('parse.code_to_instructions')
+        self._instructions = [None for _ in range(self.code_length)]
         pos = 0
         while pos < self.code_length:
             opcode = self.code[pos]
@@ -79,8 +193,10 @@ class CodeAttribute(Attribute):
             operands_end = operands_start + inst.len_of_operand()
             operands = bytes(self.code[operands_start:operands_end])
             inst.put_operands(operands)
-            self.instructions[pos] = inst
+            self._instructions[pos] = inst
             pos = operands_end
+        if metrics.timing:
+            metrics.leave()
 
     def parse_info(self, fd, class_file):
         self.max_stack = read_bytes.read_u2_int(fd)
@@ -97,14 +213,34 @@ class CodeAttribute(Attribute):
             self.exception_table.append(
                 (start_pc, end_pc, handler_pc, catch_type))
         (self.attributes_count, self.attributes) = parse(fd, class_file)
-        self.code_to_instructions()
+        self._instructions = None
+        self.handlers = None
+
+    def parse_info_from(self, buf, offset, class_file):
+        self.max_stack, self.max_locals, self.code_length =\
+            read_bytes.U2_U2_U4.unpack_from(buf, offset)
+        offset += 8
+        self.code = bytes(buf[offset:offset + self.code_length])
+        offset += self.code_length
+        self.exception_table_length = read_bytes.U2.unpack_from(
+            buf, offset)[0]
+        offset += 2
+        self.exception_table = []
+        for _ in range(self.exception_table_length):
+            self.exception_table.append(
+                read_bytes.U2_U2_U2_U2.unpack_from(buf, offset))
+            offset += 8
+        (self.attributes_count, self.attributes, offset) =\
+            parse_from(buf, offset, class_file)
+        self._instructions = None
+        self.handlers = None
 
     def debug_info(self, prefix=''):
         super().debug_info(prefix)
         logging.debug(prefix + 'max stack:' + str(self.max_stack))
         logging.debug(prefix + 'max locals:' + str(self.max_locals))
         logging.debug(prefix + 'code length:' + str(self.code_length))
-        logging.debug(prefix + 'code: ' + ' '.join('0x{:02X}'.format(i) for i in self.code))
+        logging.debug('%scode: %s', prefix, HexDump(self.code))
         logging.debug(prefix + 'attribute count:' + str(self.attributes_count))
         for attr in self.attributes:
             attr.debug_info(prefix + '       - ')
@@ -115,6 +251,8 @@ class StackMapTableAttribute(Attribute):
     verification by type checking, which maybe means, I can ignore
     it now.
     '''
+    __slots__ = ('number_of_entries', 'stack_map_frame_entries')
+
     def parse_info(self, fd, class_file):
         self.number_of_entries = read_bytes.read_u2_int(fd)
         self.stack_map_frame_entries = []
@@ -122,6 +260,14 @@ class StackMapTableAttribute(Attribute):
             frame = parse_stack_map_frame(fd)
             self.stack_map_frame_entries.append(frame)
 
+    def parse_info_from(self, buf, offset, class_file):
+        self.number_of_entries = read_bytes.U2.unpack_from(buf, offset)[0]
+        offset += 2
+        self.stack_map_frame_entries = []
+        for _ in range(self.number_of_entries):
+            frame, offset = parse_stack_map_frame_from(buf, offset)
+            self.stack_map_frame_entries.append(frame)
+
     def debug_info(self, prefix=''):
         super().debug_info(prefix)
         logging.debug(prefix + 'Num of entries:' + str(self.number_of_entries))
@@ -130,11 +276,20 @@ class StackMapTableAttribute(Attribute):
 
 
 class ExceptionsAttribute(Attribute):
-    pass
+    __slots__ = ()
 
 
 class BootstrapMethodsAttribute(Attribute):
-    pass
+    __slots__ = ()
+
+
+_attribute_type = {
+    'ConstantValue': ConstantValueAttribute,
+    'Code': CodeAttribute,
+    'StackMapTable': StackMapTableAttribute,
+    'Exceptions': ExceptionsAttribute,
+    'BootstrapMethods': BootstrapMethodsAttribute
+}
 
 
 class StackMapFrame(object):
@@ -145,6 +300,9 @@ class StackMapFrame(object):
     def parse(self, fd):
         raise NotImplementedError('Parse not implemented for generic stack map frame.')
 
+    def parse_from(self, buf, offset):
+        raise NotImplementedError('Parse not implemented for generic stack map frame.')
+
     def debug_info(self, prefix):
         logging.debug(prefix + type(self).__name__ + ', offset delta {offset}'.format(offset=self.offset_delta))
 
@@ -160,6 +318,9 @@ class SameFrame(StackMapFrame):
     def parse(self, fd):
         pass
 
+    def parse_from(self, buf, offset):
+        return offset
+
 
 class SameLocals1StackItemFrame(StackMapFrame):
     def __init__(self, frame_type):
@@ -172,6 +333,11 @@ class SameLocals1StackItemFrame(StackMapFrame):
     def parse(self, fd):
         self.verification_type_info = parse_verification_type_info(fd)
 
+    def parse_from(self, buf, offset):
+        self.verification_type_info, offset =\
+            parse_verification_type_info_from(buf, offset)
+        return offset
+
 
 class SameLocals1StackItemFrameExtended(StackMapFrame):
     def __init__(self, frame_type):
@@ -181,6 +347,12 @@ class SameLocals1StackItemFrameExtended(StackMapFrame):
         self.offset_delta = read_bytes.read_u2_int(fd)
         self.verification_type_info = parse_verification_type_info(fd)
 
+    def parse_from(self, buf, offset):
+        self.offset_delta = read_bytes.U2.unpack_from(buf, offset)[0]
+        self.verification_type_info, offset =\
+            parse_verification_type_info_from(buf, offset + 2)
+        return offset
+
 
 class ChopFrame(StackMapFrame):
     def __init__(self, frame_type):
@@ -190,6 +362,10 @@ class ChopFrame(StackMapFrame):
     def parse(self, fd):
         self.offset_delta = read_bytes.read_u2_int(fd)
 
+    def parse_from(self, buf, offset):
+        self.offset_delta = read_bytes.U2.unpack_from(buf, offset)[0]
+        return offset + 2
+
 
 class SameFrameExtended(StackMapFrame):
     def __init__(self, frame_type):
@@ -198,6 +374,10 @@ class SameFrameExtended(StackMapFrame):
     def parse(self, fd):
         self.offset_delta = read_bytes.read_u2_int(fd)
 
+    def parse_from(self, buf, offset):
+        self.offset_delta = read_bytes.U2.unpack_from(buf, offset)[0]
+        return offset + 2
+
 
 class AppendFrame(StackMapFrame):
     def __init__(self, frame_type):
@@ -211,6 +391,15 @@ class AppendFrame(StackMapFrame):
             v_type_info = parse_verification_type_info(fd)
             self.locals.append(v_type_info)
 
+    def parse_from(self, buf, offset):
+        self.offset_delta = read_bytes.U2.unpack_from(buf, offset)[0]
+        offset += 2
+        for _ in range(self.num_of_additional):
+            v_type_info, offset = parse_verification_type_info_from(
+                buf, offset)
+            self.locals.append(v_type_info)
+        return offset
+
 
 class FullFrame(StackMapFrame):
     def __init__(self, frame_type):
@@ -229,6 +418,23 @@ class FullFrame(StackMapFrame):
             v_type_info = parse_verification_type_info(fd)
             self.stack.append(v_type_info)
 
+    def parse_from(self, buf, offset):
+        self.offset_delta, self.number_of_locals =\
+            read_bytes.U2_U2.unpack_from(buf, offset)
+        offset += 4
+        for _ in range(self.number_of_locals):
+            v_type_info, offset = parse_verification_type_info_from(
+                buf, offset)
+            self.locals.append(v_type_info)
+        self.number_of_stack_items = read_bytes.U2.unpack_from(
+            buf, offset)[0]
+        offset += 2
+        for _ in range(self.number_of_stack_items):
+            v_type_info, offset = parse_verification_type_info_from(
+                buf, offset)
+            self.stack.append(v_type_info)
+        return offset
+
 
 _frame_type = {
     SAME: SameFrame,
@@ -298,3 +504,32 @@ def parse_verification_type_info(fd):
         offset = read_bytes.read_u2_int(fd)
         return (tag, offset)
     raise ValueError('Invalid verification_type_info tag value {0}'.format(tag))
+
+
+def parse_stack_map_frame_from(buf, offset):
+    frame_type = buf[offset]
+    cvt_type = _convert_frame_type(frame_type)
+    frame_class = _frame_type[cvt_type]
+    frame = frame_class(frame_type)
+    offset = frame.parse_from(buf, offset + 1)
+    return frame, offset
+
+
+def parse_verification_type_info_from(buf, offset):
+    tag = buf[offset]
+    offset += 1
+    if tag in (
+        ITEM_Top,
+        ITEM_Integer,
+        ITEM_Float,
+        ITEM_Null,
+        ITEM_UninitializedThis,
+        ITEM_Long,
+        ITEM_Double
+    ):
+        return (tag, None), offset
+    if tag in (ITEM_Object, ITEM_Uninitialized):
+        # cpool_index for ITEM_Object, offset for ITEM_Uninitialized
+        value = read_bytes.U2.unpack_from(buf, offset)[0]
+        return (tag, value), offset + 2
+    raise ValueError('Invalid verification_type_info tag value {0}'.format(tag))
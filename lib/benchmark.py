@@ -0,0 +1,178 @@
+'''Benchmark class loading over a fixed set of classes, to compare parser
+changes and to catch regressions in start up time.
+
+A class set is parsed with class_loader.parse ("parse" mode, which also
+decodes the code of every method), or loaded with class_loader.load_class
+("load" mode, which includes class initialization and the classes it
+loads). The class cache is turned off for the run. The report is a dict
+which is written as JSON.
+'''
+import contextlib
+import io
+import json
+import logging
+import os
+import time
+from lib import attributes
+from lib import class_cache
+from lib import class_loader
+from lib import metrics
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Classes which are loaded when the VM starts up
+BOOTSTRAP_CLASSES = (
+    'java/lang/Object',
+    'java/lang/String',
+    'java/lang/System',
+    'java/lang/Class',
+    'java/lang/ClassLoader',
+    'java/lang/Thread',
+    'java/lang/ThreadGroup',
+    'java/lang/Throwable',
+    'java/lang/Error',
+    'java/lang/Exception',
+    'java/lang/RuntimeException',
+    'java/lang/Integer',
+    'java/lang/Long',
+    'java/lang/Character',
+    'java/lang/Math',
+    'java/lang/StringBuilder',
+    'java/lang/AbstractStringBuilder',
+    'java/lang/ref/Reference',
+    'java/lang/ref/SoftReference',
+    'java/lang/ref/WeakReference',
+    'java/lang/reflect/Method',
+    'java/lang/reflect/Field',
+    'java/lang/reflect/Constructor',
+    'java/util/HashMap',
+    'java/util/ArrayList',
+    'java/util/Hashtable',
+    'java/util/Properties',
+    'java/util/Vector',
+    'java/io/PrintStream',
+    'java/io/FileDescriptor',
+    'java/io/FileInputStream',
+    'java/io/FileOutputStream',
+    'java/io/BufferedOutputStream',
+    'java/io/OutputStreamWriter',
+    'sun/misc/Unsafe',
+    'sun/misc/VM',
+    'java/security/AccessController',
+)
+
+CLASS_SETS = ('bootstrap', 'java/lang', 'all')
+MODES = ('parse', 'load')
+PHASES = (
+    'constant_pool',
+    'fields',
+    'methods',
+    'attributes',
+    'code_to_instructions',
+)
+
+
+def class_names(class_set, root=None):
+    '''Return the names of the classes in class_set, found under root'''
+    root = root or class_loader.jrelibpath
+    if class_set == 'bootstrap':
+        return list(BOOTSTRAP_CLASSES)
+    top = root if class_set == 'all' else os.path.join(root, class_set)
+    names = []
+    for dirpath, _, filenames in os.walk(top):
+        for filename in filenames:
+            if filename.endswith('.class'):
+                file_name = os.path.join(dirpath, filename)
+                names.append(
+                    os.path.relpath(file_name, root)[:-len('.class')]
+                    .replace(os.sep, '/'))
+    return sorted(names)
+
+
+def _parse_class(classname, root):
+    class_struct = class_loader.parse(
+        os.path.join(root, classname + '.class'))
+    for method in class_struct.methods:
+        code = method.code()
+        if code:
+            code.instructions
+    return class_struct
+
+
+def _load_class(classname, root):
+    # Classes which are not in the set, but loaded by class initialization,
+    # are counted in the report as well
+    assert class_loader.load_class(classname),\
+        f'Load class {classname} fail.'
+
+
+def peak_rss_kb():
+    '''Peak resident set size of this process in KiB, None if unknown'''
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(class_set, mode='parse', root=None):
+    '''Benchmark loading class_set, and return the report as a dict'''
+    root = root or class_loader.jrelibpath
+    names = class_names(class_set, root)
+    benchmark_class = _parse_class if mode == 'parse' else _load_class
+    saved = (class_cache.enabled, metrics.timing, metrics.counters.copy(),
+             logging.root.manager.disable)
+    class_cache.enabled = False
+    metrics.timing = True
+    metrics.counters.clear()
+    # Failures are collected into the report, don't time the output of them
+    logging.disable(logging.WARNING)
+    failures = []
+    start = time.perf_counter()
+    try:
+        # Interpreted class initialization prints on stdout, which is not
+        # part of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            for classname in names:
+                try:
+                    benchmark_class(classname, root)
+                except Exception as e:
+                    metrics.abandon_phases()
+                    failures.append({
+                        'class': classname,
+                        'error': f'{type(e).__name__}: {e}'
+                    })
+        wall = time.perf_counter() - start
+        counters = metrics.counters.copy()
+    finally:
+        (class_cache.enabled, metrics.timing, old_counters,
+         disabled_level) = saved
+        metrics.counters.clear()
+        metrics.counters.update(old_counters)
+        logging.disable(disabled_level)
+    parsed = counters['classes.parsed']
+    parsed_bytes = counters['classes.parsed_bytes']
+    return {
+        'class_set': class_set,
+        'mode': mode,
+        'parser': class_loader.class_parser,
+        'load_profile': attributes.loading_profile,
+        'classes': len(names),
+        'classes_parsed': parsed,
+        'bytes_parsed': parsed_bytes,
+        'failures': len(failures),
+        'wall_seconds': wall,
+        'classes_per_second': parsed / wall if wall else 0.0,
+        'mb_per_second': parsed_bytes / wall / 1e6 if wall else 0.0,
+        'peak_rss_kb': peak_rss_kb(),
+        'phase_seconds': {
+            phase: counters[f'parse.{phase}_seconds'] for phase in PHASES
+        },
+        'failed': failures,
+    }
+
+
+def write_report(report, out):
+    json.dump(report, out, indent=2)
+    out.write('\n')
@@ -0,0 +1,101 @@
+'''Persistent on-disk cache of parsed classes.
+
+Every entry is a pickled ClassStruct, with its method code already decoded
+into instructions, stored under cache_dir. An entry is keyed by the class
+file path and validated against a stamp of the file (mtime and size), so a
+changed class file is parsed again and its entry rebuilt. The cache
+directory is versioned by CACHE_VERSION and a fingerprint of the lib
+sources, so entries pickled by another version of jedy are never used.
+'''
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+from lib import metrics
+
+CACHE_VERSION = 1
+
+enabled = False
+# Ignore existing entries, parse every class again and overwrite its entry
+rebuild = False
+cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'jedy')
+
+
+def _lib_fingerprint():
+    lib_dir = os.path.dirname(os.path.realpath(__file__))
+    digest = hashlib.sha1(f'{sys.version_info[:2]}'.encode())
+    for name in sorted(os.listdir(lib_dir)):
+        if name.endswith('.py'):
+            stat = os.stat(os.path.join(lib_dir, name))
+            digest.update(f'{name}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+    return digest.hexdigest()[:12]
+
+
+_version_dir = f'v{CACHE_VERSION}-{_lib_fingerprint()}'
+
+
+def file_stamp(file_name):
+    stat = os.stat(file_name)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def entry_path(key):
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(cache_dir, _version_dir, digest[:2], digest)
+
+
+def load(key, stamp):
+    '''Return the cached ClassStruct for key, or None if there is no valid
+    entry for the stamp.
+    '''
+    if rebuild:
+        metrics.counters['class_cache.miss'] += 1
+        return None
+    try:
+        with open(entry_path(key), 'rb') as entry:
+            entry_key, entry_stamp, class_struct = pickle.load(entry)
+    except FileNotFoundError:
+        metrics.counters['class_cache.miss'] += 1
+        return None
+    except Exception as e:
+        logging.warning(f'Drop broken class cache entry of {key}: {e}')
+        metrics.counters['class_cache.error'] += 1
+        return None
+    if entry_key != key or entry_stamp != stamp:
+        metrics.counters['class_cache.miss'] += 1
+        metrics.counters['class_cache.stale'] += 1
+        return None
+    metrics.counters['class_cache.hit'] += 1
+    return class_struct
+
+
+def store(key, stamp, class_struct):
+    '''Decode the code of all methods and write class_struct as the entry
+    of key. Failures are logged, a missing entry only costs a parse.
+    '''
+    for method in class_struct.methods:
+        code = method.code()
+        if code:
+            code.instructions
+    path = entry_path(key)
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as entry:
+            pickle.dump(
+                (key, stamp, class_struct),
+                entry,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        # Readers never see a partially written entry
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.warning(f'Can not write class cache entry of {key}: {e}')
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        metrics.counters['class_cache.error'] += 1
+        return
+    metrics.counters['class_cache.store'] += 1
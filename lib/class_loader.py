@@ -1,12 +1,21 @@
 '''Parse JVM class file, according JAVA SE 8 spec
 '''
-import os
+import io
+import mmap
 import logging
+import time
 from lib import (
     attributes,
+    class_cache,
+    class_reload,
+    class_trace,
+    class_unloading,
+    classpath as class_path,
     constant_pool,
+    metrics,
     read_bytes,
     run_time_data,
+    slotted,
     thread
 )
 from lib.hijack_jre_methods import get_jdk_method
@@ -16,17 +25,49 @@ jrelibpath = './openjdk_jre/lib'
 java_home = ''
 java_library_path = ''
 printclass = False
+class_parser = 'mmap'
 
 local_variable_callbacks = {}
 
+# Classes which are parsed ahead by lib/prefetch.py, but not loaded yet
+prefetched = {}
+# The BackgroundPrefetcher of lib/prefetch.py, if it's on
+prefetcher = None
 
-class ClassStruct(object):
+_class_path = None
+
+
+class ClassStruct(slotted.Slotted):
     '''Store compiled class structures such as the run-time
     constant pool, field and method data, and the code for
     methods and constructors, including the special methods
     used in class and instance initialization and interface
     initialization.
     '''
+    __slots__ = (
+        'magic',
+        'minor_version',
+        'major_version',
+        'constant_pool',
+        'access_flags',
+        'this_class',
+        'super_class',
+        'interfaces_count',
+        'interfaces',
+        'fields_count',
+        'fields',
+        'methods_count',
+        'methods',
+        'attributes_count',
+        'attributes',
+        'class_file_size',
+        'source',
+        'source_stamp',
+        '_class_bytes',
+        'vtable',
+        'vtable_index',
+        'itables',
+    )
 
     def __init__(self):
         self.magic = 0
@@ -44,10 +85,77 @@ class ClassStruct(object):
         self.methods = []
         self.attributes_count = 0
         self.attributes = []
+        self.class_file_size = 0
+        # Where the class file is read from, see lib/classpath.py
+        self.source = None
+        # Stamp of the source when the class is parsed, see class_bytes
+        self.source_stamp = None
+        self._class_bytes = None
+        # Method tables, which refer to other classes, see link
+        self.vtable = None
+        self.vtable_index = None
+        self.itables = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_class_bytes'] = None
+        state['vtable'] = None
+        state['vtable_index'] = None
+        state['itables'] = None
+        return state
+
+    def class_bytes(self):
+        '''The content of the class file, for parsing deferred attributes.
+        Their offsets are only valid in the class file which is parsed, a
+        ValueError is raised if it's changed since.
+        '''
+        if self._class_bytes is None:
+            assert self.source, f'Unknown source of class {self.name()}'
+            if self.source_stamp is not None:
+                try:
+                    stamp = self.source.stamp()
+                except OSError:
+                    stamp = None
+                if stamp != self.source_stamp:
+                    raise ValueError(
+                        f'Class file {self.source} of {self.name()} is '
+                        'changed since it was parsed, its deferred '
+                        'attributes can not be parsed.')
+            self._class_bytes = self.source.read()
+        return self._class_bytes
 
     def name(self):
         return self.constant_pool.get_constant_class_name(self.this_class)
 
+    def resolve_class(self, index):
+        '''The class which the CONSTANT_Class_info entry at index of the
+        constant pool names, loaded if it's not. Classes and methods which
+        are resolved are linked in the constant pool, until a class is
+        unloaded, see lib/class_unloading.py.
+        '''
+        linked = self.constant_pool.linked.get(index, None)
+        if linked is not None and linked[0] == class_unloading.generation:
+            return linked[1]
+        klass = run_time_data.method_area[
+            self.constant_pool.get_constant_class_name(index)]
+        self.constant_pool.linked[index] = (class_unloading.generation, klass)
+        return klass
+
+    def resolve_method(self, index):
+        '''(class, method) of the method reference at index of the constant
+        pool, the method is looked up in the named class only, it's None if
+        the class doesn't declare it.
+        '''
+        linked = self.constant_pool.linked.get(index, None)
+        if linked is not None and linked[0] == class_unloading.generation:
+            return linked[1]
+        ref = self.constant_pool.method_ref(index)
+        klass = run_time_data.method_area[ref.class_name]
+        resolved = (klass, klass.get_method(ref.name, ref.descriptor))
+        self.constant_pool.linked[index] =\
+            (class_unloading.generation, resolved)
+        return resolved
+
     def get_field(self, field):
         return (
             self.constant_pool[field.name_index].value(),
@@ -66,42 +174,91 @@ class ClassStruct(object):
                 return method
         return None
 
-    def method_resolution(self, method_name, method_description):
-        klass = self
-        while True:
-            if not klass:
-                return None, None
-            for method in klass.methods:
-                name_const = klass.constant_pool[method.name_index]
-                assert type(name_const) is constant_pool.ConstantUtf8,\
-                    f'Method {method_name} name_index in constant_pool is'\
-                    ' not CONSTANT_Utf8_info'
-                name = name_const.value()
-                descriptor = method.descriptor
-                if name == method_name and descriptor == method_description:
-                    # Method resolved, return
-                    return klass, method
-            klass = klass.get_super_class()
-        return None, None
+    def link(self):
+        '''Build the method tables of the class, once, and return its vtable.
+
+        vtable is the list of (class, method) of the instance methods which
+        objects of the class invoke. It starts with the vtable of the super
+        class, a method which the class declares takes the slot of the one
+        it overrides, so a method has the same slot in every subclass.
+        vtable_index maps (name, descriptor) to the slot. The methods which
+        no class declares are selected from the default methods of the
+        superinterfaces, the class is None if there are more than one of
+        them. The vtable of an interface is its methods and those of its
+        superinterfaces.
+
+        itables maps the name of every superinterface of a class to the
+        (class, method) which is selected for each slot of the vtable of
+        the interface, None if the class has no implementation.
+
+        The tables refer to the super classes and superinterfaces, which
+        are never evicted while the class is loaded, see
+        lib/class_unloading.py.
+        '''
+        if self.vtable is not None:
+            return self.vtable
+        super_class = self.get_super_class()
+        interface = self.access_flags.interface()
+        if super_class and not interface:
+            vtable = list(super_class.link())
+            vtable_index = dict(super_class.vtable_index)
+        else:
+            vtable, vtable_index = [], {}
+
+        def put(key, entry):
+            slot = vtable_index.get(key, None)
+            if slot is None:
+                vtable_index[key] = len(vtable)
+                vtable.append(entry)
+            else:
+                vtable[slot] = entry
+
+        for method in self.methods:
+            if not method.access_flags.static() and\
+                    method.method_name.value() not in ('<init>', '<clinit>'):
+                put((method.method_name.value(), method.descriptor),
+                    (self, method))
+        superinterfaces = self.all_superinterfaces()
+        if interface:
+            for superinterface in superinterfaces:
+                for key, slot in superinterface.link_index().items():
+                    if key not in vtable_index:
+                        put(key, superinterface.vtable[slot])
+        else:
+            for key, entry in _default_methods(
+                    superinterfaces, vtable, vtable_index).items():
+                put(key, entry)
+        self.vtable = vtable
+        self.vtable_index = vtable_index
+        itables = {}
+        if not interface:
+            for superinterface in superinterfaces:
+                itable = [None] * len(superinterface.link())
+                for key, slot in superinterface.vtable_index.items():
+                    own_slot = vtable_index.get(key, None)
+                    if own_slot is not None:
+                        itable[slot] = vtable[own_slot]
+                itables[superinterface.name()] = itable
+        self.itables = itables
+        metrics.counters['classes.linked'] += 1
+        return vtable
+
+    def link_index(self):
+        '''vtable_index of the class, which is linked if it's not'''
+        self.link()
+        return self.vtable_index
 
     def interface_resolution(self, method_name, method_description):
-        resolved_class, resolved_method = self.method_resolution(
-            method_name, method_description
-        )
-        if resolved_class and resolved_method:
-            return resolved_class, resolved_method
-        counter = 0
-        klass, method = None, None
-        for interface in self.superinterfaces():
-            klass = interface
-            method = interface.get_method(method_name, method_description)
-            if method:
-                counter += 1
-        if counter == 0:
+        '''(class, method) which objects of the class invoke, looked up in
+        the vtable by name and descriptor
+        '''
+        slot = self.link_index().get((method_name, method_description), None)
+        if slot is None:
             assert False, f'Method {method_name} not found implementation.'
-        elif counter != 1:
+        klass, method = self.vtable[slot]
+        if klass is None:
             assert False, \
-                f'Found {counter} {method_name} in superinterfaces.'
+                f'Found more than one {method_name} in superinterfaces.'
         return klass, method
 
     def method_name(self, method):
@@ -111,15 +268,28 @@ class ClassStruct(object):
         if self.super_class == 0:
             # No super class
             return None
-        return run_time_data.method_area[
-            self.constant_pool.get_constant_class_name(self.super_class)
-        ]
+        return self.resolve_class(self.super_class)
 
     def superinterfaces(self):
         for i in self.interfaces:
-            yield run_time_data.method_area[
-                self.constant_pool.get_constant_class_name(i)
-            ]
+            yield self.resolve_class(i)
+
+    def all_superinterfaces(self):
+        '''The interfaces which the class and its super classes implement,
+        and their superinterfaces, each once, nearest first
+        '''
+        found = {}
+        klass = self
+        while klass:
+            pending = list(klass.superinterfaces())
+            while pending:
+                interface = pending.pop(0)
+                name = interface.name()
+                if name not in found:
+                    found[name] = interface
+                    pending.extend(interface.superinterfaces())
+            klass = klass.get_super_class()
+        return list(found.values())
 
     def validate(self):
         '''Valid if class struct according to spec
@@ -129,7 +299,8 @@ class ClassStruct(object):
         pass
 
     def debug_info(self):
-        if not printclass:
+        if not printclass or not logging.getLogger().isEnabledFor(
+                logging.DEBUG):
             return
         logging.debug('Class file info')
         logging.debug('Magic number: 0x{:X}'.format(self.magic))
@@ -170,6 +341,45 @@ class ClassStruct(object):
             attr.debug_info()
 
 
+def _default_methods(superinterfaces, vtable, vtable_index):
+    '''{(name, descriptor): (interface, method)} of the default methods of
+    superinterfaces which a class selects, for the methods which no class
+    in vtable declares. A default method is selected if it's the only one of
+    the maximally-specific methods, which no subinterface declares again.
+    '''
+    declared = {}
+    for interface in superinterfaces:
+        for method in interface.methods:
+            flags = method.access_flags
+            if flags.static() or flags.private():
+                continue
+            key = (method.method_name.value(), method.descriptor)
+            slot = vtable_index.get(key, None)
+            if slot is not None and vtable[slot][0] is not None and\
+                    not vtable[slot][0].access_flags.interface():
+                continue
+            declared.setdefault(key, []).append((interface, method))
+    defaults = {}
+    for key, candidates in declared.items():
+        if len(candidates) > 1:
+            subinterfaces = [
+                {superinterface.name()
+                 for superinterface in interface.all_superinterfaces()}
+                for interface, _ in candidates]
+            candidates = [
+                (interface, method) for interface, method in candidates
+                if not any(interface.name() in names
+                           for names in subinterfaces)]
+        candidates = [
+            (interface, method) for interface, method in candidates
+            if not method.access_flags.abstract()]
+        if len(candidates) == 1:
+            defaults[key] = candidates[0]
+        elif candidates:
+            defaults[key] = (None, None)
+    return defaults
+
+
 class BootstrapClassLoader(object):
     '''Class for parse and store a JAVA class file
     '''
@@ -184,83 +394,202 @@ class BootstrapClassLoader(object):
             f'Magic number ({class_struct.magic}) in class file is wrong'
         class_struct.minor_version = read_bytes.read_u2_int(fd)
         class_struct.major_version = read_bytes.read_u2_int(fd)
+        if metrics.timing:
+            metrics.enter('parse.constant_pool')
         class_struct.constant_pool = constant_pool.parse(fd)
-        class_struct.access_flags = AccessFlags()
-        class_struct.access_flags.parse(fd)
+        if metrics.timing:
+            metrics.leave()
+        class_struct.access_flags = AccessFlags.of(read_bytes.read_u2_int(fd))
         class_struct.this_class = read_bytes.read_u2_int(fd)
         class_struct.super_class = read_bytes.read_u2_int(fd)
         class_struct.interfaces_count = read_bytes.read_u2_int(fd)
         for _ in range(class_struct.interfaces_count):
             class_struct.interfaces.append(read_bytes.read_u2_int(fd))
+        if metrics.timing:
+            metrics.enter('parse.fields')
         class_struct.fields_count = read_bytes.read_u2_int(fd)
         for _ in range(class_struct.fields_count):
             field = Field()
             field.parse(fd, class_struct)
             class_struct.fields.append(field)
+        if metrics.timing:
+            metrics.leave()
+            metrics.enter('parse.methods')
         class_struct.methods_count = read_bytes.read_u2_int(fd)
         for _ in range(class_struct.methods_count):
             method = Method()
             method.parse(fd, class_struct)
             class_struct.methods.append(method)
+        if metrics.timing:
+            metrics.leave()
         (class_struct.attributes_count, class_struct.attributes) =\
             attributes.parse(fd, class_struct)
         assert len(fd.read(1)) == 0,\
             'Class file is finish parsed, but still data left in tail.'
         class_struct.validate()
+        class_struct.class_file_size = fd.tell()
+        metrics.counters['classes.parsed'] += 1
+        metrics.counters['classes.parsed_bytes'] += fd.tell()
         return class_struct
 
+    def parse_file(self, file_name) -> ClassStruct:
+        with open(file_name, 'rb') as java_class_file:
+            return self.parse(java_class_file)
+
+    def parse_data(self, data, source=None) -> ClassStruct:
+        return self.parse(io.BytesIO(data))
 
-class _GenericAccessFlags(object):
-    '''Generic part for access_flags item for class, interface, field and method
+
+class MappedClassLoader(BootstrapClassLoader):
+    '''Parse a JAVA class file out of a bytes-like object (bytes, memoryview
+    or mmap) with offset based struct.unpack_from, instead of reading every
+    item from a file object. parse_file maps the whole class file into
+    memory, so there is no read call per item.
     '''
 
-    def __init__(self):
-        self._flags = 0
+    def parse(self, data, source=None) -> ClassStruct:
+        '''Parse the class file in data. Deferred attributes are parsed from
+        source later, without a source data is kept if it's bytes or copied.
+        '''
+        if source is None and attributes.loading_profile == 'fast':
+            source = class_path.BytesSource(
+                data if type(data) is bytes else bytes(data))
+        buf = memoryview(data)
+        try:
+            return self._parse(buf, source)
+        finally:
+            buf.release()
+
+    def _parse(self, buf, source) -> ClassStruct:
+        class_struct = ClassStruct()
+        class_struct.source = source
+        if source is not None:
+            class_struct.source_stamp = source.stamp()
+        (class_struct.magic,
+         class_struct.minor_version,
+         class_struct.major_version) = read_bytes.U4_U2_U2.unpack_from(buf, 0)
+        assert class_struct.magic == 0xCAFEBABE,\
+            f'Magic number ({class_struct.magic}) in class file is wrong'
+        if metrics.timing:
+            metrics.enter('parse.constant_pool')
+        class_struct.constant_pool, offset = constant_pool.parse_from(buf, 8)
+        if metrics.timing:
+            metrics.leave()
+        (access_flags,
+         class_struct.this_class,
+         class_struct.super_class,
+         class_struct.interfaces_count) =\
+            read_bytes.U2_U2_U2_U2.unpack_from(buf, offset)
+        offset += 8
+        class_struct.access_flags = AccessFlags.of(access_flags)
+        class_struct.interfaces = list(read_bytes.unpack_u2_array(
+            buf, offset, class_struct.interfaces_count))
+        offset += 2 * class_struct.interfaces_count
+        if metrics.timing:
+            metrics.enter('parse.fields')
+        class_struct.fields_count = read_bytes.U2.unpack_from(buf, offset)[0]
+        offset += 2
+        for _ in range(class_struct.fields_count):
+            field = Field()
+            offset = field.parse_from(buf, offset, class_struct)
+            class_struct.fields.append(field)
+        if metrics.timing:
+            metrics.leave()
+            metrics.enter('parse.methods')
+        class_struct.methods_count = read_bytes.U2.unpack_from(buf, offset)[0]
+        offset += 2
+        for _ in range(class_struct.methods_count):
+            method = Method()
+            offset = method.parse_from(buf, offset, class_struct)
+            class_struct.methods.append(method)
+        if metrics.timing:
+            metrics.leave()
+        (class_struct.attributes_count, class_struct.attributes, offset) =\
+            attributes.parse_from(buf, offset, class_struct)
+        assert offset == len(buf),\
+            'Class file is finish parsed, but still data left in tail.'
+        class_struct.validate()
+        class_struct.class_file_size = offset
+        metrics.counters['classes.parsed'] += 1
+        metrics.counters['classes.parsed_bytes'] += offset
+        return class_struct
+
+    def parse_file(self, file_name) -> ClassStruct:
+        with open(file_name, 'rb') as java_class_file:
+            with mmap.mmap(
+                java_class_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                return self.parse(data, class_path.FileSource(file_name))
+
+    def parse_data(self, data, source=None) -> ClassStruct:
+        return self.parse(data, source)
+
+
+class _GenericAccessFlags(int):
+    '''Generic part for access_flags item for class, interface, field and
+    method. The flags are a plain int, so one object is shared by all items
+    with the same flags, see of().
+    '''
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, flags):
+        '''The shared access flags object of flags'''
+        access_flags = _access_flags.get((cls, flags), None)
+        if access_flags is None:
+            access_flags = _access_flags[(cls, flags)] = cls(flags)
+        return access_flags
 
-    def parse(self, fd):
-        self._flags = read_bytes.read_u2_int(fd)
+    def __reduce__(self):
+        # Unpickled flags are shared as well
+        return (_access_flags_of, (type(self), int(self)))
 
     def public(self):
-        return (self._flags & 0x0001 > 0)
+        return self & 0x0001 != 0
 
     def private(self):
-        return (self._flags & 0x0002 > 0)
+        return self & 0x0002 != 0
 
     def protected(self):
-        return (self._flags & 0x0004 > 0)
+        return self & 0x0004 != 0
 
     def static(self):
-        return (self._flags & 0x0008 > 0)
+        return self & 0x0008 != 0
 
     def final(self):
-        return (self._flags & 0x0010 > 0)
+        return self & 0x0010 != 0
 
     def abstract(self):
-        return (self._flags & 0x0400 > 0)
+        return self & 0x0400 != 0
 
     def synthetic(self):
-        return (self._flags & 0x1000 > 0)
+        return self & 0x1000 != 0
 
     def enum(self):
-        return (self._flags & 0x4000 > 0)
+        return self & 0x4000 != 0
+
+
+_access_flags = {}
+
+
+def _access_flags_of(cls, flags):
+    return cls.of(flags)
 
 
 class AccessFlags(_GenericAccessFlags):
     '''access_flags item is a mask of flags used to denote access
     permissions to and properties of this class or interface
     '''
-
-    def __init__(self):
-        super(AccessFlags, self).__init__()
+    __slots__ = ()
 
     def super(self):
-        return (self._flags & 0x0020 > 0)
+        return self & 0x0020 != 0
 
     def interface(self):
-        return (self._flags & 0x0200 > 0)
+        return self & 0x0200 != 0
 
     def annotation(self):
-        return (self._flags & 0x2000 > 0)
+        return self & 0x2000 != 0
 
     def debug_info(self):
         logging.debug('access_flags - ACC_PUBLIC:' + str(self.public()))
@@ -274,23 +603,26 @@ class AccessFlags(_GenericAccessFlags):
         logging.debug('access_flags - ACC_ENUM:' + str(self.enum()))
 
 
-class Field(object):
-    def __init__(self):
-        pass
+class Field(slotted.Slotted):
+    __slots__ = (
+        'access_flags',
+        'name_index',
+        'descriptor_index',
+        'attributes_count',
+        'attributes',
+    )
 
     class AccessFlags(_GenericAccessFlags):
         '''access_flags item is a mask of flags used to denote access
         permission to and properties of this field.
         '''
-
-        def __init__(self):
-            super(Field.AccessFlags, self).__init__()
+        __slots__ = ()
 
         def volatile(self):
-            return (self._flags & 0x0040 > 0)
+            return self & 0x0040 != 0
 
         def transient(self):
-            return (self._flags & 0x0080 > 0)
+            return self & 0x0080 != 0
 
         def debug_info(self, prefix):
             logging.debug(
@@ -313,13 +645,21 @@ class Field(object):
                 f'{prefix}access_flags - ACC_ENUM: {self.enum()}')
 
     def parse(self, fd, class_file):
-        self.access_flags = Field.AccessFlags()
-        self.access_flags.parse(fd)
+        self.access_flags = Field.AccessFlags.of(read_bytes.read_u2_int(fd))
         self.name_index = read_bytes.read_u2_int(fd)
         self.descriptor_index = read_bytes.read_u2_int(fd)
         (self.attributes_count, self.attributes) =\
             attributes.parse(fd, class_file)
 
+    def parse_from(self, buf, offset, class_file):
+        (access_flags,
+         self.name_index,
+         self.descriptor_index) = read_bytes.U2_U2_U2.unpack_from(buf, offset)
+        self.access_flags = Field.AccessFlags.of(access_flags)
+        (self.attributes_count, self.attributes, offset) =\
+            attributes.parse_from(buf, offset + 6, class_file)
+        return offset
+
     def debug_info(self):
         logging.debug(f'Field  - name index: {self.name_index}')
         logging.debug(f'       - descriptor index: {self.descriptor_index}')
@@ -329,32 +669,39 @@ class Field(object):
             attr.debug_info('       - ')
 
 
-class Method(object):
-    def __init__(self):
-        pass
+class Method(slotted.Slotted):
+    __slots__ = (
+        'access_flags',
+        'name_index',
+        'descriptor_index',
+        'attributes_count',
+        'attributes',
+        'class_name',
+        'method_name',
+        'name',
+        'descriptor',
+    )
 
     class AccessFlags(_GenericAccessFlags):
         '''access_flags item is a mask of flags used to denote access
         permission to and properties of this method.
         '''
-
-        def __init__(self):
-            super(Method.AccessFlags, self).__init__()
+        __slots__ = ()
 
         def synchronized(self):
-            return (self._flags & 0x0020 > 0)
+            return self & 0x0020 != 0
 
         def bridge(self):
-            return (self._flags & 0x0040 > 0)
+            return self & 0x0040 != 0
 
         def varargs(self):
-            return (self._flags & 0x0080 > 0)
+            return self & 0x0080 != 0
 
         def native(self):
-            return (self._flags & 0x0100 > 0)
+            return self & 0x0100 != 0
 
         def strict(self):
-            return (self._flags & 0x0800 > 0)
+            return self & 0x0800 != 0
 
         def debug_info(self, prefix):
             logging.debug(
@@ -383,12 +730,25 @@ class Method(object):
                 f'{prefix}access_flags - ACC_SYNTHETIC: {self.synthetic()}')
 
     def parse(self, fd, class_file):
-        self.access_flags = Method.AccessFlags()
-        self.access_flags.parse(fd)
+        self.access_flags = Method.AccessFlags.of(read_bytes.read_u2_int(fd))
         self.name_index = read_bytes.read_u2_int(fd)
         self.descriptor_index = read_bytes.read_u2_int(fd)
         self.attributes_count, self.attributes =\
             attributes.parse(fd, class_file)
+        self._resolve_names(class_file)
+
+    def parse_from(self, buf, offset, class_file):
+        (access_flags,
+         self.name_index,
+         self.descriptor_index) = read_bytes.U2_U2_U2.unpack_from(buf, offset)
+        self.access_flags = Method.AccessFlags.of(access_flags)
+        self.attributes_count, self.attributes, offset =\
+            attributes.parse_from(buf, offset + 6, class_file)
+        self._resolve_names(class_file)
+        return offset
+
+    def _resolve_names(self, class_file):
+        metrics.counters['methods.loaded'] += 1
         class_name = class_file.name()
         method_name = class_file.constant_pool[self.name_index]
         assert type(method_name) is constant_pool.ConstantUtf8,\
@@ -399,11 +759,11 @@ class Method(object):
         self.name = f'{class_name}.{method_name.value()}'
         self.descriptor =\
             class_file.constant_pool[self.descriptor_index].value()
-        logging.debug(f'Method {self.name} loaded, code is:')
+        logging.debug('Method %s loaded, code is:', self.name)
         for attr in self.attributes:
             if type(attr) is attributes.CodeAttribute:
                 # Only one code attribute in Method
-                logging.debug(' - ' + ' '.join('0x{:02X}'.format(i) for i in attr.code))
+                logging.debug(' - %s', attributes.HexDump(attr.code))
                 break
 
     def code(self):
@@ -437,11 +797,12 @@ class Method(object):
             self.access_flags.native()
 
 
-def parse(file_name: str, loader=BootstrapClassLoader):
-    class_loader = loader()
-    with open(file_name, 'rb') as java_class_file:
-        class_struct = class_loader.parse(java_class_file)
-    return class_struct
+def parse(file_name: str, loader=None):
+    '''Parse a class file, with the parser selected by class_parser unless
+    a loader type is given.
+    '''
+    class_loader = (loader or class_parsers[class_parser])()
+    return class_loader.parse_file(file_name)
 
 
 def exec_class_initialization_method(class_struct: ClassStruct) -> None:
@@ -465,28 +826,89 @@ def exec_class_initialization_method(class_struct: ClassStruct) -> None:
     # can be no class initialization method
 
 
+def get_class_path() -> class_path.ClassPath:
+    '''The class path of classpath followed by jrelibpath, it is built again
+    only when either of them is changed.
+    '''
+    global _class_path
+    paths = class_path.split(classpath) + class_path.split(jrelibpath)
+    if not _class_path or _class_path.paths != paths:
+        _class_path = class_path.ClassPath(paths)
+    return _class_path
+
+
+def find_class(classname: str):
+    '''Find the source of a class file in the entries of classpath, then in
+    jre lib path. Each entry can be a directory or a JAR/zip archive.
+    '''
+    return get_class_path().find(classname)
+
+
+def parse_source(source, record=None) -> ClassStruct:
+    '''Parse the class file of source, or load it from the class cache.
+    Fill in the class load record, see lib/class_trace.py, if it's given.
+    '''
+    start = time.perf_counter()
+    class_struct = None
+    if class_cache.enabled:
+        key = source.key
+        stamp = source.stamp()
+        class_struct = class_cache.load(key, stamp)
+    from_cache = class_struct is not None
+    if not class_struct:
+        class_struct = source.parse(class_parsers[class_parser]())
+        class_struct.source = source
+        if class_cache.enabled:
+            class_cache.store(key, stamp, class_struct)
+    if record:
+        record.source = 'cache' if from_cache else source.kind
+        record.location = str(source)
+        record.size = class_struct.class_file_size
+        record.parse_seconds = time.perf_counter() - start
+    return class_struct
+
+
 def load_class(classname: str) -> ClassStruct:
     """
     :param classname: str, represent the name of class
     :return: ClassStruct object if the class is success loaded, otherwise None
     """
-    filename = classname + '.class'
-    # First try class path, then try jre lib path
-    possible_path = os.path.join(classpath, filename) if \
-        os.path.isfile(os.path.join(classpath, filename)) else \
-        (os.path.join(jrelibpath, filename) if
-            os.path.isfile(os.path.join(jrelibpath, filename)) else
-            None)
-    if not possible_path:
-        logging.warning(f'Try path {os.path.join(classpath, filename)}.')
-        logging.warning(f'Try path {os.path.join(jrelibpath, filename)}.')
-        logging.warning(f'Can not find {classname} class file.')
-        return None
-
-    class_struct = parse(possible_path)
+    record = None
+    if class_trace.enabled():
+        record = class_trace.ClassLoadRecord(classname, class_trace.trigger())
+    class_struct = prefetched.pop(classname, None)
+    if class_struct:
+        metrics.counters['prefetch.used'] += 1
+    elif prefetcher:
+        class_struct = prefetcher.take(classname)
+    if class_struct:
+        if record:
+            record.source = 'prefetch'
+            record.location = str(class_struct.source)
+            record.size = class_struct.class_file_size
+    else:
+        source = find_class(classname)
+        if not source:
+            logging.warning(
+                'Can not find %s class file in %s and %s.',
+                classname, classpath, jrelibpath)
+            return None
+        class_struct = parse_source(source, record)
     run_time_data.method_area[classname] = class_struct
+    if class_unloading.enabled():
+        class_unloading.loaded(classname, class_struct)
+    if class_reload.enabled:
+        class_reload.loaded(classname, class_struct)
+    if prefetcher:
+        prefetcher.schedule(class_struct)
     class_struct.debug_info()
-    exec_class_initialization_method(class_struct)
+    if record:
+        start = time.perf_counter()
+        exec_class_initialization_method(class_struct)
+        record.clinit_seconds = time.perf_counter() - start
+        class_trace.emit(record)
+    else:
+        exec_class_initialization_method(class_struct)
     return class_struct
 
 
@@ -496,3 +918,9 @@ def init_class_object(klass, obj):
             name, descriptor = klass.get_field(field)
             obj.set_field_default(klass.name(), descriptor, name)
         klass = klass.get_super_class()
+
+
+class_parsers = {
+    'stream': BootstrapClassLoader,
+    'mmap': MappedClassLoader,
+}
@@ -0,0 +1,113 @@
+'''Reload of the classes of the user class path which are changed, for a VM
+which stays resident and runs a program again after it's edited.
+
+When it's enabled, load_class remembers the source and stamp (mtime and size
+of the class file, and the CRC of an archive member) of every class loaded
+from the user class path (classpath). reload_changed_classes compares them
+with the class path as it's now, and removes from the method area:
+
+- the classes whose class file is changed, moved or removed
+- the classes which extend or implement one of them, directly or not, since
+  they are linked against the old class
+
+They are found and parsed again the next time the interpreter asks for one,
+and initialized again. Classes of the bootstrap class path and the other
+classes of the user class path stay loaded and initialized. Heap objects of
+an old class keep the old class.
+
+Across runs of the VM the class cache, see lib/class_cache.py, already parses
+only the changed class files again.
+'''
+import logging
+import time
+from lib import class_loader
+from lib import class_unloading
+from lib import classpath as class_path
+from lib import metrics
+from lib import prefetch
+from lib import run_time_data
+
+enabled = False
+
+# Class name: (source key, stamp), of the loaded classes of the user class path
+stamps = {}
+_user_class_path = None
+
+
+def user_class_path():
+    global _user_class_path
+    paths = class_path.split(class_loader.classpath)
+    if not _user_class_path or _user_class_path.paths != paths:
+        _user_class_path = class_path.ClassPath(paths)
+    return _user_class_path
+
+
+def loaded(classname, class_struct):
+    '''Remember the stamp of a class which is loaded from the user class
+    path.
+    '''
+    source = user_class_path().find(classname)
+    if source and source.key == class_struct.source.key:
+        stamps[classname] = (source.key, source.stamp())
+
+
+def changed_classes():
+    '''Return the names of the remembered classes whose class file is
+    changed since they were loaded.
+    '''
+    user_class_path().invalidate()
+    changed = []
+    for classname, (key, stamp) in stamps.items():
+        source = user_class_path().find(classname)
+        try:
+            if source and (source.key, source.stamp()) == (key, stamp):
+                continue
+        except OSError:
+            # Removed since the class path was listed
+            pass
+        changed.append(classname)
+    return changed
+
+
+def dependent_classes(classnames):
+    '''Return the loaded classes which extend or implement one of classnames,
+    directly or not, classnames included.
+    '''
+    dependents = set(classnames)
+    supers = {
+        name: set(prefetch.super_classes(class_struct))
+        for name, class_struct in run_time_data.method_area.items()
+    }
+    found = True
+    while found:
+        found = False
+        for name, names in supers.items():
+            if name not in dependents and names & dependents:
+                dependents.add(name)
+                found = True
+    return dependents
+
+
+def reload_changed_classes():
+    '''Remove the changed classes of the user class path and their dependents
+    from the method area, so they are loaded again when they are used. Call it
+    when no thread is running. Return the names of the removed classes.
+    '''
+    start = time.perf_counter()
+    changed = changed_classes()
+    invalidated = dependent_classes(changed) if changed else set()
+    # Also find classes added to the class path, or which shadow a class of
+    # the bootstrap class path now
+    class_loader.get_class_path().invalidate()
+    for classname in invalidated:
+        class_unloading.unload(classname)
+        class_loader.prefetched.pop(classname, None)
+        stamps.pop(classname, None)
+    metrics.counters['reload.changed'] += len(changed)
+    metrics.counters['reload.invalidated'] += len(invalidated)
+    metrics.counters['reload.seconds'] += time.perf_counter() - start
+    if invalidated:
+        logging.info(
+            f'Reload {len(changed)} changed classes, '
+            f'{len(invalidated)} classes with their dependents')
+    return sorted(invalidated)
@@ -0,0 +1,101 @@
+'''Trace of class loading, like -verbose:class of the java launcher.
+
+Tracing is off unless enable is called, even if the level of the root
+logger is INFO or lower, such as with --debug. load_class then emits one
+record per loaded class on the "jedy.class" logger, at INFO level. The record is a ClassLoadRecord, which is only formatted into a
+message by a handler which takes it, and which is attached to the log record
+as record.class_load for handlers which want the items, such as
+JsonLinesHandler.
+'''
+import json
+import logging
+from lib import run_time_data
+
+logger = logging.getLogger('jedy.class')
+# Set by enable
+tracing = False
+
+
+class ClassLoadRecord(object):
+    __slots__ = (
+        'name',
+        'source',
+        'location',
+        'size',
+        'parse_seconds',
+        'clinit_seconds',
+        'trigger',
+    )
+
+    def __init__(self, name, trigger):
+        self.name = name
+        # dir, jar, image or bytes, cache if the class is loaded from the
+        # class cache, prefetch if it's parsed ahead by lib/prefetch.py
+        self.source = None
+        self.location = None
+        self.size = 0
+        self.parse_seconds = 0.0
+        self.clinit_seconds = 0.0
+        self.trigger = trigger
+
+    def __str__(self):
+        return (
+            f'[Loaded {self.name} from {self.source} {self.location}, '
+            f'{self.size} bytes, parse {self.parse_seconds * 1000:.3f}ms, '
+            f'clinit {self.clinit_seconds * 1000:.3f}ms, '
+            f'by {self.trigger}]'
+        )
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def enabled():
+    return tracing and logger.isEnabledFor(logging.INFO)
+
+
+def trigger():
+    '''Where the interpreter is, when a class is loaded'''
+    if not run_time_data.running_threads:
+        return 'launcher'
+    thread = run_time_data.running_threads[-1]
+    if not thread.stack:
+        return f'{thread.class_name}.{thread.method_name}'
+    method = thread.stack[-1].method
+    return f'{method.name}{method.descriptor}@{thread.pc_register}'
+
+
+def emit(record):
+    logger.info('%s', record, extra={'class_load': record})
+
+
+class JsonLinesHandler(logging.FileHandler):
+    '''Write each class load record as a line of JSON'''
+
+    def __init__(self, file_name):
+        super().__init__(file_name, mode='w')
+        self.addFilter(lambda record: hasattr(record, 'class_load'))
+
+    def format(self, record):
+        return json.dumps(record.class_load.as_dict())
+
+
+def enable(file_name=None, log=True):
+    '''Trace class loading into the log, and into file_name as JSON lines'''
+    global tracing
+    tracing = True
+    logger.setLevel(logging.INFO)
+    if file_name:
+        logger.addHandler(JsonLinesHandler(file_name))
+    logger.propagate = log
+
+
+def disable():
+    global tracing
+    tracing = False
+    logger.setLevel(logging.NOTSET)
+    for handler in list(logger.handlers):
+        if isinstance(handler, JsonLinesHandler):
+            logger.removeHandler(handler)
+            handler.close()
+    logger.propagate = True
@@ -0,0 +1,181 @@
+'''Eviction of classes from the method area, for a VM which runs many
+unrelated programs and would otherwise keep every class it ever loaded.
+
+Eviction is on when max_classes or max_bytes is set. When a loaded class
+puts the method area over a cap, eviction is pending until the next safe
+point, a method invocation or return, where all values of the running
+methods are in their frames, or a call of evict, such as between programs.
+A class initializer runs on a nested thread while the instruction which
+needs the class is still executing, so there is no safe point while one
+runs. At a safe point least recently used classes are evicted until the
+method area is within both caps again.
+A class is never evicted if it's:
+
+- pinned, which every class of the bootstrap class path (jrelibpath) is
+- the class of a frame of a live thread
+- the class of an object reachable from the frames and static fields of
+  the classes which are kept
+- the super class or an interface of a loaded class, which the method
+  tables of the class refer to, see ClassStruct.link. It can be evicted
+  once the classes which extend or implement it are
+
+An evicted class loses its static fields, if it's used again it's loaded
+and initialized again. Every unload bumps generation, what is resolved from
+classes before it, such as by quick instructions, see lib/instruction.py,
+is stale. The size of a class is measured by lib/footprint.py when it's
+loaded, only if max_bytes is set.
+'''
+import time
+from collections import OrderedDict
+from lib import class_loader
+from lib import classpath as class_path
+from lib import footprint
+from lib import metrics
+from lib import prefetch
+from lib import run_time_data
+
+# Caps of the method area, 0 means no cap
+max_classes = 0
+max_bytes = 0
+
+# Classes which can be evicted, least recently used first
+lru = OrderedDict()
+pinned = set()
+# Size of every loaded class, if max_bytes is set
+_sizes = {}
+# The method area is over a cap, evict at the next safe point
+pending = False
+# Number of unloaded classes
+generation = 0
+_bootstrap_class_path = None
+
+
+def enabled():
+    return bool(max_classes or max_bytes)
+
+
+def is_bootstrap(classname):
+    '''If the class is found in the bootstrap class path'''
+    global _bootstrap_class_path
+    paths = class_path.split(class_loader.jrelibpath)
+    if not _bootstrap_class_path or _bootstrap_class_path.paths != paths:
+        _bootstrap_class_path = class_path.ClassPath(paths)
+    return _bootstrap_class_path.find(classname) is not None
+
+
+def loaded(classname, class_struct):
+    '''Record a class which is just put into the method area'''
+    global pending
+    if is_bootstrap(classname):
+        pinned.add(classname)
+    else:
+        lru[classname] = None
+        lru.move_to_end(classname)
+    if max_bytes:
+        _sizes[classname] = sum(
+            footprint.class_footprint(class_struct, set()).values())
+    pending = _over_caps()
+
+
+def safepoint():
+    '''Called by the interpreter where evicting is safe, when it's pending'''
+    global pending
+    if len(run_time_data.running_threads) > 1:
+        # In a class initializer
+        return
+    pending = False
+    evict()
+
+
+def _over_caps():
+    if max_classes and len(run_time_data.method_area) > max_classes:
+        return True
+    return bool(max_bytes) and sum(_sizes.values()) > max_bytes
+
+
+def _running_frames():
+    threads = run_time_data.running_threads + run_time_data.thread_pool
+    for thread in threads:
+        yield from thread.stack
+
+
+def _class_of(value):
+    klass = getattr(value, 'klass', None)
+    return klass.name() if klass else None
+
+
+def classes_in_use():
+    '''Names of the classes which are reachable from live frames, static
+    fields of kept classes, and the pinned classes, and of the super
+    classes and interfaces of all loaded classes.
+    '''
+    method_area = run_time_data.method_area
+    kept = set()
+    names = list(pinned)
+    for klass in method_area.values():
+        names.extend(prefetch.super_classes(klass))
+    values = []
+    seen_values = set()
+    for frame in _running_frames():
+        names.append(frame.klass.name())
+        values.extend(frame.local_variables)
+        values.extend(frame.operand_stack)
+    while names or values:
+        while values:
+            value = values.pop()
+            if id(value) in seen_values:
+                continue
+            seen_values.add(id(value))
+            if isinstance(value, (list, tuple)):
+                values.extend(value)
+                continue
+            name = _class_of(value)
+            if name:
+                names.append(name)
+                values.extend(value.fields.values())
+        if names:
+            name = names.pop()
+            if name in kept or name not in method_area:
+                continue
+            kept.add(name)
+            # Not method_area[name], it would load the class again
+            klass = dict.__getitem__(method_area, name)
+            names.extend(prefetch.super_classes(klass))
+            values.extend(
+                run_time_data.class_static_fields.get(name, {}).values())
+    return kept
+
+
+def evict():
+    '''Evict least recently used classes which are not in use, until the
+    method area is within its caps. Return the number of evicted classes.
+    '''
+    if not _over_caps():
+        return 0
+    start = time.perf_counter()
+    in_use = classes_in_use()
+    evicted = 0
+    for classname in list(lru):
+        if not _over_caps():
+            break
+        if classname in in_use:
+            continue
+        metrics.counters['method_area.evicted_bytes'] +=\
+            _sizes.get(classname, 0)
+        unload(classname)
+        evicted += 1
+    metrics.counters['method_area.evicted'] += evicted
+    metrics.counters['method_area.eviction_runs'] += 1
+    metrics.counters['method_area.eviction_seconds'] +=\
+        time.perf_counter() - start
+    return evicted
+
+
+def unload(classname):
+    '''Remove the class and its static fields'''
+    global generation
+    generation += 1
+    dict.pop(run_time_data.method_area, classname, None)
+    run_time_data.class_static_fields.pop(classname, None)
+    lru.pop(classname, None)
+    _sizes.pop(classname, None)
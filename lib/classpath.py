@@ -0,0 +1,278 @@
+'''Entries of the class path, a directory of loose class files, a JAR/zip
+archive or a runtime image, and the source a class file is loaded from.
+'''
+import logging
+import os
+import time
+from lib import archive
+from lib import class_cache
+from lib import image
+from lib import metrics
+
+_entries = {}
+
+
+class FileSource(object):
+    '''A loose class file in a directory entry'''
+    kind = 'dir'
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    def __str__(self):
+        return self.file_name
+
+    @property
+    def key(self):
+        return os.path.realpath(self.file_name)
+
+    def stamp(self):
+        return class_cache.file_stamp(self.file_name)
+
+    def read(self):
+        with open(self.file_name, 'rb') as class_file:
+            return class_file.read()
+
+    def parse(self, class_loader):
+        return class_loader.parse_file(self.file_name)
+
+
+class ArchiveMemberSource(object):
+    '''A class file member of an archive entry'''
+    kind = 'jar'
+
+    def __init__(self, entry, name):
+        self.entry = entry
+        self.name = name
+
+    def __str__(self):
+        return f'{self.entry.path}!/{self.name}'
+
+    @property
+    def key(self):
+        return f'{os.path.realpath(self.entry.path)}!/{self.name}'
+
+    def __reduce__(self):
+        # The archive map can't be pickled, find the entry again by path
+        return (_archive_member_source, (self.entry.path, self.name))
+
+    def stamp(self):
+        return class_cache.file_stamp(self.entry.path) +\
+            (self.entry.archive.entries[self.name].crc,)
+
+    def read(self):
+        return self.entry.archive.read(self.name)
+
+    def parse(self, class_loader):
+        return class_loader.parse_data(self.read(), self)
+
+
+class ImageMemberSource(object):
+    '''A class in a runtime image entry'''
+    kind = 'image'
+
+    def __init__(self, entry, name, index):
+        self.entry = entry
+        self.name = name
+        self.index = index
+
+    def __str__(self):
+        return f'{self.entry.path}!/{self.name}'
+
+    @property
+    def key(self):
+        return f'{os.path.realpath(self.entry.path)}!/{self.name}'
+
+    def __reduce__(self):
+        # The image map can't be pickled, find the entry again by path
+        return (_image_member_source, (self.entry.path, self.name))
+
+    def stamp(self):
+        return class_cache.file_stamp(self.entry.path) +\
+            (self.entry.image.entry(self.index)[3],)
+
+    def read(self):
+        return self.entry.image.read(self.index)
+
+    def parse(self, class_loader):
+        return class_loader.parse_data(self.read(), self)
+
+
+class BytesSource(object):
+    '''Class file bytes which are given to the parser directly'''
+    kind = 'bytes'
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return f'<{len(self.data)} bytes>'
+
+    def stamp(self):
+        # The bytes never change
+        return None
+
+    def read(self):
+        return self.data
+
+
+def _archive_member_source(path, name):
+    return ArchiveMemberSource(get_entry(path), name)
+
+
+def _image_member_source(path, name):
+    entry = get_entry(path)
+    return ImageMemberSource(entry, name, entry.image.find(name))
+
+
+class DirectoryEntry(object):
+    '''A directory of loose class files. The listing of each package
+    directory is read once, on the first lookup of a class in the package,
+    after that finding a class file is a set probe.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._listings = {}
+
+    def __str__(self):
+        return self.path
+
+    def find(self, filename):
+        package, _, name = filename.rpartition('/')
+        listing = self._listings.get(package, None)
+        if listing is None:
+            listing = self._list(package)
+        if name in listing:
+            return FileSource(os.path.join(self.path, filename))
+        return None
+
+    def _list(self, package):
+        start = time.perf_counter()
+        try:
+            listing = frozenset(os.listdir(os.path.join(self.path, package)))
+        except (FileNotFoundError, NotADirectoryError):
+            listing = frozenset()
+        self._listings[package] = listing
+        metrics.counters['classpath.index_seconds'] +=\
+            time.perf_counter() - start
+        metrics.counters['classpath.index_dirs'] += 1
+        return listing
+
+    def invalidate(self):
+        self._listings = {}
+
+
+class ArchiveEntry(object):
+    '''A JAR or zip file, its central directory is indexed once when the
+    entry is created.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.stamp = class_cache.file_stamp(path)
+        self.archive = archive.Archive(path)
+
+    def __str__(self):
+        return self.path
+
+    def find(self, filename):
+        if filename in self.archive:
+            return ArchiveMemberSource(self, filename)
+        return None
+
+    def invalidate(self):
+        '''Index the archive again if the file is changed'''
+        stamp = class_cache.file_stamp(self.path)
+        if stamp != self.stamp:
+            self.stamp = stamp
+            self.archive = archive.Archive(self.path)
+
+
+class ImageEntry(object):
+    '''A runtime image, see lib/image.py. The image is mapped once when the
+    entry is created, a class is found by the hash index of the image.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.stamp = class_cache.file_stamp(path)
+        self.image = image.Image(path)
+
+    def __str__(self):
+        return self.path
+
+    def find(self, filename):
+        name = filename[:-len('.class')]
+        index = self.image.find(name)
+        if index is None:
+            return None
+        return ImageMemberSource(self, name, index)
+
+    def invalidate(self):
+        '''Map the image again if the file is changed'''
+        stamp = class_cache.file_stamp(self.path)
+        if stamp != self.stamp:
+            self.stamp = stamp
+            self.image = image.Image(self.path)
+
+
+class ClassPath(object):
+    '''An ordered list of class path entries. Classes which are not found
+    in any entry are remembered, so a repeated miss costs one set probe.
+    '''
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.entries = []
+        for path in paths:
+            try:
+                self.entries.append(get_entry(path))
+            except (OSError, ValueError) as e:
+                logging.warning(f'Ignore class path entry {path}: {e}')
+        self._missing = set()
+
+    def find(self, classname):
+        if classname in self._missing:
+            metrics.counters['classpath.negative_hit'] += 1
+            return None
+        filename = classname + '.class'
+        for entry in self.entries:
+            source = entry.find(filename)
+            if source:
+                metrics.counters['classpath.hit'] += 1
+                return source
+        metrics.counters['classpath.miss'] += 1
+        self._missing.add(classname)
+        return None
+
+    def invalidate(self):
+        '''Forget the listings and misses, for class files added to or
+        removed from the entries, and open changed archives again.
+        '''
+        self._missing = set()
+        for entry in self.entries:
+            entry.invalidate()
+
+
+def split(path_string):
+    '''Split a class path string such as "a:b:c" into its elements'''
+    return [path for path in (path_string or '').split(os.pathsep) if path]
+
+
+def is_archive(path):
+    return os.path.splitext(path)[1].lower() in ('.jar', '.zip')
+
+
+def get_entry(path):
+    '''Return the entry of a class path element, created once per path'''
+    entry = _entries.get(path, None)
+    if not entry:
+        if is_archive(path):
+            entry = ArchiveEntry(path)
+        elif image.is_image(path):
+            entry = ImageEntry(path)
+        else:
+            entry = DirectoryEntry(path)
+        _entries[path] = entry
+    return entry
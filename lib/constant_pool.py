@@ -1,5 +1,10 @@
 import logging
+from array import array
+from collections import namedtuple
+from lib import descriptor
 from lib import read_bytes
+from lib import slotted
+from lib import symbol_table
 
 
 CONSTANT_Class = 7
@@ -17,6 +22,32 @@ CONSTANT_MethodHandle = 15
 CONSTANT_MethodType = 16
 CONSTANT_InvokeDynamic = 18
 
+# Size of the entry body after the tag, CONSTANT_Utf8_info is variable
+_constant_body_size = {
+    CONSTANT_Class: 2,
+    CONSTANT_Fieldref: 4,
+    CONSTANT_Methodref: 4,
+    CONSTANT_InterfaceMethodref: 4,
+    CONSTANT_String: 2,
+    CONSTANT_Integer: 4,
+    CONSTANT_Float: 4,
+    CONSTANT_Long: 8,
+    CONSTANT_Double: 8,
+    CONSTANT_NameAndType: 4,
+    CONSTANT_MethodHandle: 3,
+    CONSTANT_MethodType: 2,
+    CONSTANT_InvokeDynamic: 4,
+}
+
+# Use LazyConstantPool in the offset based parser
+lazy = True
+
+# Resolved symbolic references, see ConstantPool.resolved
+FieldRef = namedtuple(
+    'FieldRef', ('class_name', 'name', 'descriptor', 'field_id'))
+MethodRef = namedtuple(
+    'MethodRef', ('class_name', 'name', 'descriptor', 'parameter_count'))
+
 
 class ConstantPool(object):
     def __init__(self, constant_pool_count):
@@ -24,6 +55,19 @@ class ConstantPool(object):
         # which means the max size is constant_pool_count - 1
         self.max_size = constant_pool_count - 1
         self.pool = []
+        # The run-time constant pool, JVMS 5.1: symbolic references which
+        # are resolved, by index, shared by every instruction and frame of
+        # the class. Classes and methods they are linked to are in linked,
+        # see ClassStruct.resolve_method in lib/class_loader.py.
+        self.resolved = {}
+        self.linked = {}
+
+    def __getstate__(self):
+        # Resolution is only valid in the current process
+        state = self.__dict__.copy()
+        state['resolved'] = {}
+        state['linked'] = {}
+        return state
 
     @property
     def count(self):
@@ -38,7 +82,105 @@ class ConstantPool(object):
         return self.pool[index - 1]
 
     def get_constant_class_name(self, index):
-        return self[self[index].name_index].value()
+        name = self.resolved.get(index, None)
+        if name is None:
+            name = self.resolved[index] = self[self[index].name_index].value()
+        return name
+
+    def string(self, index):
+        '''Value of the CONSTANT_String_info entry at index'''
+        value = self.resolved.get(index, None)
+        if value is None:
+            value = self.resolved[index] =\
+                self[self[index].string_index].value()
+        return value
+
+    def field_ref(self, index):
+        '''The FieldRef of the CONSTANT_Fieldref_info entry at index'''
+        ref = self.resolved.get(index, None)
+        if ref is None:
+            field_ref = self[index]
+            assert type(field_ref) is ConstantFieldref
+            class_name = field_ref.get_class(self)
+            name, field_descriptor = field_ref.get_name_descriptor(self)
+            ref = self.resolved[index] = FieldRef(
+                class_name,
+                name,
+                field_descriptor,
+                symbol_table.member_id(class_name, name, field_descriptor)
+            )
+        return ref
+
+    def method_ref(self, index):
+        '''The MethodRef of the CONSTANT_Methodref_info or
+        CONSTANT_InterfaceMethodref_info entry at index
+        '''
+        ref = self.resolved.get(index, None)
+        if ref is None:
+            method_ref = self[index]
+            assert type(method_ref) in (
+                ConstantMethodref,
+                ConstantInterfaceMethodref
+            )
+            name, method_descriptor = method_ref.get_method(self)
+            parameter_types, _ = descriptor.parse_method_descriptor(
+                method_descriptor)
+            ref = self.resolved[index] = MethodRef(
+                method_ref.get_class(self),
+                name,
+                method_descriptor,
+                len(parameter_types)
+            )
+        return ref
+
+    def class_names(self):
+        '''Names of all CONSTANT_Class_info entries'''
+        for index in range(1, self.count):
+            if type(self[index]) is ConstantClass:
+                yield self.get_constant_class_name(index)
+
+
+class LazyConstantPool(ConstantPool):
+    '''A constant_pool which only records the tag and offset of each entry,
+    and materializes the constant object on the first access of its index.
+    It keeps a copy of the raw constant_pool bytes, so it does not depend on
+    the buffer the class file was parsed from.
+    '''
+
+    def __init__(self, constant_pool_count, data, tags, offsets):
+        super().__init__(constant_pool_count)
+        self.data = data
+        # tag 0 means the unusable entry after a long or double
+        self.tags = tags
+        self.offsets = offsets
+        self.pool = [None] * self.max_size
+
+    def __getitem__(self, index):
+        assert index >= 1 and index <= self.max_size,\
+            'Invalid constant index {0}'.format(index)
+        constant = self.pool[index - 1]
+        if constant is None:
+            constant = self._materialize(index - 1)
+        return constant
+
+    def _materialize(self, position):
+        tag = self.tags[position]
+        if tag == 0:
+            constant = ConstantUnusable()
+        else:
+            constant = constant_type_tag_to_class[tag]()
+            constant.parse_from(self.data, self.offsets[position])
+        self.pool[position] = constant
+        return constant
+
+    def class_names(self):
+        # Only the class entries and their names are materialized
+        for position, tag in enumerate(self.tags):
+            if tag == CONSTANT_Class:
+                yield self.get_constant_class_name(position + 1)
+
+    def materialized_count(self):
+        return sum(1 for constant in self.pool if constant is not None)
 
 
 def parse(fd):
@@ -48,17 +190,21 @@ def parse(fd):
     '''
     count = read_bytes.read_u2_int(fd)
     pool = ConstantPool(count)
-    long_or_double = False
-    for _ in range(count - 1):
-        constant = parse_entry(fd, long_or_double)
-        long_or_double = type(constant) in (ConstantLong, ConstantDouble)
+    index = 1
+    while index < count:
+        constant = parse_entry(fd)
         pool.append(constant)
+        index += 1
+        if type(constant) in (ConstantLong, ConstantDouble):
+            # In spec 4.4.5, the entry after a long or double is valid
+            # but unusable, and it does not appear in the class file.
+            pool.append(ConstantUnusable())
+            index += 1
     return pool
 
 
-def parse_entry(fd, prev_long_or_double):
-    '''Parse one constant in constant_pool. Set constant be unusable
-    if previous constant is long or double.
+def parse_entry(fd):
+    '''Parse one constant in constant_pool.
     '''
     tag = read_bytes.read_u1_int(fd)
     constant_type = constant_type_tag_to_class.get(tag, None)
@@ -68,15 +214,73 @@ def parse_entry(fd, prev_long_or_double):
         )
     constant = constant_type()
     constant.parse(fd)
-    if prev_long_or_double:
-        constant.unuse()
     return constant
 
 
-class GenericConstant(object):
+def parse_from(buf, offset):
+    '''Parse constant_pool out of a bytes-like buffer, starting at offset.
+    Every constant type implements parse_from(buf, offset), which decodes
+    the entry body just after the tag and returns the offset of the next
+    entry. Return the pool and the offset just after it.
+    '''
+    count = read_bytes.U2.unpack_from(buf, offset)[0]
+    offset += 2
+    if lazy:
+        return scan_from(buf, offset, count)
+    pool = ConstantPool(count)
+    index = 1
+    while index < count:
+        tag = buf[offset]
+        constant_type = constant_type_tag_to_class.get(tag, None)
+        if not constant_type:
+            raise ValueError(
+                'Constant tag {0} is not valid.'.format(tag)
+            )
+        constant = constant_type()
+        offset = constant.parse_from(buf, offset + 1)
+        pool.append(constant)
+        index += 1
+        if tag == CONSTANT_Long or tag == CONSTANT_Double:
+            pool.append(ConstantUnusable())
+            index += 1
+    return pool, offset
+
+
+def scan_from(buf, offset, count):
+    '''Walk the constant_pool entries starting at offset in one pass, only
+    recording their tags and offsets, see LazyConstantPool.
+    '''
+    start = offset
+    tags = bytearray(count - 1)
+    offsets = array('I', bytes(4 * (count - 1)))
+    position = 0
+    while position < count - 1:
+        tag = buf[offset]
+        tags[position] = tag
+        offsets[position] = offset + 1 - start
+        if tag == CONSTANT_Utf8:
+            offset += 3 + read_bytes.U2.unpack_from(buf, offset + 1)[0]
+        else:
+            size = _constant_body_size.get(tag, None)
+            if size is None:
+                raise ValueError(
+                    'Constant tag {0} is not valid.'.format(tag)
+                )
+            offset += 1 + size
+            if tag == CONSTANT_Long or tag == CONSTANT_Double:
+                # Leave tag 0 for the unusable entry
+                position += 1
+        position += 1
+    pool = LazyConstantPool(count, bytes(buf[start:offset]), tags, offsets)
+    return pool, offset
+
+
+class GenericConstant(slotted.Slotted):
     '''Base type for elements in constant_pool
     '''
 
+    __slots__ = ('tag', 'usable')
+
     def __init__(self, tag):
         self.tag = tag
         self.usable = True
@@ -88,11 +292,28 @@ class GenericConstant(object):
         pass
 
 
+class ConstantUnusable(GenericConstant):
+    '''The entry following a CONSTANT_Long_info or CONSTANT_Double_info.
+    It is a valid index of constant_pool, but is considered unusable.
+    '''
+
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(None)
+        self.unuse()
+
+    def debug_info(self, prefix, class_struct):
+        logging.debug(prefix + 'unusable')
+
+
 class ConstantClass(GenericConstant):
     '''The CONSTANT_Class_info structure in constant_pool,
     used to represent a class or an interface.
     '''
 
+    __slots__ = ('name_index',)
+
     def __init__(self):
         super().__init__(CONSTANT_Class)
 
@@ -101,6 +322,10 @@ class ConstantClass(GenericConstant):
         # TODO: check index availability after pool parsed
         # In spec 4.4.1. The CONSTANT_Class_info Structure
 
+    def parse_from(self, buf, offset):
+        self.name_index = read_bytes.U2.unpack_from(buf, offset)[0]
+        return offset + 2
+
     def debug_info(self, prefix, class_struct):
         class_name = class_struct.constant_pool[self.name_index].value()
         logging.debug(prefix + 'CONSTANT_Class_info - name_index:' +
@@ -111,6 +336,8 @@ class FieldMethodInterfacemethodRef(GenericConstant):
     '''For 3 similar structures fields, methods, and interface methods
     '''
 
+    __slots__ = ('class_index', 'name_and_type_index')
+
     def __init__(self, tag):
         super().__init__(tag)
 
@@ -118,6 +345,11 @@ class FieldMethodInterfacemethodRef(GenericConstant):
         self.class_index = read_bytes.read_u2_int(fd)
         self.name_and_type_index = read_bytes.read_u2_int(fd)
 
+    def parse_from(self, buf, offset):
+        self.class_index, self.name_and_type_index =\
+            read_bytes.U2_U2.unpack_from(buf, offset)
+        return offset + 4
+
     def get_class(self, pool):
         class_info = pool[self.class_index]
         class_name = pool[class_info.name_index]
@@ -134,6 +366,8 @@ class ConstantFieldref(FieldMethodInterfacemethodRef):
     '''The CONSTANT_Fieldref_info structure in constant_pool
     '''
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(CONSTANT_Fieldref)
 
@@ -161,6 +395,8 @@ class ConstantMethodref(FieldMethodInterfacemethodRef):
     '''The ConstantMethodref structure in constant_pool
     '''
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(CONSTANT_Methodref)
 
@@ -178,6 +414,8 @@ class ConstantInterfaceMethodref(FieldMethodInterfacemethodRef):
     '''The CONSTANT_Fieldref_info structure in constant_pool
     '''
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(CONSTANT_InterfaceMethodref)
 
@@ -196,6 +434,8 @@ class ConstantString(GenericConstant):
     used to represent constant objects of the type String
     '''
 
+    __slots__ = ('string_index',)
+
     def __init__(self):
         super().__init__(CONSTANT_String)
 
@@ -204,6 +444,10 @@ class ConstantString(GenericConstant):
         # TODO: validate index entry must be a CONSTANT_Utf8_info structure
         # In spec 4.4.3
 
+    def parse_from(self, buf, offset):
+        self.string_index = read_bytes.U2.unpack_from(buf, offset)[0]
+        return offset + 2
+
     def debug_info(self, prefix, class_struct):
         logging.debug(
             prefix +
@@ -216,6 +460,8 @@ class ConstantInteger(GenericConstant):
     '''The CONSTANT_Integer_info Structure in constant_pool.
     '''
 
+    __slots__ = ('value',)
+
     def __init__(self):
         super().__init__(CONSTANT_Integer)
 
@@ -223,6 +469,10 @@ class ConstantInteger(GenericConstant):
         self.value = read_bytes.read_u4_int(fd)
         # In spec it's bytes, use veriable name __value.
 
+    def parse_from(self, buf, offset):
+        self.value = read_bytes.U4.unpack_from(buf, offset)[0]
+        return offset + 4
+
     def debug_info(self, prefix, class_struct):
         logging.debug(
             prefix +
@@ -235,6 +485,8 @@ class ConstantFloat(GenericConstant):
     '''The CONSTANT_Float_info Structures in constant_pool.
     '''
 
+    __slots__ = ('value',)
+
     def __init__(self):
         super().__init__(CONSTANT_Float)
 
@@ -242,6 +494,10 @@ class ConstantFloat(GenericConstant):
         self.value = read_bytes.read_u4_float(fd)
         # In spec it's bytes, use veriable name __value.
 
+    def parse_from(self, buf, offset):
+        self.value = read_bytes.F4.unpack_from(buf, offset)[0]
+        return offset + 4
+
     def debug_info(self, prefix, class_struct):
         logging.debug(
             prefix +
@@ -255,12 +511,18 @@ class ConstantLong(GenericConstant):
     In python, use integer for long long C type
     '''
 
+    __slots__ = ('value',)
+
     def __init__(self):
         super().__init__(CONSTANT_Long)
 
     def parse(self, fd):
         self.value = read_bytes.read_u8_int(fd)
 
+    def parse_from(self, buf, offset):
+        self.value = read_bytes.U8.unpack_from(buf, offset)[0]
+        return offset + 8
+
     def debug_info(self, prefix, class_struct):
         logging.debug(
             prefix +
@@ -274,12 +536,18 @@ class ConstantDouble(GenericConstant):
     In python, use float for double C type
     '''
 
+    __slots__ = ('value',)
+
     def __init__(self):
         super().__init__(CONSTANT_Double)
 
     def parse(self, fd):
         self.value = read_bytes.read_u8_float(fd)
 
+    def parse_from(self, buf, offset):
+        self.value = read_bytes.F8.unpack_from(buf, offset)[0]
+        return offset + 8
+
     def debug_info(self, prefix, class_struct):
         logging.debug(
             prefix +
@@ -293,6 +561,8 @@ class ConstantNameAndType(GenericConstant):
     or method, without indicating which class or interface type it belongs to.
     '''
 
+    __slots__ = ('name_index', 'descriptor_index')
+
     def __init__(self):
         super().__init__(CONSTANT_NameAndType)
 
@@ -302,6 +572,11 @@ class ConstantNameAndType(GenericConstant):
         # TODO: validate indexs in constant_pool after parse all
         # In spec 4.4.6
 
+    def parse_from(self, buf, offset):
+        self.name_index, self.descriptor_index =\
+            read_bytes.U2_U2.unpack_from(buf, offset)
+        return offset + 4
+
     def debug_info(self, prefix, class_struct):
         name = class_struct.constant_pool[self.name_index].value()
         descript = class_struct.constant_pool[self.descriptor_index].value()
@@ -320,12 +595,27 @@ class ConstantUtf8(GenericConstant):
     '''The CONSTANT_Utf8_info structure is used to represent constant string values
     '''
 
+    __slots__ = ('str_value',)
+
     def __init__(self):
         super().__init__(CONSTANT_Utf8)
 
     def parse(self, fd):
         length = read_bytes.read_u2_int(fd)
-        self.str_value = read_bytes.read_string(fd, length)
+        self.str_value = symbol_table.intern(
+            read_bytes.read_string(fd, length))
+
+    def parse_from(self, buf, offset):
+        length = read_bytes.U2.unpack_from(buf, offset)[0]
+        offset += 2
+        self.str_value = symbol_table.intern(read_bytes.decode_modified_utf8(
+            buf[offset:offset + length]))
+        return offset + length
+
+    def __setstate__(self, state):
+        # Strings of an unpickled class are interned again
+        super().__setstate__(state)
+        self.str_value = symbol_table.intern(self.str_value)
 
     def value(self):
         return self.str_value
@@ -343,6 +633,8 @@ class ConstantMethodHandle(GenericConstant):
     a method handle
     '''
 
+    __slots__ = ('reference_kind', 'reference_index')
+
     def __init__(self):
         super().__init__(CONSTANT_MethodHandle)
 
@@ -352,6 +644,11 @@ class ConstantMethodHandle(GenericConstant):
         # TODO: validate type and index after parse all
         # In spec 4.6.8
 
+    def parse_from(self, buf, offset):
+        self.reference_kind, self.reference_index =\
+            read_bytes.U1_U2.unpack_from(buf, offset)
+        return offset + 3
+
     def debug_info(self, prefix, class_struct):
         logging.debug(
             prefix +
@@ -367,6 +664,8 @@ class ConstantMethodType(GenericConstant):
     a method type
     '''
 
+    __slots__ = ('descriptor_index',)
+
     def __init__(self):
         super().__init__(CONSTANT_MethodType)
 
@@ -375,6 +674,10 @@ class ConstantMethodType(GenericConstant):
         # TODO: validate  index after parse all
         # In spec 4.6.9
 
+    def parse_from(self, buf, offset):
+        self.descriptor_index = read_bytes.U2.unpack_from(buf, offset)[0]
+        return offset + 2
+
     def debug_info(self, prefix, class_struct):
         logging.debug(
             prefix +
@@ -389,6 +692,8 @@ class ConstantInvokeDynamic(GenericConstant):
     to specify a bootstrap method
     '''
 
+    __slots__ = ('bootstrap_method_attr_index', 'name_and_type_index')
+
     def __init__(self):
         super().__init__(CONSTANT_InvokeDynamic)
 
@@ -398,6 +703,11 @@ class ConstantInvokeDynamic(GenericConstant):
         # TODO: validate  index after parse all
         # In spec 4.6.10
 
+    def parse_from(self, buf, offset):
+        self.bootstrap_method_attr_index, self.name_and_type_index =\
+            read_bytes.U2_U2.unpack_from(buf, offset)
+        return offset + 4
+
     def debug_info(self, prefix, class_struct):
         logging.debug(
             prefix +
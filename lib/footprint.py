@@ -0,0 +1,106 @@
+'''Memory footprint of the classes in the method area, for sizing the
+containers the VM runs in.
+
+The bytes of each class are split into its constant pool, its decoded code
+(the instructions of the methods which have run), the class file bytes kept
+for deferred attributes, and the rest of its metadata. Objects shared by
+classes, such as interned names and access flags, are only counted for the
+first class which refers to them.
+'''
+import logging
+import sys
+from lib import constant_pool
+from lib import instruction
+from lib import slotted
+
+CATEGORIES = ('metadata', 'constant_pool', 'decoded_code', 'class_bytes')
+
+_containers = (dict, list, tuple, set, frozenset)
+
+
+def _references(obj):
+    if isinstance(obj, dict):
+        return list(obj.keys()) + list(obj.values())
+    if isinstance(obj, _containers):
+        return obj
+    if isinstance(obj, slotted.Slotted):
+        return obj.__getstate__().values()
+    if isinstance(obj, (constant_pool.ConstantPool, instruction._instruction)):
+        return [obj.__dict__]
+    # Other objects, such as class file sources and heap objects held by an
+    # instruction, are only counted by their own size
+    return ()
+
+
+def deep_size(obj, seen):
+    '''Bytes of obj and everything it refers to, except the objects in seen,
+    which is updated with the objects counted.
+    '''
+    size = 0
+    pending = [obj]
+    while pending:
+        obj = pending.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        pending.extend(_references(obj))
+    return size
+
+
+def class_footprint(class_struct, seen):
+    '''Return bytes of class_struct per category'''
+    # Other classes are only referred to, by deferred attributes
+    seen.add(id(class_struct))
+    footprint = dict.fromkeys(CATEGORIES, 0)
+    footprint['metadata'] = sys.getsizeof(class_struct)
+    footprint['constant_pool'] = deep_size(class_struct.constant_pool, seen)
+    decoded_code = 0
+    for method in class_struct.methods:
+        code = method.code()
+        if code:
+            decoded_code += deep_size(code._instructions, seen)
+    footprint['decoded_code'] = decoded_code
+    footprint['class_bytes'] = deep_size(class_struct._class_bytes, seen)
+    for value in class_struct.__getstate__().values():
+        footprint['metadata'] += deep_size(value, seen)
+    return footprint
+
+
+def method_area_footprint(method_area):
+    '''Return {class name: {category: bytes}} of all classes'''
+    seen = set(id(class_struct) for class_struct in method_area.values())
+    return {
+        class_name: class_footprint(class_struct, seen)
+        for class_name, class_struct in method_area.items()
+    }
+
+
+def report(method_area, out=None, top=20):
+    '''Log the total footprint of the method area, and the top classes, or
+    write them into out.
+    '''
+    footprints = method_area_footprint(method_area)
+    totals = dict.fromkeys(CATEGORIES, 0)
+    for footprint in footprints.values():
+        for category in CATEGORIES:
+            totals[category] += footprint[category]
+    lines = [
+        f'Method area: {len(footprints)} classes, '
+        f'{sum(totals.values())} bytes',
+        ' '.join(f'{category}: {totals[category]}'
+                 for category in CATEGORIES),
+        f'{"class":<50} {"total":>9} ' +
+        ' '.join(f'{category:>13}' for category in CATEGORIES),
+    ]
+    largest = sorted(
+        footprints.items(), key=lambda item: -sum(item[1].values()))
+    for class_name, footprint in largest[:top]:
+        lines.append(
+            f'{class_name:<50} {sum(footprint.values()):>9} ' +
+            ' '.join(f'{footprint[category]:>13}' for category in CATEGORIES))
+    for line in lines:
+        if out:
+            out.write(line + '\n')
+        else:
+            logging.info(line)
@@ -1,5 +1,6 @@
 from collections import deque
 from lib import class_loader
+from lib import symbol_table
 
 
 class Object(object):
@@ -13,9 +14,12 @@ class Object(object):
     def __str__(self):
         return f'Object of class {self.klass.name()}'
 
+    # Fields of an object are keyed by their member ID in the symbol table,
+    # see lib/symbol_table.py
+
     def set_field(self, field_klass_name, field_type, field_name, field_value):
-        self.fields[f'{field_type} {field_klass_name}.{field_name}'] = \
-            field_value
+        self.fields[symbol_table.member_id(
+            field_klass_name, field_name, field_type)] = field_value
 
     def set_field_default(self, field_klass_name, field_type, field_name):
         value = 0
@@ -28,10 +32,12 @@ class Object(object):
             value = None
         elif len(field_type) > 1 and field_type[0] == '[':
             value = []
-        self.fields[f'{field_type} {field_klass_name}.{field_name}'] = value
+        self.fields[symbol_table.member_id(
+            field_klass_name, field_name, field_type)] = value
 
     def get_field(self, field_klass_name, field_type, field_name):
-        return self.fields[f'{field_type} {field_klass_name}.{field_name}']
+        return self.fields[symbol_table.member_id(
+            field_klass_name, field_name, field_type)]
 
 
 class _LocalVariables(list):
@@ -51,6 +57,9 @@ class Frame(object):
         self.klass = klass
         self.method = method
         self.next_ops_address = 0
+        # The method invocation an invoke instruction results in, see
+        # NextStep in lib/instruction.py
+        self.invocation = None
         self.code = method.code()
         if not self.code:
             raise RuntimeError('Could not find code in method')
@@ -6,7 +6,8 @@ implementation in this file.
 from collections import defaultdict
 from lib import (
     frame,
-    run_time_data
+    run_time_data,
+    symbol_table
 )
 
 
@@ -31,7 +32,6 @@ def has_jdk_method(klass, method, descriptor):
 
 
 def get_jdk_method(klass, method, descriptor):
-    print(f' ---- try to get jdk method: {klass} {method} {descriptor}')
     if has_jdk_method(klass, method, descriptor):
         return _JDK_M_IMPLS[klass][(method, descriptor)]
     return None
@@ -83,12 +83,9 @@ def jdk_method(klass, method, descriptor):
 def java_io_filedescriptor_clinit(stack):
     fd_class = run_time_data.class_static_fields['java/io/FileDescriptor']
     klass = run_time_data.method_area['java/io/FileDescriptor']
-    fd_class[('in', 'Ljava/io/FileDescriptor;')] = frame.Object(klass)
-    fd_class[('out', 'Ljava/io/FileDescriptor;')] = frame.Object(klass)
-    fd_class[('err', 'Ljava/io/FileDescriptor;')] = frame.Object(klass)
-    fd_class[('in', 'Ljava/io/FileDescriptor;')].set_field(
-        'java/io/FileDescriptor', 'I', 'fd', 0)
-    fd_class[('out', 'Ljava/io/FileDescriptor;')].set_field(
-        'java/io/FileDescriptor', 'I', 'fd', 1)
-    fd_class[('err', 'Ljava/io/FileDescriptor;')].set_field(
-        'java/io/FileDescriptor', 'I', 'fd', 2)
+    for fd, name in enumerate(('in', 'out', 'err')):
+        fd_object = frame.Object(klass)
+        fd_object.set_field('java/io/FileDescriptor', 'I', 'fd', fd)
+        fd_class[symbol_table.member_id(
+            'java/io/FileDescriptor', name, 'Ljava/io/FileDescriptor;')] =\
+            fd_object
@@ -0,0 +1,169 @@
+'''A runtime image, all class files of a runtime tree such as openjdk_jre/lib
+packed into one file, which is mapped into memory once and read without an
+open() per class. The map is shared in the page cache by every process which
+uses the same image.
+
+Layout of the image, all numbers are little endian:
+
+    header      magic, version, entry count, bucket count, offsets of the
+                entry table, the string table and the class bytes
+    buckets     bucket count + 1 u4, the first entry of each bucket, entries
+                of bucket b are entries[buckets[b]:buckets[b + 1]]
+    entries     per class: name offset and length in the string table,
+                class bytes offset and length, CRC-32 of the class bytes
+    strings     UTF-8 class names, such as java/lang/Object
+    class bytes
+
+The bucket of a class is the CRC-32 of its name modulo the bucket count, so
+finding a class is one hash, and a compare of the names in its bucket.
+'''
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b'JEDYIMG\0'
+VERSION = 1
+SUFFIX = '.image'
+# Name of the image in the lib directory of a java home
+IMAGE_NAME = 'jre' + SUFFIX
+
+# magic, version, entry count, bucket count, entries offset, strings
+# offset, data offset
+_HEADER = struct.Struct('<8sIIIIQQ')
+_BUCKET = struct.Struct('<I')
+# name offset, name length, data offset, data length, crc
+_ENTRY = struct.Struct('<IIQII')
+
+
+class Image(object):
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, 'rb') as image_file:
+            self.map = mmap.mmap(
+                image_file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.count, self.bucket_count, self.entries_offset,
+         self.strings_offset, self.data_offset) =\
+            _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{file_name} is not a runtime image.')
+        if version != VERSION:
+            raise ValueError(
+                f'Version {version} of runtime image {file_name} is not '
+                f'supported.')
+
+    def find(self, name):
+        '''Return the entry index of the class name, or None'''
+        encoded = name.encode('utf-8')
+        bucket = zlib.crc32(encoded) % self.bucket_count
+        offset = _HEADER.size + bucket * _BUCKET.size
+        first, end = struct.unpack_from('<II', self.map, offset)
+        for index in range(first, end):
+            name_offset, name_length, _, _, _ = _ENTRY.unpack_from(
+                self.map, self.entries_offset + index * _ENTRY.size)
+            name_offset += self.strings_offset
+            if name_length == len(encoded) and\
+                    self.map[name_offset:name_offset + name_length] == encoded:
+                return index
+        return None
+
+    def __contains__(self, name):
+        return self.find(name) is not None
+
+    def entry(self, index):
+        '''Return (name, data offset, data length, crc) of an entry'''
+        name_offset, name_length, data_offset, data_length, crc =\
+            _ENTRY.unpack_from(
+                self.map, self.entries_offset + index * _ENTRY.size)
+        name_offset += self.strings_offset
+        name = self.map[name_offset:name_offset + name_length].decode('utf-8')
+        return name, data_offset, data_length, crc
+
+    def read(self, index):
+        '''Return the class bytes of an entry, a memoryview of the map'''
+        _, data_offset, data_length, _ = self.entry(index)
+        return memoryview(self.map)[data_offset:data_offset + data_length]
+
+    def names(self):
+        for index in range(self.count):
+            yield self.entry(index)[0]
+
+
+def find_class_files(root):
+    '''Yield (class name, file name) of every class file under root'''
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith('.class'):
+                file_name = os.path.join(dirpath, filename)
+                name = os.path.relpath(file_name, root)[:-len('.class')]
+                yield name.replace(os.sep, '/'), file_name
+
+
+def pack(root, out_file):
+    '''Pack all class files under root into the image out_file, and return
+    the number of classes in it. Raise ValueError if root is not a directory
+    or has no class files, no image is written then.
+    '''
+    if not os.path.isdir(root):
+        raise ValueError(f'{root} is not a directory of class files.')
+    classes = sorted(find_class_files(root))
+    count = len(classes)
+    if not count:
+        raise ValueError(f'No class files under {root}.')
+    bucket_count = max(1, count)
+    encoded = [name.encode('utf-8') for name, _ in classes]
+    order = sorted(
+        range(count), key=lambda i: zlib.crc32(encoded[i]) % bucket_count)
+    buckets = [0] * (bucket_count + 1)
+    for i in order:
+        buckets[zlib.crc32(encoded[i]) % bucket_count + 1] += 1
+    for bucket in range(bucket_count):
+        buckets[bucket + 1] += buckets[bucket]
+
+    entries_offset = _HEADER.size + (bucket_count + 1) * _BUCKET.size
+    strings_offset = entries_offset + count * _ENTRY.size
+    strings = bytearray()
+    name_offsets = []
+    for i in order:
+        name_offsets.append(len(strings))
+        strings += encoded[i]
+    data_offset = strings_offset + len(strings)
+
+    temp_file = out_file + '.tmp'
+    with open(temp_file, 'wb') as image_file:
+        image_file.seek(data_offset)
+        entries = bytearray()
+        for position, i in enumerate(order):
+            with open(classes[i][1], 'rb') as class_file:
+                data = class_file.read()
+            entries += _ENTRY.pack(
+                name_offsets[position], len(encoded[i]), image_file.tell(),
+                len(data), zlib.crc32(data))
+            image_file.write(data)
+        image_file.seek(0)
+        image_file.write(_HEADER.pack(
+            MAGIC, VERSION, count, bucket_count, entries_offset,
+            strings_offset, data_offset))
+        for bucket in buckets:
+            image_file.write(_BUCKET.pack(bucket))
+        image_file.write(entries)
+        image_file.write(strings)
+    os.replace(temp_file, out_file)
+    return count
+
+
+def is_image(path):
+    return os.path.splitext(path)[1] == SUFFIX
+
+
+def runtime_path(java_home):
+    '''The class path entry of the runtime in java_home: java_home itself if
+    it's an image, the image in its lib directory if there is one, or else
+    the lib directory.
+    '''
+    if os.path.isfile(java_home):
+        return java_home
+    image_file = os.path.join(java_home, 'lib', IMAGE_NAME)
+    if os.path.isfile(image_file):
+        return image_file
+    return os.path.join(java_home, 'lib')
@@ -0,0 +1,105 @@
+'''Inline caches of the call sites of invokevirtual and invokeinterface.
+
+The method which a call site invokes is selected by the class of objectref,
+in its vtable or itable, see ClassStruct.link. Each call site caches what it
+selected, keyed by the class of objectref: one class while it's monomorphic,
+up to max_receivers classes while it's polymorphic. A call site which sees
+more classes than that is megamorphic, it caches no more classes and selects
+on every call to any other class.
+
+Hits and misses are counted per call site, report writes them at exit with
+--stats. A cache is emptied on its next miss after a class is unloaded, see
+lib/class_unloading.py.
+'''
+import logging
+import weakref
+from lib import class_unloading
+
+max_receivers = 4
+
+# Every call site with an inline cache, see report
+sites = weakref.WeakSet()
+
+
+class InlineCache(object):
+    __slots__ = (
+        'method',
+        'pc',
+        'select',
+        'receiver',
+        'target',
+        'receivers',
+        'megamorphic',
+        'generation',
+        'hits',
+        'misses',
+        '__weakref__',
+    )
+
+    def __init__(self, method, pc, select):
+        # The call site, "Class.method" and the pc of the instruction
+        self.method = method
+        self.pc = pc
+        # Select the target of a class of objectref
+        self.select = select
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+        sites.add(self)
+
+    def clear(self):
+        # The class of objectref and its target in the monomorphic state,
+        # the other classes and their targets in the polymorphic state
+        self.receiver = None
+        self.target = None
+        self.receivers = {}
+        self.megamorphic = False
+        self.generation = class_unloading.generation
+
+    def state(self):
+        if self.megamorphic:
+            return 'megamorphic'
+        if self.receivers:
+            return 'polymorphic'
+        if self.receiver is not None:
+            return 'monomorphic'
+        return 'uninitialized'
+
+    def lookup(self, klass):
+        '''Return the target of klass, the class of objectref'''
+        if klass is self.receiver:
+            self.hits += 1
+            return self.target
+        target = self.receivers.get(klass, None)
+        if target is not None:
+            self.hits += 1
+            return target
+        self.misses += 1
+        if self.generation != class_unloading.generation:
+            self.clear()
+        target = self.select(klass)
+        if self.receiver is None:
+            self.receiver = klass
+            self.target = target
+        elif self.megamorphic:
+            pass
+        elif len(self.receivers) + 1 < max_receivers:
+            self.receivers[klass] = target
+        else:
+            self.megamorphic = True
+        return target
+
+
+def report(out=None):
+    '''Log the state, hits and misses of every call site sorted by site, or
+    write them into out
+    '''
+    for cache in sorted(sites, key=lambda cache: (cache.method, cache.pc)):
+        line = (
+            f'inline_cache {cache.method}@{cache.pc}: {cache.state()}, '
+            f'hits: {cache.hits}, misses: {cache.misses}'
+        )
+        if out:
+            out.write(line + '\n')
+        else:
+            logging.info(line)
@@ -1,8 +1,10 @@
-import logging
+from collections import namedtuple
 from enum import Enum, unique
+from lib import class_unloading
 from lib import constant_pool
+from lib import inline_cache
+from lib import metrics
 from lib import run_time_data
-from lib import descriptor
 from lib import frame as FRAME
 from lib.hijack_jre_methods import get_native_method
 from lib import class_loader
@@ -19,40 +21,51 @@ def bytecode(code):
 
 @unique
 class NextStep(Enum):
+    '''Returned by execute of an instruction, None is next_instruction.
+    Everything else an instruction results in is in the frame it runs on:
+
+    - jump_to: continue at frame.next_ops_address
+    - invoke_method: invoke frame.invocation, an Invocation, then continue
+      at the next instruction, the method of the invocation is already
+      resolved if it's not None
+    - method_return: return void
+    - method_return_value: return the value on top of the operand stack
+    '''
     next_instruction = 0
     jump_to = 1
     invoke_method = 2
     method_return = 3
+    method_return_value = 4
+
+
+Invocation = namedtuple(
+    'Invocation',
+    (
+        'class_name',
+        'method_name',
+        'method_descriptor',
+        'objectref',
+        'parameters',
+        'method',
+    ),
+    defaults=(None,)
+)
+
+
+def pop_parameters(frame, parameter_count):
+    '''Pop the parameters of a method from the operand stack'''
+    parameters = [frame.operand_stack.pop() for _ in range(parameter_count)]
+    parameters.reverse()
+    return parameters
 
 
 class _instruction(object):
+    '''An instruction holds only its address and operands, so the decoded
+    code of a method is shared by all frames which run it.
+    '''
+
     def __init__(self, address):
         self.address = address
-        # For method internal loop
-        self.need_jump = False
-        self.jump_to_address = None
-        # For call other method
-        self.invoke_method = False
-        self.invoke_class_name = None
-        self.invoke_method_name = None
-        self.invoke_method_descriptor = None
-        self.invoke_objectref = None
-        self.invoke_parameters = []
-        # For return
-        self.method_return = False
-        self.return_value = None
-
-    def init_jump(self):
-        self.need_jump = False
-        self.jump_to_address = None
-
-    def init_invoke_method(self):
-        self.invoke_method = False
-        self.invoke_class_name = None
-        self.invoke_method_name = None
-        self.invoke_method_descriptor = None
-        self.invoke_objectref = None
-        self.invoke_parameters = []
 
     def len_of_operand(self):
         return 0
@@ -63,29 +76,61 @@ class _instruction(object):
     def class_name_and_address(self):
         return '{name} (addr:{address})'.format(name=type(self).__name__, address=self.address)
 
-    def next_step(self):
-        if self.invoke_method:
-            return NextStep.invoke_method
-        elif self.need_jump:
-            return NextStep.jump_to
-        elif self.method_return:
-            return NextStep.method_return
-        else:
-            return NextStep.next_instruction
-
     def execute(self, frame):
         raise NotImplementedError('execute in base instruction is not implemented, instruction {name}'.format(name=self.class_name_and_address()))
 
 
+def quicken(frame, quick):
+    '''Replace the instruction in the code of frame by its quick variant,
+    after the instruction is resolved.
+    '''
+    frame.code.instructions[quick.address] = quick
+    metrics.counters['instruction.quickened'] += 1
+
+
+class _quick(_instruction):
+    '''Quick variant of an instruction, which holds what the instruction
+    resolved from the constant pool, so it executes without resolving.
+
+    What is resolved from another class is stale once a class is unloaded,
+    see lib/class_unloading.py, a quick variant which holds such things
+    checks the generation and executes its instruction instead, which
+    resolves and quickens again.
+    '''
+
+    def __init__(self, instr, class_name=None):
+        super().__init__(instr.address)
+        self.instr = instr
+        self.generation = class_unloading.generation
+        # A class which can be evicted is kept recently used on each use,
+        # as the lookup in the method area does
+        self.lru_class_name =\
+            class_name if class_name in class_unloading.lru else None
+
+    def len_of_operand(self):
+        return self.instr.len_of_operand()
+
+    def stale(self):
+        if self.generation != class_unloading.generation:
+            return True
+        if self.lru_class_name is not None:
+            class_unloading.lru.move_to_end(self.lru_class_name)
+        return False
+
+    def __reduce__(self):
+        # What is resolved is only valid in this run
+        return _unquickened, (self.instr,)
+
+
+def _unquickened(instr):
+    '''A quick variant is unpickled as its instruction'''
+    return instr
+
+
 @bytecode(0x01)
 class aconst_null(_instruction):
     def execute(self, frame):
         frame.operand_stack.append(None)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'push null onto operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 class iconst_i(_instruction):
@@ -95,11 +140,6 @@ class iconst_i(_instruction):
 
     def execute(self, frame):
         frame.operand_stack.append(self.i)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'push {self.i} onto operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 @bytecode(0x02)
@@ -182,17 +222,27 @@ class ldc(_instruction):
     def execute(self, frame):
         constant = frame.klass.constant_pool[self.index]
         if type(constant) is constant_pool.ConstantString:
-            frame.operand_stack.append(
-                frame.klass.constant_pool[constant.string_index].value())
+            value = frame.klass.constant_pool.string(self.index)
         elif type(constant) in (
             constant_pool.ConstantInteger,
             constant_pool.ConstantFloat
         ):
-            frame.operand_stack.append(constant.value)
+            value = constant.value
         else:
             assert False, \
                 f'constant type is {type(constant)}, '\
                 'not know what is used for yet'
+        frame.operand_stack.append(value)
+        quicken(frame, ldc_quick(self, value))
+
+
+class ldc_quick(_quick):
+    def __init__(self, instr, value):
+        super().__init__(instr)
+        self.value = value
+
+    def execute(self, frame):
+        frame.operand_stack.append(self.value)
 
 
 class iload_n(_instruction):
@@ -203,13 +253,6 @@ class iload_n(_instruction):
     def execute(self, frame):
         assert type(frame.local_variables[self.n]) is int
         frame.operand_stack.append(frame.local_variables[self.n])
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'push {frame.local_variables[self.n]} onto operand stack '
-            f'from local variable {self.n}\n'
-            f'\t{frame.operand_debug_str()}\n'
-            f'\t{frame.local_variable_debug_str()}'
-        )
 
 
 @bytecode(0x15)
@@ -260,13 +303,6 @@ class astore_n(_instruction):
         assert type(objectref) is FRAME.Object,\
             f'Type of ref in astore is type(objectref)'
         frame.local_variables[self.n] = objectref
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'pop {objectref} from operand stack and store into '
-            f'local variable {self.n}\n'
-            f'\t{frame.operand_debug_str()}\n'
-            f'\t{frame.local_variable_debug_str()}'
-        )
 
 
 @bytecode(0x3a)
@@ -315,13 +351,6 @@ class aload_n(_instruction):
         assert type(frame.local_variables[self.n]) is FRAME.Object,\
             f'Type of ref in aload is {type(frame.local_variables[self.n])}'
         frame.operand_stack.append(frame.local_variables[self.n])
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'push {frame.local_variables[self.n]} onto operand stack '
-            f'from local variable {self.n}\n'
-            f'\t{frame.operand_debug_str()}\n'
-            f'\t{frame.local_variable_debug_str()}'
-        )
 
 
 @bytecode(0x25)
@@ -370,12 +399,6 @@ class istore_n(_instruction):
         i = frame.operand_stack.pop()
         assert type(i) is int
         frame.local_variables[self.n] = i
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'pop {i} from operand stack and set to local variable {self.n}\n'
-            f'\t{frame.operand_debug_str()}\n'
-            f'\t{frame.local_variable_debug_str()}'
-        )
 
 
 @bytecode(0x36)
@@ -419,22 +442,12 @@ class istore_3(istore_n):
 class pop(_instruction):
     def execute(self, frame):
         frame.operand_stack.pop()
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            'Pop the top value from the operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 @bytecode(0x59)
 class dup(_instruction):
     def execute(self, frame):
         frame.operand_stack.append(frame.operand_stack[-1])
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            'Duplicate the top operand stack value\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 @bytecode(0x60)
@@ -446,11 +459,6 @@ class iadd(_instruction):
         assert type(value2) is int
         value = value1 + value2
         frame.operand_stack.append(value)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'add value1 and value2, push {value} onto operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 @bytecode(0x70)
@@ -464,12 +472,6 @@ class irem(_instruction):
         # value = int(value1 - int(value1 / value2) * value2)
         value = value1 % value2
         frame.operand_stack.append(value)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: Remainder int, '
-            f'value1 is {value1}, value2 is {value2}, '
-            f'push result value {value} onto operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 @bytecode(0x64)
@@ -481,11 +483,6 @@ class isub(_instruction):
         assert type(value2) is int
         value = value1 - value2
         frame.operand_stack.append(value)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'Subtract value1 and value2, push {value} onto operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 @bytecode(0x68)
@@ -497,11 +494,6 @@ class imul(_instruction):
         assert type(value2) is int
         value = value1 * value2
         frame.operand_stack.append(value)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'multiply value1 and value2, push {value} onto operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 @bytecode(0x6c)
@@ -518,11 +510,6 @@ class idiv(_instruction):
             )
         value = value1 // value2
         frame.operand_stack.append(value)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'Divide value1 and value2, push {value} onto operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
 
 
 @bytecode(0x84)
@@ -537,14 +524,6 @@ class iinc(_instruction):
 
     def execute(self, frame):
         frame.local_variables[self.index] = frame.local_variables[self.index] + self.const
-        logging.debug(
-            'Instruction {na}: increate local value {i} by {v} to value {fv}'.format(
-                na=self.class_name_and_address(),
-                i=self.index,
-                v=self.const,
-                fv=frame.local_variables[self.index]
-            )
-        )
 
 
 class if_icmpcond(_instruction):
@@ -556,18 +535,13 @@ class if_icmpcond(_instruction):
         self.offset = int.from_bytes(operand_bytes, byteorder='big', signed=True)
 
     def execute(self, frame):
-        self.init_jump()
         value2 = frame.operand_stack.pop()
         value1 = frame.operand_stack.pop()
-        if self.cmp(value1, value2):
-            self.need_jump = True
-            self.jump_to_address = self.address + self.offset
-        logging.debug(
-            'Instruction {na}: compare value1 and value2 from stack, result need {j}'.format(
-                na=self.class_name_and_address(),
-                j='jump to address {0}'.format(self.jump_to_address) if self.need_jump else 'not jump'
-            )
-        )
+        need_jump = self.cmp(value1, value2)
+        if need_jump:
+            frame.next_ops_address = self.address + self.offset
+        if need_jump:
+            return NextStep.jump_to
 
     def cmp(self, value1, value2):
         raise NotImplementedError('cmp function in if_icmpcond will not be implement.')
@@ -619,54 +593,31 @@ class goto(_instruction):
         self.offset = int.from_bytes(operand_bytes, byteorder='big', signed=True)
 
     def execute(self, frame):
-        self.need_jump = True
-        self.jump_to_address = self.address + self.offset
-        logging.debug(
-            'Instruction {na}: jump to address {a}'.format(
-                na=self.class_name_and_address(),
-                a=self.jump_to_address
-            )
-        )
+        frame.next_ops_address = self.address + self.offset
+        return NextStep.jump_to
 
 
 @bytecode(0xac)
 class ireturn(_instruction):
     def execute(self, frame):
-        self.method_return = True
-        self.return_value = frame.operand_stack.pop()
-        assert type(self.return_value) is int, 'ireturn, but get value from operand in type {t}'.format(type(self.return_value))
-        logging.debug(
-            'Instruction {na}: return value {v}'.format(
-                na=self.class_name_and_address(),
-                v=self.return_value
-            )
-        )
+        return_value = frame.operand_stack[-1]
+        assert type(return_value) is int, 'ireturn, but get value from operand in type {t}'.format(t=type(return_value))
+        return NextStep.method_return_value
 
 
 @bytecode(0xb0)
 class areturn(_instruction):
     def execute(self, frame):
-        self.method_return = True
-        self.return_value = frame.operand_stack.pop()
-        assert type(self.return_value) is FRAME.Object, \
-            f'areturn, but get value from operand in type {type(self.return_value)}'
-        logging.debug(
-            'Instruction {na}: return value {v}'.format(
-                na=self.class_name_and_address(),
-                v=self.return_value
-            )
-        )
+        return_value = frame.operand_stack[-1]
+        assert type(return_value) is FRAME.Object, \
+            f'areturn, but get value from operand in type {type(return_value)}'
+        return NextStep.method_return_value
 
 
 @bytecode(0xb1)
 class instruction_return(_instruction):
     def execute(self, frame):
-        self.method_return = True
-        logging.debug(
-            'Instruction {na}: void return'.format(
-                na=self.class_name_and_address()
-            )
-        )
+        return NextStep.method_return
 
 
 @bytecode(0xb2)
@@ -680,22 +631,28 @@ class getstatic(_instruction):
             operand_bytes, byteorder='big', signed=False)
 
     def execute(self, frame):
-        field_ref = frame.klass.constant_pool[self.index]
-        assert type(field_ref) is constant_pool.ConstantFieldref
-        class_name = field_ref.get_class(frame.klass.constant_pool)
+        class_name, _, _, field_id =\
+            frame.klass.constant_pool.field_ref(self.index)
         assert run_time_data.method_area[class_name],\
             f'Can\'t load class {class_name}'
-        name, field = field_ref.get_name_descriptor(frame.klass.constant_pool)
-        value = run_time_data.class_static_fields[class_name][(name, field)]
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'get static filed {class_name}.{name}({field}) '
-            'and push onto operand stack'
-        )
-        frame.operand_stack.append(value)
-        logging.debug(
-            f'After exec getstatic, operand stack: {frame.operand_debug_str()}'
-        )
+        fields = run_time_data.class_static_fields[class_name]
+        frame.operand_stack.append(fields[field_id])
+        quicken(frame, getstatic_quick(self, class_name, fields, field_id))
+
+
+class getstatic_quick(_quick):
+    '''Holds the static fields of the class, and the member ID of the field
+    '''
+
+    def __init__(self, instr, class_name, fields, field_id):
+        super().__init__(instr, class_name)
+        self.fields = fields
+        self.field_id = field_id
+
+    def execute(self, frame):
+        if self.stale():
+            return self.instr.execute(frame)
+        frame.operand_stack.append(self.fields[self.field_id])
 
 
 @bytecode(0xb3)
@@ -709,21 +666,20 @@ class putstatic(_instruction):
             operand_bytes, byteorder='big', signed=False)
 
     def execute(self, frame):
-        field_ref = frame.klass.constant_pool[self.index]
-        assert type(field_ref) is constant_pool.ConstantFieldref
-        class_name = field_ref.get_class(frame.klass.constant_pool)
+        class_name, _, _, field_id =\
+            frame.klass.constant_pool.field_ref(self.index)
         assert run_time_data.method_area[class_name],\
             f'Can\'t load class {class_name}'
-        name, field = field_ref.get_name_descriptor(frame.klass.constant_pool)
-        value = frame.operand_stack.pop()
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'Put {value} on filed {class_name}.{name}({field})'
-        )
-        run_time_data.class_static_fields[class_name][(name, field)] = value
-        logging.debug(
-            f'After exec putstatic, operand stack: {frame.operand_debug_str()}'
-        )
+        fields = run_time_data.class_static_fields[class_name]
+        fields[field_id] = frame.operand_stack.pop()
+        quicken(frame, putstatic_quick(self, class_name, fields, field_id))
+
+
+class putstatic_quick(getstatic_quick):
+    def execute(self, frame):
+        if self.stale():
+            return self.instr.execute(frame)
+        self.fields[self.field_id] = frame.operand_stack.pop()
 
 
 @bytecode(0xb4)
@@ -741,21 +697,26 @@ class getfield(_instruction):
         instruction, for type check and for access permission. But they are
         all ignored, as we assume this is correct JAVA class file.
         '''
-        field_ref = frame.klass.constant_pool[self.index]
-        assert type(field_ref) is constant_pool.ConstantFieldref
-        class_name = field_ref.get_class(frame.klass.constant_pool)
-        name, field = field_ref.get_name_descriptor(frame.klass.constant_pool)
+        field_id = frame.klass.constant_pool.field_ref(self.index).field_id
+        obj = frame.operand_stack.pop()
+        frame.operand_stack.append(obj.fields[field_id])
+        quicken(frame, getfield_quick(self, field_id))
 
+
+class getfield_quick(_quick):
+    '''Holds the member ID of the field, see lib/symbol_table.py. It's never
+    stale, a member keeps its ID for the whole run of the VM, but IDs are
+    assigned in the order members are first seen, so they differ between
+    runs.
+    '''
+
+    def __init__(self, instr, field_id):
+        super().__init__(instr)
+        self.field_id = field_id
+
+    def execute(self, frame):
         obj = frame.operand_stack.pop()
-        value = obj.get_field(class_name, field, name)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'Get {obj}(id:{id(obj)}) filed {name} value {value}'
-        )
-        frame.operand_stack.append(value)
-        logging.debug(
-            f'After exec putfield, operand stack: {frame.operand_debug_str()}'
-        )
+        frame.operand_stack.append(obj.fields[self.field_id])
 
 
 @bytecode(0xb5)
@@ -773,21 +734,18 @@ class putfield(_instruction):
         instruction, for type check and for access permission. But they are
         all ignored, as we assume this is correct JAVA class file.
         '''
-        field_ref = frame.klass.constant_pool[self.index]
-        assert type(field_ref) is constant_pool.ConstantFieldref
-        class_name = field_ref.get_class(frame.klass.constant_pool)
-        name, field = field_ref.get_name_descriptor(frame.klass.constant_pool)
+        field_id = frame.klass.constant_pool.field_ref(self.index).field_id
+        value = frame.operand_stack.pop()
+        obj = frame.operand_stack.pop()
+        obj.fields[field_id] = value
+        quicken(frame, putfield_quick(self, field_id))
+
 
+class putfield_quick(getfield_quick):
+    def execute(self, frame):
         value = frame.operand_stack.pop()
         obj = frame.operand_stack.pop()
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'Set {obj}(id:{id(obj)}) filed {name} as value {value}'
-        )
-        obj.set_field(class_name, field, name, value)
-        logging.debug(
-            f'After exec putfield, operand stack: {frame.operand_debug_str()}'
-        )
+        obj.fields[self.field_id] = value
 
 
 @bytecode(0xb7)
@@ -804,25 +762,17 @@ class invokespecial(_instruction):
             operand_bytes, byteorder='big', signed=False)
 
     def execute(self, frame):
-        self.init_invoke_method()
-        method_ref = frame.klass.constant_pool[self.index]
-        assert type(method_ref) in (
-            constant_pool.ConstantMethodref,
-            constant_pool.ConstantInterfaceMethodref
-        )
-        class_name = method_ref.get_class(frame.klass.constant_pool)
-        method_name, method_describ = method_ref.get_method(
-            frame.klass.constant_pool)
+        ref = frame.klass.constant_pool.method_ref(self.index)
+        class_name, method_name, method_describ, _ = ref
         # Find klass is not correct implemented now, but enough for invoke
         # super class construction
-        klass = run_time_data.method_area[class_name]
-        method = klass.get_method(method_name, method_describ)
+        klass, method = frame.klass.resolve_method(self.index)
         is_initialization_method = method_name in ['<init>', '<clinit>']
         super_class_name = frame.klass.constant_pool[
             frame.klass.constant_pool[frame.klass.super_class].name_index
         ]
-        is_super_class = type(method_ref) is constant_pool.ConstantMethodref\
-            and class_name == super_class_name
+        is_super_class = type(frame.klass.constant_pool[self.index]) is\
+            constant_pool.ConstantMethodref and class_name == super_class_name
         if not is_initialization_method and is_super_class\
                 and frame.klass.access_flags.super():
             klass = run_time_data.method_area[super_class_name]
@@ -831,27 +781,55 @@ class invokespecial(_instruction):
             # Otherwise, let C be the class or interface named by the symbolic
             # reference. Which don't need do anything
             pass
+        # An inherited method is declared by a super class of C
+        while method is None and klass.get_super_class():
+            klass = klass.get_super_class()
+            method = klass.get_method(method_name, method_describ)
+        assert method, f'Method {class_name}.{method_name} not found.'
         assert not method.access_flags.native(),\
             'Not support native method yet.'
         assert not method.access_flags.synchronized(),\
             'Not support synchronized method yet.'
-        logging.debug(
-            'Instruction {na}: {kl}:{me}'.format(
-                na=self.class_name_and_address(),
-                kl=class_name,
-                me=method_name
-            )
-        )
-        self.invoke_method = True
-        self.invoke_class_name = class_name
-        self.invoke_method_name = method_name
-        self.invoke_method_descriptor = method_describ
-        parameters, _ = descriptor.parse_method_descriptor(method_describ)
-        for _ in range(len(parameters)):
-            self.invoke_parameters.append(frame.operand_stack.pop())
+        parameters = pop_parameters(frame, ref.parameter_count)
         # Pop objectref from operand stack
-        self.invoke_objectref = frame.operand_stack.pop()
-        self.invoke_parameters.reverse()
+        objectref = frame.operand_stack.pop()
+        # The method is invoked in the class which declares it, see
+        # Thread.method_entrance
+        frame.invocation = Invocation(
+            method.class_name,
+            method_name,
+            method_describ,
+            objectref,
+            parameters
+        )
+        quicken(frame, invokespecial_quick(self, ref, method))
+        return NextStep.invoke_method
+
+
+class invokespecial_quick(_quick):
+    '''Holds the resolved method, and the number of its parameters'''
+
+    def __init__(self, instr, ref, method):
+        super().__init__(instr, method.class_name)
+        self.class_name = method.class_name
+        self.method_name = ref.name
+        self.method = method
+        self.parameter_count = ref.parameter_count
+
+    def execute(self, frame):
+        if self.stale():
+            return self.instr.execute(frame)
+        parameters = pop_parameters(frame, self.parameter_count)
+        objectref = frame.operand_stack.pop()
+        frame.invocation = Invocation(
+            self.class_name,
+            self.method_name,
+            self.method.descriptor,
+            objectref,
+            parameters,
+            self.method
+        )
+        return NextStep.invoke_method
 
 
 @bytecode(0xb8)
@@ -865,31 +843,18 @@ class invokestatic(_instruction):
             operand_bytes, byteorder='big', signed=False)
 
     def execute(self, frame):
-        self.init_invoke_method()
-        method_ref = frame.klass.constant_pool[self.index]
-        assert type(method_ref) in (
-            constant_pool.ConstantMethodref,
-            constant_pool.ConstantInterfaceMethodref
-        )
-        class_name = method_ref.get_class(frame.klass.constant_pool)
-        method_name, method_describ = method_ref.get_method(
-            frame.klass.constant_pool)
-        logging.debug(
-            'Instruction {na}: {kl}:{me}'.format(
-                na=self.class_name_and_address(),
-                kl=class_name,
-                me=method_name
-            )
-        )
-        klass = run_time_data.method_area[class_name]
+        ref = frame.klass.constant_pool.method_ref(self.index)
+        class_name, method_name, method_describ, _ = ref
+        klass, method = frame.klass.resolve_method(self.index)
         assert klass, f'Can\'t load class {class_name}'
 
-        method = klass.get_method(method_name, method_describ)
         if method.access_flags.native():
             fake_method = get_native_method(
                 class_name, method_name, method_describ)
             if fake_method:
                 fake_method(frame.operand_stack)
+                quicken(frame, invokestatic_native_quick(
+                    self, class_name, fake_method))
                 return
             else:
                 assert False, \
@@ -897,14 +862,41 @@ class invokestatic(_instruction):
                     f'{class_name}.{method_name}, descriptor {method_describ}'
         assert not method.access_flags.synchronized(),\
             'Not support synchronized method yet.'
-        self.invoke_method = True
-        self.invoke_class_name = class_name
-        self.invoke_method_name = method_name
-        self.invoke_method_descriptor = method_describ
-        parameters, _ = descriptor.parse_method_descriptor(method_describ)
-        for _ in range(len(parameters)):
-            self.invoke_parameters.append(frame.operand_stack.pop())
-        self.invoke_parameters.reverse()
+        parameters = pop_parameters(frame, ref.parameter_count)
+        frame.invocation = Invocation(
+            class_name, method_name, method_describ, None, parameters)
+        quicken(frame, invokestatic_quick(self, ref, method))
+        return NextStep.invoke_method
+
+
+class invokestatic_quick(invokespecial_quick):
+    def execute(self, frame):
+        if self.stale():
+            return self.instr.execute(frame)
+        frame.invocation = Invocation(
+            self.class_name,
+            self.method_name,
+            self.method.descriptor,
+            None,
+            pop_parameters(frame, self.parameter_count),
+            self.method
+        )
+        return NextStep.invoke_method
+
+
+class invokestatic_native_quick(_quick):
+    '''Holds the implementation of a native method, see
+    lib/hijack_jre_methods.py
+    '''
+
+    def __init__(self, instr, class_name, native_method):
+        super().__init__(instr, class_name)
+        self.native_method = native_method
+
+    def execute(self, frame):
+        if self.stale():
+            return self.instr.execute(frame)
+        self.native_method(frame.operand_stack)
 
 
 @bytecode(0xb9)
@@ -920,27 +912,17 @@ class invokeinterface(_instruction):
         assert operand_bytes[3] == 0
 
     def execute(self, frame):
-        self.init_invoke_method()
-        method_ref = frame.klass.constant_pool[self.index]
-        assert type(method_ref) is constant_pool.ConstantInterfaceMethodref
-        # class_name = method_ref.get_class(frame.klass.constant_pool)
-        method_name, method_describ = method_ref.get_method(
-            frame.klass.constant_pool)
-        assert method_name not in ['<init>', '<clinit>'],\
+        assert type(frame.klass.constant_pool[self.index]) is\
+            constant_pool.ConstantInterfaceMethodref
+        ref = frame.klass.constant_pool.method_ref(self.index)
+        assert ref.name not in ['<init>', '<clinit>'],\
             'Invoke initialization method in invokeinterface'
+        quick = invokeinterface_quick(self, ref, frame)
+        quicken(frame, quick)
+        return quick.execute(frame)
 
-        self.invoke_method_name = method_name
-        self.invoke_method_descriptor = method_describ
-        parameters, _ = descriptor.parse_method_descriptor(method_describ)
-        for _ in range(len(parameters)):
-            self.invoke_parameters.append(frame.operand_stack.pop())
-        self.invoke_parameters.reverse()
-        # Pop objectref from operand stack
-        self.invoke_objectref = frame.operand_stack.pop()
-
-        klass, method = self.invoke_objectref.klass.interface_resolution(
-            method_name, method_describ
-        )
+    def check_selected(self, method):
+        '''Check the method which is selected by the class of objectref'''
         if not method:
             # Not resoluve method
             assert False, 'Method resolve exception not implemented yet.'
@@ -952,11 +934,72 @@ class invokeinterface(_instruction):
             'Not support native method yet.'
         assert not method.access_flags.synchronized(),\
             'Not support synchronized method yet.'
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: {method.name}'
+
+
+class invokeinterface_quick(_quick):
+    '''Holds the name and descriptor of the method, the number of its
+    parameters, its slot in the vtable of the class which the method
+    reference names, and the inline cache of the call site, see
+    lib/inline_cache.py, of the methods which the instruction selects by
+    the class of objectref.
+
+    The method of the class of objectref is selected at the slot of its
+    itable of the interface, see ClassStruct.link.
+    '''
+
+    def __init__(self, instr, ref, frame):
+        super().__init__(instr)
+        self.ref_class_name = ref.class_name
+        self.method_name = ref.name
+        self.method_descriptor = ref.descriptor
+        self.parameter_count = ref.parameter_count
+        self.link()
+        self.inline_cache = inline_cache.InlineCache(
+            frame.method.name, instr.address, self.select)
+
+    def link(self):
+        '''Look up the slot of the method, it's None if the class which the
+        method reference names has no such instance method
+        '''
+        self.slot = run_time_data.method_area[self.ref_class_name]\
+            .link_index().get((self.method_name, self.method_descriptor), None)
+        self.generation = class_unloading.generation
+
+    def table(self, klass):
+        '''The table of klass which the slot is in'''
+        return klass.itables.get(self.ref_class_name, None)
+
+    def select(self, klass):
+        '''Return (class name, method) which is invoked on objects of klass
+        '''
+        if self.generation != class_unloading.generation:
+            self.link()
+        klass.link()
+        entry = None
+        if self.slot is not None:
+            table = self.table(klass)
+            if table is not None and self.slot < len(table):
+                entry = table[self.slot]
+        if entry is None or entry[0] is None:
+            entry = klass.interface_resolution(
+                self.method_name, self.method_descriptor)
+        klass, method = entry
+        self.instr.check_selected(method)
+        return klass.name(), method
+
+    def execute(self, frame):
+        parameters = pop_parameters(frame, self.parameter_count)
+        objectref = frame.operand_stack.pop()
+        class_name, method = self.inline_cache.lookup(objectref.klass)
+        frame.invocation = Invocation(
+            class_name,
+            self.method_name,
+            self.method_descriptor,
+            objectref,
+            parameters,
+            method
         )
-        self.invoke_method = True
-        self.invoke_class_name = klass.name()
+        return NextStep.invoke_method
 
 
 @bytecode(0xb6)
@@ -970,28 +1013,19 @@ class invokevirtual(_instruction):
             operand_bytes[:2], byteorder='big', signed=False)
 
     def execute(self, frame):
-        self.init_invoke_method()
-        method_ref = frame.klass.constant_pool[self.index]
-        assert type(method_ref) is constant_pool.ConstantMethodref
-        class_name = method_ref.get_class(frame.klass.constant_pool)
-        method_name, method_describ = method_ref.get_method(
-            frame.klass.constant_pool)
-        klass = run_time_data.method_area[class_name]
-        method = klass.get_method(method_name, method_describ)
-        if method.isSignaturePolymorphic():
+        assert type(frame.klass.constant_pool[self.index]) is\
+            constant_pool.ConstantMethodref
+        _, method = frame.klass.resolve_method(self.index)
+        if method and method.isSignaturePolymorphic():
             raise NotImplementedError(
                 'Invoke signature polymorphic method is not implemented.')
-        self.invoke_method_name = method_name
-        self.invoke_method_descriptor = method_describ
-        parameters, _ = descriptor.parse_method_descriptor(method_describ)
-        for _ in range(len(parameters)):
-            self.invoke_parameters.append(frame.operand_stack.pop())
-        self.invoke_parameters.reverse()
-        # Pop objectref from operand stack
-        self.invoke_objectref = frame.operand_stack.pop()
-        klass, method = self.invoke_objectref.klass.interface_resolution(
-            method_name, method_describ
-        )
+        quick = invokevirtual_quick(
+            self, frame.klass.constant_pool.method_ref(self.index), frame)
+        quicken(frame, quick)
+        return quick.execute(frame)
+
+    def check_selected(self, method):
+        '''Check the method which is selected by the class of objectref'''
         if not method:
             # Not resoluve method
             assert False, 'Method resolve exception not implemented yet.'
@@ -1003,11 +1037,15 @@ class invokevirtual(_instruction):
             'Not support native method yet.'
         assert not method.access_flags.synchronized(),\
             'Not support synchronized method yet.'
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: {method.name}'
-        )
-        self.invoke_method = True
-        self.invoke_class_name = klass.name()
+
+
+class invokevirtual_quick(invokeinterface_quick):
+    '''The method of the class of objectref, a subclass of the class which
+    the method reference names, is selected at the slot of its vtable.
+    '''
+
+    def table(self, klass):
+        return klass.vtable
 
 
 @bytecode(0xbb)
@@ -1021,16 +1059,33 @@ class new(_instruction):
             operand_bytes, byteorder='big', signed=False)
 
     def execute(self, frame):
-        class_info = frame.klass.constant_pool[self.index]
-        assert type(class_info) is constant_pool.ConstantClass
-        class_name = frame.klass.constant_pool[class_info.name_index]
-        assert type(class_name) is constant_pool.ConstantUtf8
-        klass = run_time_data.method_area[class_name.str_value]
+        assert type(frame.klass.constant_pool[self.index]) is\
+            constant_pool.ConstantClass
+        klass = frame.klass.resolve_class(self.index)
         obj = FRAME.Object(klass)
         class_loader.init_class_object(klass, obj)
         frame.operand_stack.append(obj)
-        logging.debug(
-            f'Instruction {self.class_name_and_address()}: '
-            f'push reference {obj} onto operand stack\n'
-            f'\t{frame.operand_debug_str()}'
-        )
+        quicken(frame, new_quick(self, klass.name(), klass, obj.fields))
+
+
+class new_quick(_quick):
+    '''Holds the class, and the default values of the fields of its objects
+    '''
+
+    def __init__(self, instr, class_name, klass, fields):
+        super().__init__(instr, class_name)
+        self.klass = klass
+        self.fields = dict(fields)
+        # Default values which are mutable, every object has its own
+        self.array_fields = [
+            field_id for field_id, value in fields.items()
+            if type(value) is list]
+
+    def execute(self, frame):
+        if self.stale():
+            return self.instr.execute(frame)
+        obj = FRAME.Object(self.klass)
+        obj.fields = fields = self.fields.copy()
+        for field_id in self.array_fields:
+            fields[field_id] = []
+        frame.operand_stack.append(obj)
@@ -0,0 +1,129 @@
+'''Trace of the instructions the interpreter executes, for debugging a
+program on the VM.
+
+Tracing is off unless enable is called, and then it's out of the dispatch
+path: the threaded engine only wraps the handlers of traced methods, see
+lib/threaded.py, and the classic engine checks a flag it sets per frame.
+It's enabled for a whole run, or for some classes and methods only.
+
+Before an instruction of a traced method executes, an InstructionEvent of
+it is passed to the sink, which is any callable taking the event, such as
+LogSink or JsonLinesSink.
+'''
+import json
+import logging
+from lib import run_time_data
+
+logger = logging.getLogger('jedy.instruction')
+
+sink = None
+# Names of the traced classes, and of the traced methods as "Class.method",
+# every method is traced if both are empty
+classes = frozenset()
+methods = frozenset()
+
+
+class InstructionEvent(object):
+    __slots__ = (
+        'method',
+        'pc',
+        'opcode',
+        'stack',
+        'locals',
+    )
+
+    def __init__(self, method, pc, opcode, stack, local_variables):
+        self.method = method
+        self.pc = pc
+        self.opcode = opcode
+        # Copies of the operand stack and local variables of the frame
+        self.stack = stack
+        self.locals = local_variables
+
+    def __str__(self):
+        return (
+            f'{self.method}@{self.pc} {self.opcode} '
+            f'stack: [{", ".join(str(v) for v in self.stack)}] '
+            f'locals: [{", ".join(str(v) for v in self.locals)}]'
+        )
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class LogSink(object):
+    '''Log each event on the "jedy.instruction" logger, at INFO level'''
+
+    def __call__(self, event):
+        logger.info('%s', event)
+
+
+class JsonLinesSink(object):
+    '''Write each event into a file as a line of JSON, values on the stack
+    and in local variables which are not JSON, such as objects, are written
+    as strings.
+    '''
+
+    def __init__(self, file_name):
+        self.out = open(file_name, 'w')
+
+    def __call__(self, event):
+        self.out.write(json.dumps(event.as_dict(), default=str) + '\n')
+
+    def close(self):
+        self.out.close()
+
+
+def traced(method):
+    '''If the instructions of method are traced'''
+    if sink is None:
+        return False
+    if not classes and not methods:
+        return True
+    return method.class_name in classes or method.name in methods
+
+
+def emit(frame, pc, instr):
+    sink(InstructionEvent(
+        frame.method.name,
+        pc,
+        type(instr).__name__,
+        list(frame.operand_stack),
+        list(frame.local_variables)
+    ))
+
+
+def enable(new_sink=None, names=()):
+    '''Trace the instructions of the named classes and methods, or of every
+    method if no name is given, into new_sink or the log. A name with a dot
+    is a method, such as "Main.main", others are classes.
+    '''
+    global sink, classes, methods
+    if sink is not None:
+        disable()
+    sink = new_sink or LogSink()
+    classes = frozenset(name for name in names if '.' not in name)
+    methods = frozenset(name for name in names if '.' in name)
+    if isinstance(sink, LogSink):
+        logger.setLevel(logging.INFO)
+    _recompile()
+
+
+def disable():
+    global sink, classes, methods
+    if hasattr(sink, 'close'):
+        sink.close()
+    sink = None
+    classes = methods = frozenset()
+    _recompile()
+
+
+def _recompile():
+    '''Drop compiled handlers of the threaded engine, they are compiled
+    again with or without tracing.
+    '''
+    for class_struct in run_time_data.method_area.values():
+        for method in class_struct.methods:
+            code = method.code()
+            if code is not None:
+                code.handlers = None
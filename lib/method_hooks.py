@@ -0,0 +1,25 @@
+'''Hooks on the entry and exit of Java methods, like sys.setprofile is for
+Python functions.
+
+The hook is called as hook(event, frame, arg) by both execution engines:
+
+- "call" when a method is entered, frame is its new frame and arg is None
+- "return" when it returns, frame is its frame, arg is the return value,
+  None if the method is void
+
+JDK methods which are hijacked, see lib/hijack_jre_methods.py, and native
+methods have no frame, and no events. Without a hook the engines only check
+hook once per invocation and return.
+'''
+
+hook = None
+
+
+def set_hook(func):
+    '''Set the hook, or remove it if func is None'''
+    global hook
+    hook = func
+
+
+def get_hook():
+    return hook
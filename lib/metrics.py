@@ -0,0 +1,50 @@
+'''Counters for the internals of the VM, such as how many methods are loaded
+and decoded. Any module can bump a counter, and jedy.py reports all of them
+at exit with --stats.
+
+When timing is on, the class parser also adds the time spent in each parse
+phase to the counter "<phase>_seconds". Phases nest, the time of an inner
+phase is not counted in the outer one.
+'''
+import logging
+import time
+from collections import Counter
+
+counters = Counter()
+timing = False
+_phases = []
+
+
+def enter(phase):
+    '''Start timing phase, call only when timing is on'''
+    now = time.perf_counter()
+    if _phases:
+        outer = _phases[-1]
+        counters[outer[0] + '_seconds'] += now - outer[1]
+    _phases.append([phase, now])
+
+
+def leave():
+    '''Stop timing the current phase, and resume the outer one'''
+    now = time.perf_counter()
+    phase, start = _phases.pop()
+    counters[phase + '_seconds'] += now - start
+    if _phases:
+        _phases[-1][1] = now
+
+
+def abandon_phases():
+    '''Stop timing all phases, after a parse is aborted by an exception'''
+    del _phases[:]
+
+
+def report(out=None):
+    '''Log all the counters sorted by name, or write them into out'''
+    for name in sorted(counters):
+        value = counters[name]
+        line = f'{name}: {value:.6f}' if type(value) is float else\
+            f'{name}: {value}'
+        if out:
+            out.write(line + '\n')
+        else:
+            logging.info(line)
@@ -0,0 +1,181 @@
+'''Parse the classes a program can touch in one batch before it runs, instead
+of finding and parsing each class the first time the interpreter asks for it.
+
+Starting from the main class, the classes named by the constant pool of each
+parsed class (CONSTANT_Class_info entries, which include the classes of all
+field and method references, the super class and the interfaces) are parsed
+level by level. With the "classpath" closure only classes of the user class
+path are followed that way, for a JRE class only its super class and
+interfaces are, since the closure of the JRE itself is thousands of classes.
+
+Parsed classes are staged in class_loader.prefetched, load_class takes them
+from there, and still initializes each class when it's first used.
+
+BackgroundPrefetcher instead parses speculatively while the program runs:
+whenever a class is loaded, the classes it refers to are parsed in a pool of
+threads, and load_class waits for the parse of a class it needs.
+'''
+import itertools
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from lib import class_cache
+from lib import class_loader
+from lib import classpath as class_path
+from lib import metrics
+from lib import preparse
+from lib import run_time_data
+
+CLOSURES = ('classpath', 'all')
+
+
+def referenced_classes(class_struct):
+    '''Yield the names of the classes class_struct refers to, the element
+    class of an array class included.
+    '''
+    for name in class_struct.constant_pool.class_names():
+        if name.startswith('['):
+            name = name.lstrip('[')
+            if not name.startswith('L'):
+                # Array of a primitive type
+                continue
+            name = name[1:-1]
+        yield name
+
+
+def super_classes(class_struct):
+    '''Yield the names of the super class and interfaces of class_struct'''
+    pool = class_struct.constant_pool
+    if class_struct.super_class:
+        yield pool.get_constant_class_name(class_struct.super_class)
+    for interface in class_struct.interfaces:
+        yield pool.get_constant_class_name(interface)
+
+
+def _find(classname, user_class_path):
+    '''Return (source, if it's on the user class path)'''
+    source = user_class_path.find(classname)
+    if source:
+        return source, True
+    return class_loader.find_class(classname), False
+
+
+def prefetch(classname, closure='classpath', workers=None):
+    '''Parse classname and the classes reachable from it into
+    class_loader.prefetched, in a process pool if workers is more than one.
+    Return the number of classes parsed.
+    '''
+    start = time.perf_counter()
+    user_class_path = class_path.ClassPath(
+        class_path.split(class_loader.classpath))
+    executor = None
+    if workers and workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=preparse._init_worker,
+            initargs=(
+                class_cache.enabled,
+                class_cache.cache_dir,
+                class_loader.class_parser
+            )
+        )
+    seen = {classname}
+    pending = [classname]
+    count = 0
+    try:
+        while pending:
+            batch = []
+            for name in pending:
+                if name in run_time_data.method_area or\
+                        name in class_loader.prefetched:
+                    continue
+                source, on_class_path = _find(name, user_class_path)
+                if source:
+                    batch.append((name, source, on_class_path))
+            sources = [source for _, source, _ in batch]
+            if executor:
+                class_structs = executor.map(
+                    class_loader.parse_source, sources, chunksize=16)
+            else:
+                class_structs = map(class_loader.parse_source, sources)
+            pending = []
+            for (name, _, on_class_path), class_struct in zip(
+                batch, class_structs
+            ):
+                class_loader.prefetched[name] = class_struct
+                count += 1
+                if closure == 'all' or on_class_path:
+                    references = referenced_classes(class_struct)
+                else:
+                    references = super_classes(class_struct)
+                for reference in references:
+                    if reference not in seen:
+                        seen.add(reference)
+                        pending.append(reference)
+    finally:
+        if executor:
+            executor.shutdown()
+    metrics.counters['prefetch.parsed'] += count
+    metrics.counters['prefetch.seconds'] += time.perf_counter() - start
+    logging.debug(f'Prefetched {count} classes reachable from {classname}')
+    return count
+
+
+def _parse_class(classname):
+    source = class_loader.find_class(classname)
+    if not source:
+        return None
+    return class_loader.parse_source(source)
+
+
+class BackgroundPrefetcher(object):
+    '''Set as class_loader.prefetcher, it is told about every loaded class by
+    schedule, and asked by take for a class which is about to be loaded.
+    Only parsing happens in the pool, classes are still put into the method
+    area and initialized by load_class on the requesting thread.
+    '''
+
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='prefetch')
+        self.futures = {}
+
+    def schedule(self, class_struct):
+        '''Start parsing the classes class_struct refers to, the super class
+        and interfaces first, since they are needed right away.
+        '''
+        for name in itertools.chain(
+            super_classes(class_struct), referenced_classes(class_struct)
+        ):
+            if name in self.futures or\
+                    name in run_time_data.method_area or\
+                    name in class_loader.prefetched:
+                continue
+            self.futures[name] = self.executor.submit(_parse_class, name)
+            metrics.counters['prefetch.scheduled'] += 1
+
+    def take(self, classname):
+        '''Return the parsed class, waiting for its parse if it's not done
+        yet. Return None if it's not scheduled or the parse failed, then the
+        class is loaded the usual way.
+        '''
+        future = self.futures.pop(classname, None)
+        if future is None:
+            return None
+        if not future.done():
+            metrics.counters['prefetch.waited'] += 1
+        try:
+            class_struct = future.result()
+        except Exception as e:
+            logging.debug(f'Background parse of {classname} failed: {e}')
+            return None
+        if class_struct:
+            metrics.counters['prefetch.used'] += 1
+        return class_struct
+
+    def close(self):
+        '''Cancel the parses which are not started, and wait for the rest'''
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        metrics.counters['prefetch.unused'] += sum(
+            1 for future in self.futures.values() if not future.cancelled())
+        self.futures = {}
@@ -0,0 +1,91 @@
+'''Parse every class under a classpath root in a process pool, to fill the
+on-disk class cache ahead of time and to stress test the class parser.
+'''
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from lib import class_cache
+from lib import class_loader
+
+
+def find_class_files(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith('.class'):
+                yield os.path.join(dirpath, filename)
+
+
+def _init_worker(cache_enabled, cache_dir, class_parser):
+    # Module globals are not inherited by spawned worker processes
+    class_cache.enabled = cache_enabled
+    class_cache.cache_dir = cache_dir
+    class_loader.class_parser = class_parser
+    # Failures are collected into the report, don't flood the output
+    logging.disable(logging.WARNING)
+
+
+def _preparse_one(file_name):
+    '''Return (file_name, parse seconds, error message or None)'''
+    start = time.perf_counter()
+    try:
+        class_struct = class_loader.parse(file_name)
+        elapsed = time.perf_counter() - start
+        if class_cache.enabled:
+            key = os.path.realpath(file_name)
+            class_cache.store(key, class_cache.file_stamp(key), class_struct)
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        return file_name, elapsed, f'{type(e).__name__}: {e}'
+    return file_name, elapsed, None
+
+
+def preparse(root, workers=None):
+    '''Parse all class files under root, and return the report as a dict'''
+    start = time.perf_counter()
+    file_names = sorted(find_class_files(root))
+    classes = []
+    failures = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            class_cache.enabled,
+            class_cache.cache_dir,
+            class_loader.class_parser
+        )
+    ) as executor:
+        for file_name, elapsed, error in executor.map(
+            _preparse_one, file_names, chunksize=64
+        ):
+            classes.append({'file': file_name, 'parse_seconds': elapsed})
+            if error:
+                failures.append({'file': file_name, 'error': error})
+    return {
+        'root': root,
+        'classes': len(file_names),
+        'failures': len(failures),
+        'parse_seconds': sum(c['parse_seconds'] for c in classes),
+        'wall_seconds': time.perf_counter() - start,
+        'cached': class_cache.enabled,
+        'failed': failures,
+        'per_class': classes,
+    }
+
+
+def write_report(report, out_file):
+    with open(out_file, 'w') as out:
+        json.dump(report, out, indent=2)
+
+
+def summary(report):
+    lines = [
+        f'Pre-parsed {report["classes"]} classes under {report["root"]} in '
+        f'{report["wall_seconds"]:.2f}s, '
+        f'{report["parse_seconds"]:.2f}s of parse time, '
+        f'{report["failures"]} failures'
+    ]
+    for failure in report['failed']:
+        lines.append(f'FAIL {failure["file"]}: {failure["error"]}')
+    return '\n'.join(lines)
@@ -0,0 +1,94 @@
+'''Profiler of Java methods, on the method hooks of lib/method_hooks.py.
+
+It counts the calls of each method and its inclusive and exclusive time, in
+the format of the stats of the pstats module, keyed by
+(source of the class, 0, "Class.method(descriptor)"). So a profile is
+sorted and reported by pstats.Stats(profiler), and saved by dump_stats into
+a file which pstats and its viewers load like a cProfile one.
+'''
+import marshal
+import pstats
+import sys
+import time
+from lib import method_hooks
+
+
+def function_key(frame):
+    method = frame.method
+    source = frame.klass.source
+    return (
+        str(source) if source else method.class_name,
+        0,
+        f'{method.name}{method.descriptor}'
+    )
+
+
+class Profiler(object):
+    def __init__(self, timer=time.perf_counter):
+        self.timer = timer
+        self.stats = {}
+        # Key: [primitive calls, calls, exclusive time, inclusive time,
+        # {caller key: [primitive calls, calls, exclusive, inclusive]}]
+        self._functions = {}
+        # Running methods: [key, start time, inclusive time of callees]
+        self._stack = []
+        # Key: number of running activations, for recursive calls
+        self._active = {}
+
+    def enable(self):
+        method_hooks.set_hook(self.hook)
+
+    def disable(self):
+        method_hooks.set_hook(None)
+
+    def hook(self, event, frame, arg):
+        now = self.timer()
+        if event == 'call':
+            key = function_key(frame)
+            self._stack.append([key, now, 0.0])
+            self._active[key] = self._active.get(key, 0) + 1
+        elif event == 'return' and self._stack:
+            key, start, callees = self._stack.pop()
+            inclusive = now - start
+            exclusive = inclusive - callees
+            self._active[key] -= 1
+            # Inclusive time of a recursive call is in the outermost one
+            primitive = self._active[key] == 0
+            function = self._functions.get(key, None)
+            if function is None:
+                function = self._functions[key] = [0, 0, 0.0, 0.0, {}]
+            records = [function]
+            if self._stack:
+                caller = self._stack[-1]
+                caller[2] += inclusive
+                records.append(
+                    function[4].setdefault(caller[0], [0, 0, 0.0, 0.0]))
+            for record in records:
+                record[1] += 1
+                record[2] += exclusive
+                if primitive:
+                    record[0] += 1
+                    record[3] += inclusive
+
+    def create_stats(self):
+        '''Fill in stats, as pstats.Stats does when it's given a profiler'''
+        self.stats = {
+            key: (
+                function[0],
+                function[1],
+                function[2],
+                function[3],
+                {caller: tuple(record)
+                 for caller, record in function[4].items()}
+            )
+            for key, function in self._functions.items()
+        }
+
+    def dump_stats(self, file_name):
+        self.create_stats()
+        with open(file_name, 'wb') as stats_file:
+            marshal.dump(self.stats, stats_file)
+
+    def print_stats(self, out=None, sort='cumulative', top=30):
+        pstats.Stats(self, stream=out or sys.stderr).sort_stats(
+            sort).print_stats(top)
@@ -13,12 +13,52 @@ read_u8_int = functools.partial(_read_ux_int, x=8)
 
 
 def read_u4_float(fd):
-    return struct.unpack('>f', fd.read(4))
+    return struct.unpack('>f', fd.read(4))[0]
 
 
 def read_u8_float(fd):
-    return struct.unpack('>f', fd.read(8))
+    return struct.unpack('>d', fd.read(8))[0]
 
 
 def read_string(fd, length):
-    return fd.read(length).decode()
+    return decode_modified_utf8(fd.read(length))
+
+
+def decode_modified_utf8(raw):
+    '''Decode the "modified UTF-8" used by CONSTANT_Utf8_info, in spec 4.4.7.
+    It differs from standard UTF-8 in the encoding of the null character
+    and of supplementary characters (as surrogate pairs), so fall back to
+    a slower path only when the standard decoder rejects the bytes.
+    '''
+    try:
+        return str(raw, 'utf-8')
+    except UnicodeDecodeError:
+        pass
+    text = bytes(raw).replace(b'\xc0\x80', b'\x00').decode(
+        'utf-8', 'surrogatepass')
+    return text.encode('utf-16-be', 'surrogatepass').decode(
+        'utf-16-be', 'surrogatepass')
+
+
+'''Precompiled readers for the offset based parser, which decode big-endian
+fields straight out of a bytes-like buffer (bytes, memoryview or mmap)
+without any intermediate read calls or copies.
+'''
+U1 = struct.Struct('>B')
+U2 = struct.Struct('>H')
+U4 = struct.Struct('>I')
+U8 = struct.Struct('>Q')
+F4 = struct.Struct('>f')
+F8 = struct.Struct('>d')
+U2_U2 = struct.Struct('>HH')
+U2_U4 = struct.Struct('>HI')
+U1_U2 = struct.Struct('>BH')
+U2_U2_U4 = struct.Struct('>HHI')
+U2_U2_U2 = struct.Struct('>HHH')
+U2_U2_U2_U2 = struct.Struct('>HHHH')
+U4_U2_U2 = struct.Struct('>IHH')
+
+
+def unpack_u2_array(buf, offset, count):
+    '''Return a tuple of count u2 values starting at offset'''
+    return struct.unpack_from(f'>{count}H', buf, offset)
@@ -1,5 +1,6 @@
 from collections import defaultdict
 from lib import class_loader
+from lib import class_unloading
 
 
 '''Defind all run-time data for JVM
@@ -17,11 +18,19 @@ class MethodAreaDict(dict):
         if klass_name not in self:
             class_struct = class_loader.load_class(klass_name)
             assert class_struct, f'Load class {klass_name} fail.'
+        elif klass_name in class_unloading.lru:
+            class_unloading.lru.move_to_end(klass_name)
         return super().__getitem__(klass_name)
 
 
 method_area = MethodAreaDict()
 
+# Static field values of each class, keyed by member ID of the field, see
+# lib/symbol_table.py
 class_static_fields = defaultdict(dict)
 
 thread_pool = []
+
+# Threads which are running, class initialization runs in a thread of its
+# own inside the thread which triggers it, the last one is the current one
+running_threads = []
@@ -0,0 +1,41 @@
+'''Base of the class metadata records, such as ClassStruct, Method and the
+constants, which store their items in __slots__ instead of a __dict__ per
+object. A VM holds thousands of them after loading the JDK.
+'''
+
+_slot_descriptors = {}
+
+
+def slot_descriptors(cls):
+    '''Return (name, descriptor) of all slots of cls and its bases'''
+    descriptors = _slot_descriptors.get(cls, None)
+    if descriptors is None:
+        descriptors = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            for name in slots:
+                descriptors.append((name, klass.__dict__[name]))
+        _slot_descriptors[cls] = descriptors
+    return descriptors
+
+
+class Slotted(object):
+    '''Pickled as a dict of the slots which are set. Slots are read by their
+    descriptors, so an unset slot never reaches __getattr__ of a subclass.
+    '''
+    __slots__ = ()
+
+    def __getstate__(self):
+        state = {}
+        for name, descriptor in slot_descriptors(type(self)):
+            try:
+                state[name] = descriptor.__get__(self, type(self))
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
@@ -0,0 +1,42 @@
+'''VM wide symbol table.
+
+Every CONSTANT_Utf8_info string, such as class, method and field names and
+descriptors, is interned here when the constant is parsed, so equal names
+across all constant pools share one string object. Lookups keyed by those
+strings then hit the identity fast path of string comparison.
+
+Class members (fields) are also given a compact int ID, used as the key of
+object fields and class static fields instead of a string built on every
+access. IDs are only valid in the current process, never persist them.
+'''
+from lib import metrics
+
+_strings = {}
+_member_ids = {}
+_members = []
+
+
+def intern(value):
+    '''Return the canonical string equal to value'''
+    symbol = _strings.get(value, None)
+    if symbol is None:
+        # setdefault is atomic, classes can be parsed in other threads
+        symbol = _strings.setdefault(value, value)
+        metrics.counters['symbols.strings'] += 1
+    return symbol
+
+
+def member_id(class_name, name, descriptor):
+    '''Return the ID of the member name:descriptor of class class_name'''
+    key = (class_name, name, descriptor)
+    member = _member_ids.get(key, None)
+    if member is None:
+        member = _member_ids[key] = len(_members)
+        _members.append(key)
+        metrics.counters['symbols.members'] += 1
+    return member
+
+
+def member(member_id):
+    '''Return (class_name, name, descriptor) of a member ID'''
+    return _members[member_id]
@@ -1,11 +1,21 @@
 import logging
 from collections import deque
+from lib import class_unloading
 from lib import run_time_data
-from lib.frame import Frame
+from lib import frame as FRAME
 from lib import instruction
+from lib import instruction_trace
+from lib import method_hooks
+from lib import threaded
 from lib import descriptor
 from lib.hijack_jre_methods import get_jdk_method
 
+ENGINES = ('classic', 'threaded')
+# The classic engine executes instruction objects, the threaded engine runs
+# compiled handlers, see lib/threaded.py. Both pass the instructions of
+# traced methods to the sink of lib/instruction_trace.py
+engine = 'classic'
+
 
 class Thread(object):
     def __init__(self, class_name, method_name, method_descriptor, argv):
@@ -23,14 +33,21 @@ class Thread(object):
                 f'Could not find or load main class {self.class_name}')
             return
         logging.debug('Now we are at the entrance of thread function.')
-        frame, code = self.method_entrance(
-            self.class_name,
-            self.method_name,
-            self.method_descriptor,
-            None,
-            ['']  # Ignore the parameters for main function for now.
-        )
-        self.run_thread_method(frame, code)
+        run_time_data.running_threads.append(self)
+        try:
+            frame, code = self.method_entrance(
+                self.class_name,
+                self.method_name,
+                self.method_descriptor,
+                None,
+                ['']  # Ignore the parameters for main function for now.
+            )
+            if engine == 'threaded':
+                threaded.run(self, frame)
+            else:
+                self.run_thread_method(frame, code)
+        finally:
+            run_time_data.running_threads.pop()
         logging.debug('Method {name} exit'.format(name=self.method_name))
         logging.debug('Thread exit')
 
@@ -40,17 +57,18 @@ class Thread(object):
         method_name,
         method_description,
         objectref,
-        params
+        params,
+        method=None
     ):
-        print(f' ----- Executing {class_name} - {method_name} - {method_description}')
         klass = run_time_data.method_area[class_name]
-        method = klass.get_method(method_name, method_description)
+        if method is None:
+            method = klass.get_method(method_name, method_description)
         if not method:
             logging.error(
                 f'Could not find method {method_name} in class {class_name}')
             return
         param_types, _ = descriptor.parse_method_descriptor(method_description)
-        frame = Frame(
+        frame = FRAME.Frame(
             klass,
             method,
             objectref,
@@ -60,61 +78,72 @@ class Thread(object):
         code = method.code()
         if not code:
             raise RuntimeError('Could not find code in method')
-        logging.debug(f'Enter method {class_name}.{method_name}')
+        logging.debug('Enter method %s.%s', class_name, method_name)
+        if method_hooks.hook is not None:
+            method_hooks.hook('call', frame, None)
         return frame, code
 
     def run_thread_method(self, frame, code):
         self.stack.append(frame)
+        instructions = code.instructions
+        traced = instruction_trace.traced(frame.method)
         i = 0
         while i < code.code_length:
             self.pc_register = i
-            instr = code.instructions[i]
-            ins_str = 'unrecognized instruction 0x{:02X}'.format(code.code[i])
-            if instr is not None:
-                # instr is None means we not recognize this instruction yet
-                ins_str = instr.class_name_and_address()
-            logging.debug(
-                f'Executing {frame.method.name}: '
-                f'instruction: {ins_str}')
-            instr.execute(frame)
-            next_step = instr.next_step()
-            if next_step == instruction.NextStep.invoke_method:
+            instr = instructions[i]
+            if traced:
+                instruction_trace.emit(frame, i, instr)
+            next_step = instr.execute(frame)
+            if next_step is None or\
+                    next_step == instruction.NextStep.next_instruction:
+                i = i + 1 + instr.len_of_operand()
+            elif next_step == instruction.NextStep.invoke_method:
                 # store the next
                 frame.next_ops_address = i + 1 + instr.len_of_operand()
+                invocation = frame.invocation
+                frame.invocation = None
                 hijacked_method = get_jdk_method(
-                    instr.invoke_class_name,
-                    instr.invoke_method_name,
-                    instr.invoke_method_descriptor
+                    invocation.class_name,
+                    invocation.method_name,
+                    invocation.method_descriptor
                 )
                 if hijacked_method:
                     hijacked_method(self.stack)
+                    i = frame.next_ops_address
                 else:
-                    frame, code = self.method_entrance(
-                        instr.invoke_class_name,
-                        instr.invoke_method_name,
-                        instr.invoke_method_descriptor,
-                        instr.invoke_objectref,
-                        instr.invoke_parameters
-                    )
+                    frame, code = self.method_entrance(*invocation)
                     logging.debug(
-                        f'Invoke method {instr.invoke_class_name}.'
-                        f'{instr.invoke_method_name} '
-                        f'{instr.invoke_method_descriptor}, '
-                        f'new frame local_variables: {frame.local_variables}'
+                        'Invoke method %s.%s %s, new frame local_variables: '
+                        '%s',
+                        invocation.class_name,
+                        invocation.method_name,
+                        invocation.method_descriptor,
+                        frame.local_variables
                     )
                     self.stack.append(frame)
+                    instructions = code.instructions
+                    traced = instruction_trace.traced(frame.method)
                     i = 0
+                    if class_unloading.pending:
+                        class_unloading.safepoint()
             elif next_step == instruction.NextStep.jump_to:
-                i = instr.jump_to_address
-            elif next_step == instruction.NextStep.method_return:
+                i = frame.next_ops_address
+            else:
+                if method_hooks.hook is not None:
+                    return_value = None
+                    if next_step == instruction.NextStep.method_return_value:
+                        return_value = frame.operand_stack[-1]
+                    method_hooks.hook('return', frame, return_value)
                 if len(self.stack) == 1:
                     break  # First frame is for main function, not return value
-                self.stack.pop()
+                callee = self.stack.pop()
                 frame = self.stack[-1]
                 code = frame.code
+                instructions = code.instructions
+                traced = instruction_trace.traced(frame.method)
                 i = frame.next_ops_address
-                if instr.return_value is not None:
-                    frame.operand_stack.append(instr.return_value)
-            else:
-                i = i + 1 + instr.len_of_operand()
+                if next_step == instruction.NextStep.method_return_value:
+                    frame.operand_stack.append(callee.operand_stack.pop())
+                if class_unloading.pending:
+                    class_unloading.safepoint()
         self.stack.pop()
@@ -0,0 +1,480 @@
+'''Closure-threaded execution engine, run by a thread when thread.engine is
+"threaded".
+
+The code of a method is compiled on its first run into handlers, a list
+indexed by pc like code.instructions. A handler is a closure with the
+operands of its instruction already bound, which executes the instruction
+on a frame and returns the pc of the next instruction, so dispatching an
+instruction is a list index and a call. An invocation or a return leaves
+the dispatch loop, the handler returns INVOKE, RETURN or RETURN_VALUE for
+it, then the loop switches frames like Thread.run_thread_method does.
+
+Instructions which have no specialized handler here are executed by their
+instruction object, see _adapter. An instruction which quickens, see
+quicken in lib/instruction.py, is executed by its object until then, and
+the handler is replaced by the handler of the quick variant, see
+_replacing. The handlers of a method which is traced,
+see lib/instruction_trace.py, are compiled wrapped by a handler which emits
+the trace event, the handlers of other methods are not.
+'''
+import operator
+from lib import class_unloading
+from lib import frame as FRAME
+from lib import instruction
+from lib import instruction_trace
+from lib import method_hooks
+from lib.hijack_jre_methods import get_jdk_method
+
+# Returned by a handler instead of a pc. For INVOKE the handler sets
+# frame.invocation, an instruction.Invocation, and frame.next_ops_address,
+# for RETURN_VALUE the value is on top of the operand stack.
+INVOKE = -1
+RETURN = -2
+RETURN_VALUE = -3
+
+_compilers = {}
+
+
+def compiles(*instruction_names):
+    '''Register a compiler of the instructions of the named classes, and of
+    their subclasses. They are named since lib/instruction.py is not loaded
+    yet when this module is.
+    '''
+    def compiles_decorator(compiler):
+        for name in instruction_names:
+            _compilers[name] = compiler
+        return compiler
+    return compiles_decorator
+
+
+def handlers_of(frame):
+    '''Return the handlers of the code of frame, compile them on first use'''
+    code = frame.code
+    if code.handlers is None:
+        code.handlers = compile_code(
+            code, frame.klass, instruction_trace.traced(frame.method))
+    return code.handlers
+
+
+def compile_code(code, klass, traced=False):
+    handlers = [None] * code.code_length
+    for pc, instr in enumerate(code.instructions):
+        if instr is not None:
+            handler = compile_instruction(
+                instr, pc + 1 + instr.len_of_operand(), klass)
+            if traced:
+                handler = _traced(handler, pc, instr)
+            handlers[pc] = handler
+    # Decoding stops at the first instruction which is not supported
+    pc = 0
+    while pc < code.code_length and handlers[pc] is not None:
+        pc += 1 + code.instructions[pc].len_of_operand()
+    if pc < code.code_length:
+        handlers[pc] = _unsupported(code.code[pc], pc)
+    return handlers
+
+
+def compile_instruction(instr, next_pc, klass):
+    for instruction_type in type(instr).__mro__:
+        compiler = _compilers.get(instruction_type.__name__, None)
+        if compiler:
+            return compiler(instr, next_pc, klass)
+    return _adapter(instr, next_pc)
+
+
+def _traced(handler, pc, instr):
+    emit = instruction_trace.emit
+
+    def traced_handler(frame):
+        emit(frame, pc, instr)
+        return handler(frame)
+    return traced_handler
+
+
+def _unsupported(opcode, pc):
+    def handler(frame):
+        raise NotImplementedError(
+            f'Instruction 0x{opcode:02X} at {pc} of {frame.method.name} '
+            'is not supported')
+    return handler
+
+
+def _adapter(instr, next_pc):
+    '''Execute an instruction object, and translate its next step'''
+    NextStep = instruction.NextStep
+
+    def handler(frame):
+        next_step = instr.execute(frame)
+        if next_step is None or next_step is NextStep.next_instruction:
+            return next_pc
+        if next_step is NextStep.jump_to:
+            return frame.next_ops_address
+        if next_step is NextStep.invoke_method:
+            frame.next_ops_address = next_pc
+            return INVOKE
+        if next_step is NextStep.method_return_value:
+            return RETURN_VALUE
+        return RETURN
+    return handler
+
+
+@compiles('aconst_null')
+def _aconst_null(instr, next_pc, klass):
+    def handler(frame):
+        frame.operand_stack.append(None)
+        return next_pc
+    return handler
+
+
+@compiles('iconst_i')
+def _iconst(instr, next_pc, klass):
+    i = instr.i
+
+    def handler(frame):
+        frame.operand_stack.append(i)
+        return next_pc
+    return handler
+
+
+@compiles('iload_n', 'aload_n')
+def _load(instr, next_pc, klass):
+    n = instr.n
+
+    def handler(frame):
+        frame.operand_stack.append(frame.local_variables[n])
+        return next_pc
+    return handler
+
+
+@compiles('istore_n', 'astore_n')
+def _store(instr, next_pc, klass):
+    n = instr.n
+
+    def handler(frame):
+        frame.local_variables[n] = frame.operand_stack.pop()
+        return next_pc
+    return handler
+
+
+@compiles('pop')
+def _pop(instr, next_pc, klass):
+    def handler(frame):
+        frame.operand_stack.pop()
+        return next_pc
+    return handler
+
+
+@compiles('dup')
+def _dup(instr, next_pc, klass):
+    def handler(frame):
+        frame.operand_stack.append(frame.operand_stack[-1])
+        return next_pc
+    return handler
+
+
+def _binary(function):
+    def compiler(instr, next_pc, klass):
+        def handler(frame):
+            stack = frame.operand_stack
+            value2 = stack.pop()
+            stack.append(function(stack.pop(), value2))
+            return next_pc
+        return handler
+    return compiler
+
+
+compiles('iadd')(_binary(operator.add))
+compiles('isub')(_binary(operator.sub))
+compiles('imul')(_binary(operator.mul))
+compiles('irem')(_binary(operator.mod))
+
+
+@compiles('idiv')
+def _idiv(instr, next_pc, klass):
+    def handler(frame):
+        stack = frame.operand_stack
+        value2 = stack.pop()
+        if value2 == 0:
+            raise NotImplementedError(
+                'Exception have not implemented. '
+                'Should through ArithmeticException'
+            )
+        stack.append(stack.pop() // value2)
+        return next_pc
+    return handler
+
+
+@compiles('iinc')
+def _iinc(instr, next_pc, klass):
+    index, const = instr.index, instr.const
+
+    def handler(frame):
+        local_variables = frame.local_variables
+        local_variables[index] = local_variables[index] + const
+        return next_pc
+    return handler
+
+
+_comparisons = {
+    'if_icmpeq': operator.eq,
+    'if_icmpne': operator.ne,
+    'if_icmplt': operator.lt,
+    'if_icmpge': operator.ge,
+    'if_icmpgt': operator.gt,
+    'if_icmple': operator.le,
+}
+
+
+@compiles(*_comparisons)
+def _if_icmp(instr, next_pc, klass):
+    compare = _comparisons[type(instr).__name__]
+    target = instr.address + instr.offset
+
+    def handler(frame):
+        stack = frame.operand_stack
+        value2 = stack.pop()
+        if compare(stack.pop(), value2):
+            return target
+        return next_pc
+    return handler
+
+
+@compiles('goto')
+def _goto(instr, next_pc, klass):
+    target = instr.address + instr.offset
+
+    def handler(frame):
+        return target
+    return handler
+
+
+@compiles('ireturn', 'areturn')
+def _return_value(instr, next_pc, klass):
+    def handler(frame):
+        return RETURN_VALUE
+    return handler
+
+
+@compiles('instruction_return')
+def _return(instr, next_pc, klass):
+    def handler(frame):
+        return RETURN
+    return handler
+
+
+@compiles(
+    'ldc',
+    'getstatic',
+    'putstatic',
+    'new',
+    'invokespecial',
+    'invokestatic',
+    'invokeinterface',
+    'invokevirtual',
+    '_quick'
+)
+def _replacing(instr, next_pc, klass):
+    '''Execute instr, and when it's replaced in the code, by its quick
+    variant or, if it's a stale quick variant, by a new one, replace the
+    handler too.
+    '''
+    execute = _adapter(instr, next_pc)
+    pc = instr.address
+
+    def handler(frame):
+        next_pc_or_step = execute(frame)
+        code = frame.code
+        replacement = code.instructions[pc]
+        if replacement is not instr and code.handlers is not None:
+            replacement_handler = compile_instruction(
+                replacement, next_pc, klass)
+            if instruction_trace.traced(frame.method):
+                replacement_handler = _traced(
+                    replacement_handler, pc, replacement)
+            code.handlers[pc] = replacement_handler
+        return next_pc_or_step
+    return handler
+
+
+@compiles('ldc_quick')
+def _ldc_quick(instr, next_pc, klass):
+    value = instr.value
+
+    def handler(frame):
+        frame.operand_stack.append(value)
+        return next_pc
+    return handler
+
+
+def _stale_check(instr):
+    '''Return a function which checks if quick instruction instr is stale,
+    see _quick.stale in lib/instruction.py
+    '''
+    generation = instr.generation
+    lru_class_name = instr.lru_class_name
+    if lru_class_name is None:
+        return lambda: class_unloading.generation != generation
+    return instr.stale
+
+
+@compiles('getstatic_quick')
+def _getstatic_quick(instr, next_pc, klass):
+    fields, field_id = instr.fields, instr.field_id
+    stale = _stale_check(instr)
+    resolve = _replacing(instr, next_pc, klass)
+
+    def handler(frame):
+        if stale():
+            return resolve(frame)
+        frame.operand_stack.append(fields[field_id])
+        return next_pc
+    return handler
+
+
+@compiles('putstatic_quick')
+def _putstatic_quick(instr, next_pc, klass):
+    fields, field_id = instr.fields, instr.field_id
+    stale = _stale_check(instr)
+    resolve = _replacing(instr, next_pc, klass)
+
+    def handler(frame):
+        if stale():
+            return resolve(frame)
+        fields[field_id] = frame.operand_stack.pop()
+        return next_pc
+    return handler
+
+
+@compiles('new_quick')
+def _new_quick(instr, next_pc, klass):
+    new_class, fields = instr.klass, instr.fields
+    array_fields = instr.array_fields
+    stale = _stale_check(instr)
+    resolve = _replacing(instr, next_pc, klass)
+
+    def handler(frame):
+        if stale():
+            return resolve(frame)
+        obj = FRAME.Object(new_class)
+        obj.fields = object_fields = fields.copy()
+        for field_id in array_fields:
+            object_fields[field_id] = []
+        frame.operand_stack.append(obj)
+        return next_pc
+    return handler
+
+
+@compiles('invokeinterface_quick')
+def _invoke_quick(instr, next_pc, klass):
+    '''invokeinterface_quick and invokevirtual_quick, which select the
+    method by their inline cache
+    '''
+    lookup = instr.inline_cache.lookup
+    method_name = instr.method_name
+    method_descriptor = instr.method_descriptor
+    parameter_count = instr.parameter_count
+    Invocation = instruction.Invocation
+
+    def handler(frame):
+        stack = frame.operand_stack
+        parameters = [stack.pop() for _ in range(parameter_count)]
+        parameters.reverse()
+        objectref = stack.pop()
+        class_name, method = lookup(objectref.klass)
+        frame.invocation = Invocation(
+            class_name,
+            method_name,
+            method_descriptor,
+            objectref,
+            parameters,
+            method
+        )
+        frame.next_ops_address = next_pc
+        return INVOKE
+    return handler
+
+
+@compiles('getfield')
+def _getfield(instr, next_pc, klass):
+    field_id = klass.constant_pool.field_ref(instr.index).field_id
+    return _getfield_handler(field_id, next_pc)
+
+
+@compiles('getfield_quick')
+def _getfield_quick(instr, next_pc, klass):
+    return _getfield_handler(instr.field_id, next_pc)
+
+
+def _getfield_handler(field_id, next_pc):
+    def handler(frame):
+        stack = frame.operand_stack
+        stack.append(stack.pop().fields[field_id])
+        return next_pc
+    return handler
+
+
+@compiles('putfield')
+def _putfield(instr, next_pc, klass):
+    field_id = klass.constant_pool.field_ref(instr.index).field_id
+    return _putfield_handler(field_id, next_pc)
+
+
+@compiles('putfield_quick')
+def _putfield_quick(instr, next_pc, klass):
+    return _putfield_handler(instr.field_id, next_pc)
+
+
+def _putfield_handler(field_id, next_pc):
+    def handler(frame):
+        stack = frame.operand_stack
+        value = stack.pop()
+        stack.pop().fields[field_id] = value
+        return next_pc
+    return handler
+
+
+def run(thread, frame):
+    '''Run the method of frame on thread, until it returns'''
+    stack = thread.stack
+    stack.append(frame)
+    handlers = handlers_of(frame)
+    pc = 0
+    while True:
+        pc = handlers[pc](frame)
+        if pc >= 0:
+            continue
+        if pc == INVOKE:
+            thread.pc_register = frame.next_ops_address
+            invocation = frame.invocation
+            frame.invocation = None
+            hijacked_method = get_jdk_method(
+                invocation.class_name,
+                invocation.method_name,
+                invocation.method_descriptor
+            )
+            if hijacked_method:
+                hijacked_method(stack)
+                pc = frame.next_ops_address
+                continue
+            frame, _ = thread.method_entrance(*invocation)
+            stack.append(frame)
+            handlers = handlers_of(frame)
+            pc = 0
+        else:
+            if method_hooks.hook is not None:
+                return_value = None
+                if pc == RETURN_VALUE:
+                    return_value = frame.operand_stack[-1]
+                method_hooks.hook('return', frame, return_value)
+            if len(stack) == 1:
+                # First frame is for main function, not return value
+                break
+            callee = stack.pop()
+            frame = stack[-1]
+            if pc == RETURN_VALUE:
+                frame.operand_stack.append(callee.operand_stack.pop())
+            handlers = handlers_of(frame)
+            pc = frame.next_ops_address
+        if class_unloading.pending:
+            class_unloading.safepoint()
+    stack.pop()
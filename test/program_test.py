@@ -0,0 +1,51 @@
+import os
+from unittest import TestCase
+from lib import class_loader
+from lib import class_unloading
+from lib import run_time_data
+from lib import thread
+
+TEST_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class ProgramTestCase(TestCase):
+    '''Base of the tests which load the classes of a program, the directory
+    program of the test directory is the class path. The classes of the
+    program are unloaded before and after each test, programs have classes
+    of the same names, and a test of a class which is already loaded would
+    depend on the tests which ran before it.
+    '''
+    program = None
+
+    def setUp(self):
+        self.saved_paths = (class_loader.classpath, class_loader.jrelibpath)
+        if self.program:
+            class_loader.classpath = os.path.join(TEST_DIR, self.program)
+        class_loader.jrelibpath = os.path.join(
+            TEST_DIR, '..', 'openjdk_jre', 'lib')
+        self.unload_program()
+
+    def tearDown(self):
+        self.unload_program()
+        thread.engine = 'classic'
+        class_loader.classpath, class_loader.jrelibpath = self.saved_paths
+
+    def unload_program(self):
+        '''Unload the classes which are not of the bootstrap class path'''
+        for name in list(run_time_data.method_area):
+            if not class_unloading.is_bootstrap(name):
+                class_unloading.unload(name)
+
+    def engines(self):
+        '''Set each engine of thread.ENGINES in turn, the program is
+        unloaded before each of them
+        '''
+        for engine in thread.ENGINES:
+            thread.engine = engine
+            self.unload_program()
+            yield engine
+
+    def run_main(self, class_name='Main'):
+        run_time_data.method_area[class_name]
+        thread.Thread(
+            class_name, 'main', '([Ljava/lang/String;)V', ['']).run()
@@ -0,0 +1,26 @@
+from unittest import TestCase
+from lib import benchmark
+from lib import metrics
+
+
+class TestBenchmark(TestCase):
+    def test_parse_bootstrap_classes(self):
+        counters = metrics.counters.copy()
+        report = benchmark.run('bootstrap')
+        self.assertEqual(report['classes'], len(benchmark.BOOTSTRAP_CLASSES))
+        self.assertEqual(report['classes_parsed'], report['classes'])
+        self.assertEqual(report['failures'], 0)
+        self.assertGreater(report['bytes_parsed'], 0)
+        for phase in benchmark.PHASES:
+            self.assertGreater(report['phase_seconds'][phase], 0)
+        self.assertLessEqual(
+            sum(report['phase_seconds'].values()), report['wall_seconds'])
+        # The counters of the VM are not changed by the benchmark
+        self.assertEqual(metrics.counters, counters)
+        self.assertFalse(metrics.timing)
+
+    def test_class_set_of_package(self):
+        names = benchmark.class_names('java/lang')
+        self.assertIn('java/lang/Object', names)
+        self.assertIn('java/lang/ref/Reference', names)
+        self.assertNotIn('java/util/HashMap', names)
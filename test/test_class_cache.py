@@ -0,0 +1,62 @@
+import os
+import tempfile
+from unittest import TestCase
+from lib import class_cache
+from lib import class_loader
+from lib import metrics
+from lib import preparse
+
+
+class TestClassCache(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.saved_cache_dir = class_cache.cache_dir
+        class_cache.cache_dir = self.cache_dir.name
+        self.filename = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            'local_static_func',
+            'LocalStaticFunc.class'
+        )
+        self.stamp = class_cache.file_stamp(self.filename)
+
+    def tearDown(self):
+        class_cache.cache_dir = self.saved_cache_dir
+        self.cache_dir.cleanup()
+
+    def test_miss_then_hit(self):
+        hits = metrics.counters['class_cache.hit']
+        self.assertIsNone(class_cache.load(self.filename, self.stamp))
+        class_cache.store(
+            self.filename, self.stamp, class_loader.parse(self.filename))
+        class_struct = class_cache.load(self.filename, self.stamp)
+        self.assertEqual(metrics.counters['class_cache.hit'], hits + 1)
+        self.assertEqual(class_struct.name(), 'LocalStaticFunc')
+        code = class_struct.methods[0].code()
+        self.assertIsNotNone(code._instructions)
+        self.assertEqual(len(code.instructions), code.code_length)
+
+    def test_changed_file_is_stale(self):
+        class_cache.store(
+            self.filename, self.stamp, class_loader.parse(self.filename))
+        mtime_ns, size = self.stamp
+        self.assertIsNone(
+            class_cache.load(self.filename, (mtime_ns + 1, size)))
+
+    def test_preparse_fills_cache(self):
+        saved_enabled = class_cache.enabled
+        class_cache.enabled = True
+        try:
+            report = preparse.preparse(os.path.dirname(self.filename), 1)
+        finally:
+            class_cache.enabled = saved_enabled
+        self.assertEqual(report['classes'], 1)
+        self.assertEqual(report['failures'], 0)
+        key = os.path.realpath(self.filename)
+        self.assertIsNotNone(class_cache.load(key, self.stamp))
+
+    def test_loaded_strings_are_interned(self):
+        class_cache.store(
+            self.filename, self.stamp, class_loader.parse(self.filename))
+        parsed = class_loader.parse(self.filename)
+        loaded = class_cache.load(self.filename, self.stamp)
+        self.assertIs(parsed.name(), loaded.name())
@@ -1,7 +1,10 @@
 import os
+import shutil
+import tempfile
 from unittest import TestCase
-from lib.class_loader import BootstrapClassLoader
+from lib.class_loader import BootstrapClassLoader, MappedClassLoader
 from lib import constant_pool
+from lib import footprint
 import logging
 
 
@@ -93,6 +96,33 @@ class TestBootstrapClassLoader(TestCase):
             'java/lang/Object'
         )
 
+    def test_resolved_references(self):
+        pool = self.class_struct.constant_pool
+        ref = pool.method_ref(2)
+        self.assertEqual(
+            ref, ('LocalStaticFunc', 'cal', '(I)I', 1))
+        self.assertIs(pool.method_ref(2), ref)
+        self.assertEqual(
+            pool.method_ref(1), ('java/lang/Object', '<init>', '()V', 0))
+        # Resolution is not pickled
+        self.assertEqual(pool.__getstate__()['resolved'], {})
+        self.assertEqual(pool.resolved[2], ref)
+
+    def test_metadata_is_slotted(self):
+        method = self.class_struct.methods[0]
+        for item in (
+            self.class_struct,
+            method,
+            method.code(),
+            self.class_struct.constant_pool[1],
+            self.class_struct.access_flags
+        ):
+            self.assertFalse(hasattr(item, '__dict__'), type(item))
+        self.assertEqual(self.class_struct.access_flags, 0x0021)
+        self.assertIs(
+            method.access_flags,
+            type(method.access_flags).of(int(method.access_flags)))
+
     def test_interface_counter(self):
         self.assertEqual(self.class_struct.interfaces_count, 0)
 
@@ -101,3 +131,78 @@ class TestBootstrapClassLoader(TestCase):
 
     def test_method_counter(self):
         self.assertEqual(self.class_struct.methods_count, 3)
+
+
+class TestMappedClassLoader(TestBootstrapClassLoader):
+    def setUp(self):
+        filename = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            'local_static_func/',
+            'LocalStaticFunc.class'
+        )
+        self.class_struct = MappedClassLoader().parse_file(filename)
+
+    def test_parse_bytes_same_as_mmap(self):
+        filename = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            'local_static_func/',
+            'LocalStaticFunc.class'
+        )
+        with open(filename, 'rb') as java_class_file:
+            class_struct = MappedClassLoader().parse(java_class_file.read())
+        self.assertEqual(class_struct.name(), self.class_struct.name())
+        self.assertEqual(
+            [m.descriptor for m in class_struct.methods],
+            [m.descriptor for m in self.class_struct.methods]
+        )
+        self.assertEqual(
+            [m.code().code for m in class_struct.methods],
+            [m.code().code for m in self.class_struct.methods]
+        )
+
+    def test_constant_pool_is_materialized_on_demand(self):
+        pool = self.class_struct.constant_pool
+        self.assertIsInstance(pool, constant_pool.LazyConstantPool)
+        materialized = pool.materialized_count()
+        self.assertLess(materialized, pool.max_size)
+        self.assertIs(pool[1], pool[1])
+        self.assertIs(type(pool[1]), constant_pool.ConstantMethodref)
+
+    def test_code_is_decoded_on_first_access(self):
+        code = self.class_struct.methods[0].code()
+        self.assertIsNone(code._instructions)
+        self.assertIs(code.instructions, code.instructions)
+        self.assertEqual(len(code.instructions), code.code_length)
+
+    def test_non_essential_attributes_are_deferred(self):
+        source_file = self.class_struct.attributes[0]
+        self.assertEqual(source_file.name, 'SourceFile')
+        self.assertIsNotNone(source_file._deferred)
+        self.assertEqual(len(source_file.info), source_file.length)
+        self.assertIsNone(source_file._deferred)
+
+    def test_deferred_attributes_of_changed_class_file(self):
+        test_dir = os.path.dirname(os.path.realpath(__file__))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, 'LocalStaticFunc.class')
+            shutil.copy(os.path.join(
+                test_dir, 'local_static_func', 'LocalStaticFunc.class'),
+                filename)
+            class_struct = MappedClassLoader().parse_file(filename)
+            source_file = class_struct.attributes[0]
+            self.assertIsNotNone(source_file._deferred)
+            # Rewritten after the class is loaded
+            shutil.copy(os.path.join(
+                test_dir, 'hello_world', 'Main.class'), filename)
+            with self.assertRaisesRegex(ValueError, 'changed since'):
+                source_file.info
+            self.assertIsNotNone(source_file._deferred)
+
+    def test_footprint(self):
+        size = footprint.class_footprint(self.class_struct, set())
+        self.assertEqual(size['decoded_code'], 0)
+        self.assertGreater(size['constant_pool'], 0)
+        self.assertGreater(size['metadata'], 0)
+        self.class_struct.methods[0].code().instructions
+        decoded = footprint.class_footprint(self.class_struct, set())
+        self.assertGreater(decoded['decoded_code'], 0)
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+from lib import class_loader
+from lib import class_reload
+from lib import run_time_data
+from lib import thread
+from program_test import ProgramTestCase, TEST_DIR
+
+
+class TestClassReload(ProgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        for program in ('get_set_field', 'call_virtual_function'):
+            shutil.copytree(
+                os.path.join(TEST_DIR, program),
+                os.path.join(self.temp_dir, program))
+        class_reload.enabled = True
+
+    def tearDown(self):
+        class_reload.enabled = False
+        class_reload.stamps.clear()
+        super().tearDown()
+        shutil.rmtree(self.temp_dir)
+
+    def use_program(self, program):
+        '''Run a copy of the program, which the test can change'''
+        class_loader.classpath = os.path.join(self.temp_dir, program)
+
+    def touch(self, program, classname):
+        file_name = os.path.join(
+            self.temp_dir, program, classname + '.class')
+        stat = os.stat(file_name)
+        os.utime(file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def run_main(self):
+        main_thread = thread.Thread(
+            'Main', 'main', '([Ljava/lang/String;)V', [''])
+        run_time_data.thread_pool.append(main_thread)
+        try:
+            main_thread.run()
+        finally:
+            run_time_data.thread_pool.remove(main_thread)
+
+    def test_only_changed_class_is_reloaded(self):
+        self.use_program('get_set_field')
+        main = class_loader.load_class('Main')
+        self.run_main()
+        data = run_time_data.method_area['Data']
+        self.assertEqual(set(class_reload.stamps), {'Main', 'Data'})
+        self.assertNotIn('java/lang/Object', class_reload.stamps)
+        self.assertEqual(class_reload.reload_changed_classes(), [])
+        self.touch('get_set_field', 'Data')
+        self.assertEqual(class_reload.reload_changed_classes(), ['Data'])
+        self.assertNotIn('Data', run_time_data.method_area)
+        self.assertNotIn('Data', run_time_data.class_static_fields)
+        self.assertIs(run_time_data.method_area['Main'], main)
+        self.run_main()
+        self.assertIsNot(run_time_data.method_area['Data'], data)
+        # Initialized again
+        self.assertEqual(
+            list(run_time_data.class_static_fields['Data'].values()), [4])
+
+    def test_implementers_are_invalidated(self):
+        self.use_program('call_virtual_function')
+        for name in ('People', 'FakeRunner', 'WhoRunFaster', 'Main'):
+            class_loader.load_class(name)
+        self.touch('call_virtual_function', 'People')
+        self.assertEqual(
+            class_reload.reload_changed_classes(),
+            ['FakeRunner', 'People', 'WhoRunFaster'])
+        self.assertIn('Main', run_time_data.method_area)
+
+    def test_removed_class_is_invalidated(self):
+        self.use_program('get_set_field')
+        class_loader.load_class('Data')
+        os.remove(os.path.join(self.temp_dir, 'get_set_field', 'Data.class'))
+        self.assertEqual(class_reload.reload_changed_classes(), ['Data'])
+        self.assertIsNone(class_loader.find_class('Data'))
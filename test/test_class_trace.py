@@ -0,0 +1,63 @@
+import logging
+import os
+from lib import class_loader
+from lib import class_trace
+from program_test import ProgramTestCase
+
+
+class RecordHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record.class_load)
+
+
+class TestClassTrace(ProgramTestCase):
+    program = 'get_set_field'
+
+    def setUp(self):
+        super().setUp()
+        self.handler = RecordHandler()
+        class_trace.logger.addHandler(self.handler)
+        class_trace.enable(log=False)
+
+    def tearDown(self):
+        class_trace.logger.removeHandler(self.handler)
+        class_trace.disable()
+        super().tearDown()
+
+    def test_record_per_loaded_class(self):
+        class_loader.load_class('Data')
+        self.assertEqual(len(self.handler.records), 1)
+        record = self.handler.records[0]
+        self.assertEqual(record.name, 'Data')
+        self.assertIn(record.source, ('dir', 'cache'))
+        self.assertTrue(record.location.endswith('Data.class'))
+        self.assertEqual(
+            record.size,
+            os.path.getsize(os.path.join(
+                class_loader.classpath, 'Data.class')))
+        self.assertGreater(record.parse_seconds, 0)
+        self.assertEqual(record.trigger, 'launcher')
+        self.assertIn('[Loaded Data from ', str(record))
+        self.assertEqual(record.as_dict()['name'], 'Data')
+
+    def test_not_enabled(self):
+        class_trace.logger.setLevel(logging.WARNING)
+        self.assertFalse(class_trace.enabled())
+        class_loader.load_class('Data')
+        self.assertEqual(self.handler.records, [])
+
+    def test_not_enabled_by_debug_logging(self):
+        class_trace.disable()
+        root = logging.getLogger()
+        level = root.level
+        root.setLevel(logging.DEBUG)
+        try:
+            self.assertFalse(class_trace.enabled())
+            class_loader.load_class('Data')
+        finally:
+            root.setLevel(level)
+        self.assertEqual(self.handler.records, [])
@@ -0,0 +1,118 @@
+from lib import class_loader
+from lib import class_unloading
+from lib import constant_pool
+from lib import frame
+from lib import metrics
+from lib import run_time_data
+from lib import thread
+from program_test import ProgramTestCase
+
+
+class TestClassUnloading(ProgramTestCase):
+    program = 'get_set_field'
+
+    def setUp(self):
+        super().setUp()
+        # Other tests leave classes in the method area and the LRU list
+        self.reset()
+
+    def tearDown(self):
+        self.reset()
+        super().tearDown()
+
+    def reset(self):
+        class_unloading.max_classes = 0
+        class_unloading.max_bytes = 0
+        class_unloading.pending = False
+        class_unloading.lru.clear()
+        class_unloading.pinned.clear()
+        class_unloading._sizes.clear()
+
+    def evict(self):
+        '''Return the names of the evicted classes'''
+        loaded = set(run_time_data.method_area)
+        self.assertEqual(
+            class_unloading.evict(),
+            len(loaded - set(run_time_data.method_area)))
+        return loaded - set(run_time_data.method_area)
+
+    def test_least_recently_used_class_is_evicted(self):
+        class_unloading.max_classes = 10000
+        class_loader.load_class('Main')
+        class_loader.load_class('Data')
+        # Classes of the bootstrap class path are never in the LRU list
+        self.assertNotIn('java/lang/Object', class_unloading.lru)
+        self.assertEqual(list(class_unloading.lru), ['Main', 'Data'])
+        run_time_data.method_area['Main']
+        self.assertEqual(list(class_unloading.lru), ['Data', 'Main'])
+        evicted = metrics.counters['method_area.evicted']
+        class_unloading.max_classes = len(run_time_data.method_area) - 1
+        self.assertEqual(self.evict(), {'Data'})
+        self.assertEqual(
+            metrics.counters['method_area.evicted'], evicted + 1)
+        self.assertNotIn('Data', run_time_data.class_static_fields)
+        self.assertIn('Main', run_time_data.method_area)
+        self.assertEqual(list(class_unloading.lru), ['Main'])
+
+    def test_unloaded_classes_are_resolved_again(self):
+        main = class_loader.load_class('Main')
+        pool = main.constant_pool
+        index = next(
+            index for index in range(1, pool.count)
+            if type(pool[index]) is constant_pool.ConstantMethodref and
+            pool.method_ref(index).name == 'get_v')
+        data, get_v = main.resolve_method(index)
+        self.assertIs(data, run_time_data.method_area['Data'])
+        self.assertEqual(get_v.descriptor, '()I')
+        self.assertIs(main.resolve_method(index)[0], data)
+        class_unloading.unload('Data')
+        reloaded, _ = main.resolve_method(index)
+        self.assertIsNot(reloaded, data)
+        self.assertIs(reloaded, run_time_data.method_area['Data'])
+
+    def test_classes_in_use_are_not_evicted(self):
+        class_unloading.max_classes = 1
+        main = class_loader.load_class('Main')
+        data = class_loader.load_class('Data')
+        main_thread = thread.Thread(
+            'Main', 'main', '([Ljava/lang/String;)V', [''])
+        main_frame = frame.Frame(
+            main,
+            main.get_method('main', '([Ljava/lang/String;)V'),
+            None,
+            [None],
+            [None]
+        )
+        main_frame.operand_stack.append(frame.Object(data))
+        main_thread.stack.append(main_frame)
+        run_time_data.thread_pool.append(main_thread)
+        try:
+            self.assertTrue(class_unloading.pending)
+            class_unloading.safepoint()
+            self.assertFalse(class_unloading.pending)
+            self.assertIn('Main', run_time_data.method_area)
+            self.assertIn('Data', run_time_data.method_area)
+        finally:
+            run_time_data.thread_pool.remove(main_thread)
+        # Only down to the cap
+        class_unloading.max_classes = len(run_time_data.method_area) - 1
+        self.assertEqual(self.evict(), {'Main'})
+
+    def test_program_runs_with_evictions(self):
+        class_unloading.max_classes = 1
+        evicted = metrics.counters['method_area.evicted']
+        class_loader.load_class('Main')
+        main_thread = thread.Thread(
+            'Main', 'main', '([Ljava/lang/String;)V', [''])
+        run_time_data.thread_pool.append(main_thread)
+        try:
+            main_thread.run()
+        finally:
+            run_time_data.thread_pool.remove(main_thread)
+        # Data is loaded and initialized once, all its methods run in use
+        self.assertEqual(
+            metrics.counters['method_area.evicted'], evicted)
+        self.assertEqual(
+            list(run_time_data.class_static_fields['Data'].values()), [4])
+        # Between programs
+        self.assertEqual(self.evict(), {'Main', 'Data'})
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import zipfile
+from unittest import TestCase
+from lib import archive
+from lib import class_loader
+from lib import classpath
+from lib import metrics
+
+
+class TestArchiveClassPath(TestCase):
+    def setUp(self):
+        self.klass_path = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            'call_virtual_function'
+        )
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jars = {}
+        for name, compression in (
+            ('stored', zipfile.ZIP_STORED),
+            ('deflated', zipfile.ZIP_DEFLATED)
+        ):
+            jar = os.path.join(self.tmp_dir.name, f'{name}.jar')
+            with zipfile.ZipFile(jar, 'w', compression) as z:
+                for filename in os.listdir(self.klass_path):
+                    if filename.endswith('.class'):
+                        z.write(
+                            os.path.join(self.klass_path, filename), filename)
+            self.jars[name] = jar
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_member(self):
+        with open(os.path.join(self.klass_path, 'Main.class'), 'rb') as f:
+            expected = f.read()
+        stored = archive.Archive(self.jars['stored'])
+        self.assertIsInstance(stored.read('Main.class'), memoryview)
+        self.assertEqual(bytes(stored.read('Main.class')), expected)
+        deflated = archive.Archive(self.jars['deflated'])
+        self.assertEqual(bytes(deflated.read('Main.class')), expected)
+        self.assertNotIn('Missing.class', deflated)
+
+    def test_find_class_in_jar(self):
+        saved_classpath = class_loader.classpath
+        try:
+            for jar in self.jars.values():
+                class_loader.classpath = jar
+                source = class_loader.find_class('People')
+                self.assertIsInstance(
+                    source, classpath.ArchiveMemberSource)
+                class_struct = source.parse(class_loader.MappedClassLoader())
+                self.assertEqual(class_struct.name(), 'People')
+        finally:
+            class_loader.classpath = saved_classpath
+
+    def test_multiple_entries_and_negative_cache(self):
+        class_path = classpath.ClassPath([
+            os.path.join(self.tmp_dir.name, 'missing'),
+            self.jars['deflated'],
+            self.klass_path,
+        ])
+        self.assertIsInstance(
+            class_path.find('People'), classpath.ArchiveMemberSource)
+        negative_hits = metrics.counters['classpath.negative_hit']
+        self.assertIsNone(class_path.find('java/lang/Missing'))
+        self.assertIsNone(class_path.find('java/lang/Missing'))
+        self.assertEqual(
+            metrics.counters['classpath.negative_hit'], negative_hits + 1)
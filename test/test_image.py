@@ -0,0 +1,70 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+from lib import class_loader
+from lib import classpath
+from lib import image
+
+
+class TestRuntimeImage(TestCase):
+    def setUp(self):
+        self.root = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            '..',
+            'openjdk_jre',
+            'lib',
+            'java',
+            'lang',
+            'ref'
+        )
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.image_file = os.path.join(self.tmp_dir.name, image.IMAGE_NAME)
+        self.count = image.pack(self.root, self.image_file)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_pack_and_read(self):
+        runtime_image = image.Image(self.image_file)
+        names = sorted(runtime_image.names())
+        self.assertEqual(len(names), self.count)
+        self.assertIn('Reference', names)
+        for name in names:
+            with open(os.path.join(self.root, name + '.class'), 'rb') as f:
+                self.assertEqual(
+                    bytes(runtime_image.read(runtime_image.find(name))),
+                    f.read())
+        self.assertNotIn('Missing', runtime_image)
+
+    def test_pack_without_class_files(self):
+        out_file = os.path.join(self.tmp_dir.name, 'empty' + image.SUFFIX)
+        for root in (self.tmp_dir.name, self.image_file):
+            with self.assertRaises(ValueError):
+                image.pack(root, out_file)
+        self.assertFalse(os.path.exists(out_file))
+
+    def test_find_and_parse_class_in_image(self):
+        class_path = classpath.ClassPath([self.image_file])
+        source = class_path.find('WeakReference')
+        self.assertIsInstance(source, classpath.ImageMemberSource)
+        class_struct = source.parse(class_loader.MappedClassLoader())
+        class_struct.source = source
+        self.assertEqual(class_struct.name(), 'java/lang/ref/WeakReference')
+        self.assertIsNone(class_path.find('Missing'))
+        # Deferred attributes are read from the image after unpickling
+        loaded = pickle.loads(pickle.dumps(class_struct))
+        self.assertEqual(loaded.source.key, source.key)
+        self.assertEqual(bytes(loaded.class_bytes()), bytes(source.read()))
+
+    def test_runtime_path_of_java_home(self):
+        java_home = self.tmp_dir.name
+        self.assertEqual(
+            image.runtime_path(java_home), os.path.join(java_home, 'lib'))
+        os.mkdir(os.path.join(java_home, 'lib'))
+        os.replace(
+            self.image_file,
+            os.path.join(java_home, 'lib', image.IMAGE_NAME))
+        self.assertEqual(
+            image.runtime_path(java_home),
+            os.path.join(java_home, 'lib', image.IMAGE_NAME))
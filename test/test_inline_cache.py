@@ -0,0 +1,76 @@
+import io
+from lib import class_unloading
+from lib import inline_cache
+from program_test import ProgramTestCase
+
+
+class FakeClass(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class TestInlineCache(ProgramTestCase):
+    program = 'call_virtual_function'
+
+    def setUp(self):
+        super().setUp()
+        self.saved_max_receivers = inline_cache.max_receivers
+        self.selected = []
+
+    def tearDown(self):
+        inline_cache.max_receivers = self.saved_max_receivers
+        super().tearDown()
+
+    def select(self, klass):
+        self.selected.append(klass.name)
+        return klass.name, None
+
+    def test_states(self):
+        inline_cache.max_receivers = 2
+        cache = inline_cache.InlineCache('Main.main', 6, self.select)
+        a, b, c = FakeClass('A'), FakeClass('B'), FakeClass('C')
+        self.assertEqual(cache.state(), 'uninitialized')
+        self.assertEqual(cache.lookup(a), ('A', None))
+        self.assertEqual(cache.lookup(a), ('A', None))
+        self.assertEqual(cache.state(), 'monomorphic')
+        self.assertEqual(cache.lookup(b), ('B', None))
+        self.assertEqual(cache.state(), 'polymorphic')
+        self.assertEqual(cache.lookup(c), ('C', None))
+        self.assertEqual(cache.lookup(c), ('C', None))
+        self.assertEqual(cache.state(), 'megamorphic')
+        self.assertEqual(cache.lookup(b), ('B', None))
+        self.assertEqual(self.selected, ['A', 'B', 'C', 'C'])
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+    def test_cleared_after_unload(self):
+        cache = inline_cache.InlineCache('Main.main', 6, self.select)
+        a = FakeClass('A')
+        cache.lookup(a)
+        cache.lookup(FakeClass('B'))
+        class_unloading.generation += 1
+        # Classes which are cached are still hits
+        cache.lookup(a)
+        self.assertEqual(cache.state(), 'polymorphic')
+        cache.lookup(FakeClass('C'))
+        self.assertEqual(cache.state(), 'monomorphic')
+        self.assertEqual(cache.receiver.name, 'C')
+
+    def test_call_sites(self):
+        for engine in self.engines():
+            for _ in range(3):
+                self.run_main()
+            caches = sorted(
+                (cache for cache in inline_cache.sites
+                 if cache.method == 'Main.main'
+                 and cache.generation == class_unloading.generation),
+                key=lambda cache: cache.pc)
+            self.assertEqual(
+                [(cache.pc, cache.state(), cache.hits, cache.misses)
+                 for cache in caches],
+                [(6, 'monomorphic', 2, 1), (18, 'monomorphic', 2, 1)])
+            out = io.StringIO()
+            inline_cache.report(out)
+            self.assertIn(
+                'inline_cache Main.main@6: monomorphic, '
+                'hits: 2, misses: 1\n',
+                out.getvalue())
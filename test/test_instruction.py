@@ -0,0 +1,68 @@
+from lib import frame
+from lib import instruction
+from lib import run_time_data
+from program_test import ProgramTestCase
+
+
+class TestInstruction(ProgramTestCase):
+    program = 'local_static_func'
+
+    def setUp(self):
+        super().setUp()
+        # Loaded again, none of its instructions is quickened
+        self.class_struct = run_time_data.method_area['LocalStaticFunc']
+
+    def frame_of(self, method_name, method_descriptor, parameters):
+        method = self.class_struct.get_method(method_name, method_descriptor)
+        return frame.Frame(
+            self.class_struct,
+            method,
+            None,
+            ['I'] * len(parameters),
+            parameters
+        )
+
+    def instruction_of(self, frame, instruction_type):
+        return next(
+            instr for instr in frame.code.instructions
+            if type(instr) is instruction_type)
+
+    def test_invoke_results_are_in_frame(self):
+        frames = [
+            self.frame_of('main', '([Ljava/lang/String;)V', [None]),
+            self.frame_of('main', '([Ljava/lang/String;)V', [None]),
+        ]
+        invokestatic = self.instruction_of(frames[0], instruction.invokestatic)
+        # Both frames are in the middle of the same instruction
+        for value, callee_frame in zip((6, 7), frames):
+            callee_frame.operand_stack.append(value)
+        for callee_frame in frames:
+            self.assertIs(
+                invokestatic.execute(callee_frame),
+                instruction.NextStep.invoke_method)
+        self.assertEqual(
+            [callee_frame.invocation for callee_frame in frames],
+            [
+                instruction.Invocation(
+                    'LocalStaticFunc', 'cal', '(I)I', None, [6]),
+                instruction.Invocation(
+                    'LocalStaticFunc', 'cal', '(I)I', None, [7]),
+            ])
+        self.assertEqual(vars(invokestatic), {
+            'address': invokestatic.address,
+            'index': invokestatic.index,
+        })
+
+    def test_jump_and_return_results_are_in_frame(self):
+        cal_frame = self.frame_of('cal', '(I)I', [6])
+        goto = self.instruction_of(cal_frame, instruction.goto)
+        self.assertIs(goto.execute(cal_frame), instruction.NextStep.jump_to)
+        self.assertEqual(
+            cal_frame.next_ops_address, goto.address + goto.offset)
+        ireturn = self.instruction_of(cal_frame, instruction.ireturn)
+        cal_frame.operand_stack.append(12)
+        self.assertIs(
+            ireturn.execute(cal_frame),
+            instruction.NextStep.method_return_value)
+        # The invoker pops the value
+        self.assertEqual(list(cal_frame.operand_stack), [12])
@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+from lib import instruction_trace
+from lib import run_time_data
+from lib import thread
+from program_test import ProgramTestCase
+
+
+class TestInstructionTrace(ProgramTestCase):
+    program = 'local_static_func'
+
+    def setUp(self):
+        super().setUp()
+        self.events = []
+
+    def tearDown(self):
+        instruction_trace.disable()
+        super().tearDown()
+
+    def run_main(self):
+        super().run_main('LocalStaticFunc')
+
+    def test_trace_a_method(self):
+        for engine in self.engines():
+            self.events = []
+            instruction_trace.enable(
+                self.events.append, ['LocalStaticFunc.cal'])
+            self.run_main()
+            instruction_trace.disable()
+            self.assertEqual(
+                {event.method for event in self.events},
+                {'LocalStaticFunc.cal'})
+            first = self.events[0]
+            self.assertEqual(
+                (first.pc, first.opcode, first.stack, first.locals),
+                (0, 'iconst_0', [], [6, None, None]))
+            last = self.events[-1]
+            self.assertEqual((last.opcode, last.stack), ('ireturn', [6]))
+            if engine == 'classic':
+                classic_events = [str(event) for event in self.events]
+        self.assertEqual([str(event) for event in self.events], classic_events)
+
+    def test_untraced_handlers(self):
+        thread.engine = 'threaded'
+        instruction_trace.enable(self.events.append, ['SomeOtherClass'])
+        self.run_main()
+        self.assertEqual(self.events, [])
+        code = run_time_data.method_area['LocalStaticFunc'].get_method(
+            'cal', '(I)I').code()
+        self.assertNotIn(
+            'traced_handler',
+            {handler.__name__ for handler in code.handlers if handler})
+        # Enabling tracing compiles the handlers again
+        instruction_trace.enable(self.events.append)
+        self.assertIsNone(code.handlers)
+
+    def test_json_lines_sink(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'trace.jsonl')
+            instruction_trace.enable(
+                instruction_trace.JsonLinesSink(file_name),
+                ['LocalStaticFunc'])
+            self.run_main()
+            instruction_trace.disable()
+            with open(file_name) as trace_file:
+                events = [json.loads(line) for line in trace_file]
+        self.assertEqual(
+            events[0],
+            {
+                'method': 'LocalStaticFunc.main',
+                'pc': 0,
+                'opcode': 'bipush',
+                'stack': [],
+                'locals': ['', None],
+            })
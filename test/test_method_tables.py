@@ -0,0 +1,76 @@
+import pickle
+from lib import class_unloading
+from lib import run_time_data
+from program_test import ProgramTestCase
+
+
+class TestMethodTables(ProgramTestCase):
+    program = 'call_virtual_function'
+
+    def test_vtable(self):
+        obj = run_time_data.method_area['java/lang/Object']
+        faster = run_time_data.method_area['WhoRunFaster']
+        fake = run_time_data.method_area['FakeRunner']
+        people = run_time_data.method_area['People']
+        self.assertIsNone(faster.vtable)
+        vtable = faster.link()
+        self.assertIs(faster.link(), vtable)
+        # Methods of the super class keep their slots
+        self.assertEqual(vtable[:len(obj.link())], obj.vtable)
+        self.assertEqual(faster.vtable_index, fake.link_index())
+        self.assertNotIn(('<init>', '()V'), faster.vtable_index)
+        slot = faster.vtable_index[('speed', '()I')]
+        self.assertIs(vtable[slot][0], faster)
+        self.assertEqual(vtable[slot][1].name, 'WhoRunFaster.speed')
+        # The default method of the interface
+        self.assertIs(fake.vtable[slot][0], people)
+        self.assertEqual(
+            fake.interface_resolution('speed', '()I'), fake.vtable[slot])
+        # The static method of the interface is not in the tables
+        self.assertEqual(
+            list(people.link_index()), [('speed', '()I')])
+        self.assertEqual(faster.itables, {'People': [vtable[slot]]})
+        self.assertEqual(fake.itables, {'People': [fake.vtable[slot]]})
+
+    def test_not_pickled(self):
+        faster = run_time_data.method_area['WhoRunFaster']
+        faster.link()
+        unpickled = pickle.loads(pickle.dumps(faster))
+        self.assertIsNone(unpickled.vtable)
+        self.assertIsNone(unpickled.itables)
+        self.assertEqual(len(unpickled.methods), len(faster.methods))
+
+    def test_dispatch(self):
+        for engine in self.engines():
+            self.run_main()
+            for name in ('WhoRunFaster', 'FakeRunner', 'People'):
+                self.assertIsNotNone(run_time_data.method_area[name].vtable)
+
+    def test_super_classes_are_not_evicted_before_subclasses(self):
+        class_unloading.lru.clear()
+        class_unloading.max_classes = 10000
+        try:
+            self.run_main()
+            run_time_data.method_area['WhoRunFaster']
+            fake = run_time_data.method_area['FakeRunner']
+            self.assertEqual(
+                list(class_unloading.lru),
+                ['Main', 'People', 'WhoRunFaster', 'FakeRunner'])
+            class_unloading.max_classes = len(run_time_data.method_area) - 2
+            self.assertEqual(class_unloading.evict(), 2)
+            # The interface of FakeRunner is skipped
+            self.assertEqual(
+                list(class_unloading.lru), ['People', 'FakeRunner'])
+            slot = fake.vtable_index[('speed', '()I')]
+            self.assertIs(
+                fake.vtable[slot][0],
+                dict.__getitem__(run_time_data.method_area, 'People'))
+            # Once FakeRunner is evicted, so is the interface
+            class_unloading.max_classes = 1
+            self.assertEqual(class_unloading.evict(), 1)
+            self.assertEqual(list(class_unloading.lru), ['People'])
+            self.assertEqual(class_unloading.evict(), 1)
+            self.assertNotIn('People', run_time_data.method_area)
+        finally:
+            class_unloading.max_classes = 0
+            class_unloading.lru.clear()
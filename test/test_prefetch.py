@@ -0,0 +1,60 @@
+import os
+from lib import class_loader
+from lib import metrics
+from lib import prefetch
+from lib import run_time_data
+from program_test import ProgramTestCase
+
+
+class TestPrefetch(ProgramTestCase):
+    program = 'get_set_field'
+
+    def setUp(self):
+        super().setUp()
+        class_loader.prefetched.clear()
+
+    def tearDown(self):
+        class_loader.prefetched.clear()
+        super().tearDown()
+
+    def test_prefetch_class_path_closure(self):
+        count = prefetch.prefetch('Main')
+        self.assertEqual(count, len(class_loader.prefetched))
+        for name in ('Main', 'Data', 'java/lang/Object'):
+            if name not in run_time_data.method_area:
+                self.assertIn(name, class_loader.prefetched)
+        self.assertIn('Data', class_loader.prefetched)
+        # Only super classes and interfaces of JRE classes are followed
+        self.assertNotIn('java/lang/StringBuilder', class_loader.prefetched)
+
+    def test_load_class_takes_prefetched_class(self):
+        class_loader.prefetched.clear()
+        prefetch.prefetch('Main')
+        class_struct = class_loader.prefetched['Data']
+        used = metrics.counters['prefetch.used']
+        self.assertIs(class_loader.load_class('Data'), class_struct)
+        self.assertEqual(metrics.counters['prefetch.used'], used + 1)
+        self.assertNotIn('Data', class_loader.prefetched)
+
+    def test_referenced_array_classes(self):
+        string_class = class_loader.parse(os.path.join(
+            class_loader.jrelibpath, 'java', 'lang', 'String.class'))
+        references = set(prefetch.referenced_classes(string_class))
+        # [Ljava/lang/CharSequence; and [C
+        self.assertIn('java/lang/CharSequence', references)
+        self.assertNotIn('C', references)
+        self.assertFalse(any(name.startswith('[') for name in references))
+
+    def test_background_prefetcher(self):
+        prefetcher = prefetch.BackgroundPrefetcher(2)
+        class_loader.prefetcher = prefetcher
+        try:
+            class_loader.load_class('Main')
+            self.assertIn('Data', prefetcher.futures)
+            future = prefetcher.futures['Data']
+            self.assertIs(class_loader.load_class('Data'), future.result())
+            self.assertNotIn('Data', prefetcher.futures)
+        finally:
+            class_loader.prefetcher = None
+            prefetcher.close()
+        self.assertEqual(prefetcher.futures, {})
@@ -0,0 +1,61 @@
+import os
+import pstats
+import tempfile
+from itertools import count
+from lib import method_hooks
+from lib import profiler
+from program_test import ProgramTestCase
+
+
+class TestProfiler(ProgramTestCase):
+    program = 'local_static_func'
+
+    def tearDown(self):
+        method_hooks.set_hook(None)
+        super().tearDown()
+
+    def run_main(self):
+        super().run_main('LocalStaticFunc')
+
+    def test_hook_events(self):
+        for engine in self.engines():
+            events = []
+            method_hooks.set_hook(
+                lambda event, frame, arg:
+                    events.append((event, frame.method.name, arg)))
+            self.run_main()
+            self.assertEqual(events, [
+                ('call', 'LocalStaticFunc.main', None),
+                ('call', 'LocalStaticFunc.cal', None),
+                ('return', 'LocalStaticFunc.cal', 6),
+                ('return', 'LocalStaticFunc.main', None),
+            ])
+
+    def test_profile(self):
+        for engine in self.engines():
+            # A tick per event
+            method_profiler = profiler.Profiler(timer=count().__next__)
+            method_profiler.enable()
+            self.run_main()
+            method_profiler.disable()
+            stats = pstats.Stats(method_profiler).stats
+            main, cal = sorted(stats, key=lambda key: key[2], reverse=True)
+            self.assertEqual(
+                main[2], 'LocalStaticFunc.main([Ljava/lang/String;)V')
+            self.assertEqual(stats[main], (1, 1, 2, 3, {}))
+            self.assertEqual(stats[cal], (1, 1, 1, 1, {main: (1, 1, 1, 1)}))
+
+    def test_dump_stats(self):
+        method_profiler = profiler.Profiler()
+        method_profiler.enable()
+        self.run_main()
+        method_profiler.disable()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'jedy.prof')
+            method_profiler.dump_stats(file_name)
+            stats = pstats.Stats(file_name)
+        self.assertEqual(stats.total_calls, 2)
+        self.assertEqual(
+            {key[2] for key in stats.stats},
+            {'LocalStaticFunc.main([Ljava/lang/String;)V',
+             'LocalStaticFunc.cal(I)I'})
@@ -0,0 +1,95 @@
+import pickle
+from lib import class_unloading
+from lib import frame
+from lib import instruction
+from lib import run_time_data
+from program_test import ProgramTestCase
+
+
+class TestQuickening(ProgramTestCase):
+    program = 'get_set_field'
+
+    def main_code(self):
+        return run_time_data.method_area['Main'].get_method(
+            'main', '([Ljava/lang/String;)V').code()
+
+    def count(self):
+        return list(run_time_data.class_static_fields['Data'].values())
+
+    def test_quickened_after_first_execution(self):
+        for engine in self.engines():
+            self.run_main()
+            code = self.main_code()
+            names = {
+                type(instr).__name__
+                for instr in code.instructions if instr is not None}
+            # Handlers of getfield and putfield are compiled resolved, the
+            # threaded engine never executes them
+            self.assertTrue({
+                'new_quick',
+                'invokespecial_quick',
+                'invokevirtual_quick',
+                'getstatic_quick',
+                'putstatic_quick',
+            } <= names)
+            self.assertFalse({'new', 'getstatic', 'putstatic'} & names)
+            self.assertEqual(self.count(), [4])
+            # Run again on the quick variants
+            self.run_main()
+            self.assertEqual(self.count(), [6])
+            if engine == 'threaded':
+                self.assertIn(
+                    '_getstatic_quick.<locals>.handler',
+                    {handler.__qualname__
+                     for handler in code.handlers if handler})
+
+    def test_stale_after_unload(self):
+        for engine in self.engines():
+            self.run_main()
+            class_unloading.unload('Data')
+            # Data is initialized again, the quick variants resolve again
+            self.run_main()
+            self.assertEqual(self.count(), [4])
+            getstatic = next(
+                instr for instr in self.main_code().instructions
+                if type(instr) is instruction.getstatic_quick)
+            self.assertIs(
+                getstatic.fields, run_time_data.class_static_fields['Data'])
+            self.assertEqual(getstatic.generation, class_unloading.generation)
+
+    def test_pickled_as_instruction(self):
+        self.run_main()
+        getstatic = next(
+            instr for instr in self.main_code().instructions
+            if type(instr) is instruction.getstatic_quick)
+        pickled = pickle.loads(pickle.dumps(getstatic))
+        self.assertIs(type(pickled), instruction.getstatic)
+        self.assertEqual(vars(pickled), vars(getstatic.instr))
+
+    def test_invokespecial_of_inherited_method(self):
+        # Vector.toString invokes super.toString, which AbstractList
+        # inherits from AbstractCollection
+        vector = run_time_data.method_area['java/util/Vector']
+        method = vector.get_method('toString', '()Ljava/lang/String;')
+        code = method.code()
+        address, invokespecial = next(
+            (address, instr) for address, instr in enumerate(code.instructions)
+            if type(instr) is instruction.invokespecial)
+        vector_frame = frame.Frame(vector, method, None, [], [])
+        vector_frame.operand_stack.append(None)
+        self.assertIs(
+            invokespecial.execute(vector_frame),
+            instruction.NextStep.invoke_method)
+        invocation = vector_frame.invocation
+        self.assertEqual(
+            invocation[:3],
+            ('java/util/AbstractCollection', 'toString',
+             '()Ljava/lang/String;'))
+        quick = code.instructions[address]
+        self.assertIs(type(quick), instruction.invokespecial_quick)
+        vector_frame.operand_stack.append(None)
+        quick.execute(vector_frame)
+        self.assertEqual(vector_frame.invocation[:3], invocation[:3])
+        self.assertEqual(
+            vector_frame.invocation.method.name,
+            'java/util/AbstractCollection.toString')
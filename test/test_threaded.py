@@ -0,0 +1,48 @@
+import os
+import test_whole_program
+from lib import class_loader
+from lib import class_unloading
+from lib import run_time_data
+from lib import thread
+from lib import threaded
+
+
+class TestThreadedEngine(test_whole_program.TestAsAWholeProgram):
+    '''The whole programs, run by the threaded engine'''
+
+    def setUp(self):
+        super().setUp()
+        thread.engine = 'threaded'
+        # Classes of the programs are loaded and initialized again
+        for name in list(run_time_data.method_area):
+            if not class_unloading.is_bootstrap(name):
+                del run_time_data.method_area[name]
+                run_time_data.class_static_fields.pop(name, None)
+
+    def tearDown(self):
+        thread.engine = 'classic'
+        super().tearDown()
+
+    def test_handlers_are_compiled_once(self):
+        class_loader.classpath = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), 'simple_loop')
+        klass = class_loader.load_class('SimpleLoop')
+        code = klass.get_method('main', '([Ljava/lang/String;)V').code()
+        main_thread = thread.Thread(
+            'SimpleLoop', 'main', '([Ljava/lang/String;)V', [''])
+        main_thread.run()
+        handlers = code.handlers
+        self.assertEqual(len(handlers), code.code_length)
+        main_thread.run()
+        self.assertIs(code.handlers, handlers)
+        self.assertIsNone(code.__getstate__()['handlers'])
+
+    def test_unsupported_instruction(self):
+        class_loader.classpath = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), 'happy_num')
+        class_loader.load_class('HappyNum')
+        main_thread = thread.Thread(
+            'HappyNum', 'isHappy', '(I)Z', [1])
+        with self.assertRaisesRegex(NotImplementedError, '0x9D at 1'):
+            threaded.run(main_thread, main_thread.method_entrance(
+                'HappyNum', 'isHappy', '(I)Z', None, [1])[0])